@@ -0,0 +1,360 @@
+"""
+Inference Backends - Pluggable text-generation backends for GeneratorAgent
+Remote Hugging Face API, an OpenAI-compatible server (llama.cpp server, vLLM, Ollama) or an in-process llama.cpp model
+"""
+
+import asyncio
+import os
+import threading
+from abc import ABC, abstractmethod
+from typing import Dict, Iterator, Optional
+
+import aiohttp
+import requests
+
+from .http_session import get_async_session, get_shared_session
+from .retry import TransientAPIError, error_for_status
+from .streaming import TokenStream, iter_sse_tokens
+
+HF_API_URL = "https://api-inference.huggingface.co/models/mistralai/Mistral-7B-Instruct-v0.2"
+
+
+class InferenceBackend(ABC):
+    """
+    Base class for inference backends
+    
+    Backends take HF-style generation parameters (max_new_tokens, temperature,
+    top_p) and translate them for their own API. Failures are raised as the
+    classified errors from .retry so RetryPolicy and CircuitBreaker treat every
+    backend alike. `endpoint` identifies the model for caching and for picking
+    a circuit breaker.
+    """
+    
+    name = "base"
+    
+    def __init__(self, endpoint: str):
+        self.endpoint = endpoint
+    
+    @property
+    def model_id(self) -> str:
+        """Identity of the model answering, for cache keys"""
+        return self.endpoint
+    
+    @abstractmethod
+    def generate(self, prompt: str, parameters: Dict, timeout: float = 30) -> str:
+        """Generate a completion for prompt and return its text"""
+    
+    def open_stream(self, prompt: str, parameters: Dict, timeout: float = 30) -> TokenStream:
+        """Start a streamed generation; errors opening it are raised here, not while iterating"""
+        # Backends without token streaming deliver the completion as a single token
+        return TokenStream([self.generate(prompt, parameters, timeout)])
+    
+    async def agenerate(self, prompt: str, parameters: Dict, timeout: float = 30,
+                        session: Optional[aiohttp.ClientSession] = None) -> str:
+        """Async generate; by default runs generate() in the loop's thread pool"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, lambda: self.generate(prompt, parameters, timeout))
+    
+    @staticmethod
+    def completion_params(parameters: Dict) -> Dict:
+        """HF generation parameters as OpenAI-style completion parameters"""
+        params = {}
+        if "max_new_tokens" in parameters:
+            params["max_tokens"] = parameters["max_new_tokens"]
+        for name in ("temperature", "top_p"):
+            if name in parameters:
+                params[name] = parameters[name]
+        return params
+
+
+class _HTTPBackend(InferenceBackend):
+    """Shared plumbing for backends reached over HTTP"""
+    
+    def __init__(self, endpoint: str, api_key: Optional[str] = None,
+                 session: Optional[requests.Session] = None):
+        super().__init__(endpoint)
+        self.headers = {"Content-Type": "application/json"}
+        if api_key:
+            self.headers["Authorization"] = f"Bearer {api_key}"
+        self.session = session if session is not None else get_shared_session()
+    
+    @property
+    def request_url(self) -> str:
+        return self.endpoint
+    
+    @abstractmethod
+    def payload(self, prompt: str, parameters: Dict, stream: bool = False) -> Dict:
+        """JSON request body for a prompt"""
+    
+    @abstractmethod
+    def completion_text(self, result) -> str:
+        """Completion text from a decoded (non-streamed) response"""
+    
+    def generate(self, prompt: str, parameters: Dict, timeout: float = 30) -> str:
+        response = self.session.post(
+            self.request_url,
+            headers=self.headers,
+            json=self.payload(prompt, parameters),
+            timeout=timeout
+        )
+        
+        if response.status_code == 200:
+            return self.completion_text(response.json())
+        else:
+            try:
+                body = response.json()
+            except ValueError:
+                body = None
+            raise error_for_status(response.status_code, body, response.headers.get('Retry-After'))
+    
+    def open_stream(self, prompt: str, parameters: Dict, timeout: float = 30) -> TokenStream:
+        """Start a streamed (server-sent events) call"""
+        response = self.session.post(
+            self.request_url,
+            headers=self.headers,
+            json=self.payload(prompt, parameters, stream=True),
+            timeout=timeout,
+            stream=True
+        )
+        
+        if response.status_code != 200:
+            try:
+                body = response.json()
+            except ValueError:
+                body = None
+            finally:
+                response.close()
+            raise error_for_status(response.status_code, body, response.headers.get('Retry-After'))
+        return TokenStream(iter_sse_tokens(response.iter_lines()), response.close)
+    
+    async def agenerate(self, prompt: str, parameters: Dict, timeout: float = 30,
+                        session: Optional[aiohttp.ClientSession] = None) -> str:
+        """Call the endpoint without blocking the event loop"""
+        if session is None:
+            session = get_async_session()
+        
+        async with session.post(
+            self.request_url,
+            headers=self.headers,
+            json=self.payload(prompt, parameters),
+            timeout=aiohttp.ClientTimeout(total=timeout)
+        ) as response:
+            if response.status == 200:
+                return self.completion_text(await response.json(content_type=None))
+            else:
+                try:
+                    body = await response.json(content_type=None)
+                except ValueError:
+                    body = None
+                raise error_for_status(response.status, body, response.headers.get('Retry-After'))
+
+
+class HFInferenceBackend(_HTTPBackend):
+    """Hugging Face Inference API (or a self-hosted text-generation-inference server)"""
+    
+    name = "hf"
+    
+    def __init__(self, api_url: str = HF_API_URL, api_key: Optional[str] = None,
+                 session: Optional[requests.Session] = None):
+        """
+        Args:
+            api_url: Model endpoint
+            api_key: Optional HF token; the free tier works without one (rate limited)
+            session: HTTP session (defaults to the process-wide pooled session)
+        """
+        super().__init__(api_url, api_key, session)
+    
+    def payload(self, prompt: str, parameters: Dict, stream: bool = False) -> Dict:
+        payload = {
+            "inputs": prompt,
+            "parameters": parameters
+        }
+        if stream:
+            payload["stream"] = True
+        return payload
+    
+    def completion_text(self, result) -> str:
+        if isinstance(result, list) and len(result) > 0:
+            return result[0].get('generated_text', '')
+        return ''
+
+
+class OpenAICompatibleBackend(_HTTPBackend):
+    """
+    Any server speaking the OpenAI completions API
+    
+    Covers the usual CPU-friendly local servers: llama.cpp's llama-server
+    (http://localhost:8080/v1), Ollama (http://localhost:11434/v1) and vLLM.
+    """
+    
+    name = "openai"
+    
+    def __init__(self, base_url: str = "http://localhost:8080/v1", model: str = "local-model",
+                 api_key: Optional[str] = None, session: Optional[requests.Session] = None):
+        """
+        Args:
+            base_url: API root, up to and including /v1
+            model: Model name the server should use (ignored by single-model servers)
+            api_key: Optional bearer token
+            session: HTTP session (defaults to the process-wide pooled session)
+        """
+        super().__init__(base_url.rstrip('/'), api_key, session)
+        self.model = model
+    
+    @property
+    def model_id(self) -> str:
+        # One server may host several models
+        return f"{self.endpoint}#{self.model}"
+    
+    @property
+    def request_url(self) -> str:
+        return self.endpoint + "/completions"
+    
+    def payload(self, prompt: str, parameters: Dict, stream: bool = False) -> Dict:
+        payload = {"model": self.model, "prompt": prompt, **self.completion_params(parameters)}
+        if stream:
+            payload["stream"] = True
+        return payload
+    
+    def completion_text(self, result) -> str:
+        choices = result.get('choices') if isinstance(result, dict) else None
+        if choices:
+            return choices[0].get('text') or ''
+        return ''
+
+
+class LlamaCppBackend(InferenceBackend):
+    """
+    In-process GGUF model run on the CPU with llama-cpp-python
+    
+    No server and no network: the model is loaded once per process on first
+    use and calls are serialised, since a llama.cpp context can't run two
+    generations at once. Requires `pip install llama-cpp-python`.
+    
+    `timeout` bounds the wait for the model while another generation holds
+    it (raising TransientAPIError, as a busy server would). A generation
+    that has started can't be interrupted; its length is bounded by
+    max_new_tokens instead.
+    """
+    
+    name = "llamacpp"
+    
+    def __init__(self, model_path: str, n_ctx: int = 4096, n_threads: Optional[int] = None):
+        """
+        Args:
+            model_path: Path of a GGUF model file, e.g. a 4-bit Mistral 7B Instruct
+            n_ctx: Context window in tokens (prompt plus output)
+            n_threads: CPU threads to use (defaults to llama.cpp's choice)
+        """
+        try:
+            import llama_cpp
+        except ImportError as e:
+            raise ImportError("The llamacpp backend needs llama-cpp-python: pip install llama-cpp-python") from e
+        
+        super().__init__(f"llamacpp:{os.path.abspath(model_path)}")
+        self._llama_class = llama_cpp.Llama
+        self.model_path = model_path
+        self.n_ctx = n_ctx
+        self.n_threads = n_threads
+        self._model = None
+        self._lock = threading.Lock()
+    
+    @property
+    def model(self):
+        if self._model is None:
+            with self._lock:
+                if self._model is None:
+                    self._model = self._llama_class(model_path=self.model_path, n_ctx=self.n_ctx,
+                                                    n_threads=self.n_threads, verbose=False)
+        return self._model
+    
+    def _acquire(self, timeout: float):
+        if not self._lock.acquire(timeout=timeout):
+            raise TransientAPIError(f"llama.cpp model still busy after {timeout:.1f}s", status=503)
+    
+    def generate(self, prompt: str, parameters: Dict, timeout: float = 30) -> str:
+        model = self.model
+        self._acquire(timeout)
+        try:
+            result = model(prompt, **self.completion_params(parameters))
+        finally:
+            self._lock.release()
+        return result['choices'][0]['text']
+    
+    def open_stream(self, prompt: str, parameters: Dict, timeout: float = 30) -> TokenStream:
+        model = self.model
+        # Held from here until the stream is exhausted or closed
+        self._acquire(timeout)
+        released = False
+        
+        def release():
+            nonlocal released
+            if not released:
+                released = True
+                self._lock.release()
+        
+        def tokens() -> Iterator[str]:
+            try:
+                for chunk in model(prompt, stream=True, **self.completion_params(parameters)):
+                    text = chunk['choices'][0].get('text')
+                    if text:
+                        yield text
+            finally:
+                release()
+        
+        stream = tokens()
+        
+        def close():
+            stream.close()
+            # A stream closed before its first token never ran the finally above
+            release()
+        
+        return TokenStream(stream, close)
+
+
+BACKENDS = {
+    "hf": HFInferenceBackend,
+    "openai": OpenAICompatibleBackend,
+    "llamacpp": LlamaCppBackend
+}
+
+
+def create_backend(name: Optional[str] = None, session: Optional[requests.Session] = None,
+                   environ: Optional[Dict[str, str]] = None) -> InferenceBackend:
+    """
+    Build the configured inference backend
+    
+    Configuration comes from environment variables, so a deployment can switch
+    backends without code changes:
+        
+        INFERENCE_BACKEND   hf (default), openai or llamacpp
+        INFERENCE_URL       Model endpoint (hf) or API root (openai)
+        INFERENCE_MODEL     Model name sent to an openai server
+        INFERENCE_API_KEY   Bearer token, if the endpoint needs one
+        LLAMA_MODEL_PATH    GGUF file for llamacpp
+        LLAMA_THREADS       CPU threads for llamacpp
+    
+    Args:
+        name: Backend name, overriding INFERENCE_BACKEND
+        session: HTTP session for the HTTP backends
+        environ: Mapping to read instead of os.environ
+    """
+    env = os.environ if environ is None else environ
+    name = (name or env.get("INFERENCE_BACKEND") or "hf").lower()
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown inference backend '{name}' - choose from {', '.join(BACKENDS)}")
+    
+    url = env.get("INFERENCE_URL")
+    api_key = env.get("INFERENCE_API_KEY")
+    if name == "hf":
+        return HFInferenceBackend(url or HF_API_URL, api_key, session)
+    if name == "openai":
+        kwargs = {"base_url": url} if url else {}
+        return OpenAICompatibleBackend(model=env.get("INFERENCE_MODEL", "local-model"), api_key=api_key,
+                                       session=session, **kwargs)
+    
+    model_path = env.get("LLAMA_MODEL_PATH")
+    if not model_path:
+        raise ValueError("The llamacpp backend needs LLAMA_MODEL_PATH set to a GGUF model file")
+    threads = env.get("LLAMA_THREADS")
+    return LlamaCppBackend(model_path, n_threads=int(threads) if threads else None)
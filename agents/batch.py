@@ -0,0 +1,207 @@
+"""
+Batch Generation - Run generate -> review -> refine for many (grade, topic) jobs
+Streams results to a JSON Lines file as they finish and resumes after a crash
+
+Usage: python -m agents.batch jobs.csv --output results.jsonl --concurrency 8
+"""
+
+import argparse
+import asyncio
+import csv
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from utils.analytics_store import JSONLinesStore
+
+from .generation_cache import normalize_topic
+from .generator_agent import GeneratorAgent
+from .http_session import close_async_session
+from .reviewer_agent import ReviewerAgent
+
+
+def job_key(grade: int, topic: str) -> str:
+    """Identifier used to recognise a job that already finished"""
+    return f"{grade}:{normalize_topic(topic)}"
+
+
+def load_jobs(csv_path: str) -> List[Tuple[int, str]]:
+    """
+    Read (grade, topic) jobs from a CSV file with 'grade' and 'topic' columns
+    
+    Rows with a missing or non-numeric grade or an empty topic are skipped.
+    """
+    jobs = []
+    with open(csv_path, newline='', encoding='utf-8') as f:
+        for row in csv.DictReader(f):
+            try:
+                grade = int(row.get('grade', ''))
+            except ValueError:
+                continue
+            topic = (row.get('topic') or '').strip()
+            if topic:
+                jobs.append((grade, topic))
+    return jobs
+
+
+class BatchGenerator:
+    """Generate, review and (if needed) refine content for many jobs concurrently"""
+    
+    def __init__(self, generator: Optional[GeneratorAgent] = None,
+                 reviewer: Optional[ReviewerAgent] = None, concurrency: int = 8):
+        """
+        Args:
+            generator: Generator to use (a new GeneratorAgent by default)
+            reviewer: Reviewer to use (a new ReviewerAgent by default)
+            concurrency: Maximum number of jobs in flight at once
+        """
+        if concurrency < 1:
+            raise ValueError("concurrency must be at least 1")
+        self.generator = generator or GeneratorAgent()
+        self.reviewer = reviewer or ReviewerAgent()
+        self.concurrency = concurrency
+    
+    def run(self, jobs: Iterable[Tuple[int, str]], output_path: str,
+            progress: Optional[Callable[[Dict], None]] = None) -> Dict:
+        """Blocking wrapper around arun"""
+        return asyncio.run(self.arun(jobs, output_path, progress))
+    
+    async def arun(self, jobs: Iterable[Tuple[int, str]], output_path: str,
+                   progress: Optional[Callable[[Dict], None]] = None) -> Dict:
+        """
+        Process jobs, appending one JSON record per finished job to output_path
+        
+        Jobs already present in output_path (from an earlier, interrupted run)
+        are skipped, as are duplicate jobs. Jobs the API couldn't generate
+        (including while its circuit breaker is open) are counted as errors and
+        not recorded, so the next run retries them instead of keeping filler.
+        
+        Args:
+            jobs: (grade, topic) pairs
+            output_path: JSON Lines results file
+            progress: Optional callback invoked with each finished record
+        
+        Returns:
+            Summary with counts, elapsed time and throughput
+        """
+        store = JSONLinesStore(output_path, compact_every=0)
+        store.recover()
+        done = {record.get('job_id') for record, _ in store.scan()}
+        
+        pending = []
+        skipped = 0
+        for grade, topic in jobs:
+            key = job_key(grade, topic)
+            if key in done:
+                skipped += 1
+                continue
+            done.add(key)
+            pending.append((grade, topic))
+        
+        summary = {
+            "total": len(pending),
+            "skipped": skipped,
+            "completed": 0,
+            "passed": 0,
+            "refined": 0,
+            "errors": 0
+        }
+        start = time.perf_counter()
+        job_iter = iter(pending)
+        
+        async def worker():
+            # Workers pull from one shared iterator, bounding jobs in flight
+            for grade, topic in job_iter:
+                try:
+                    record = await self.process_job(grade, topic)
+                except Exception:
+                    # API failures included: not recorded, so a resumed run will retry it
+                    summary["errors"] += 1
+                    continue
+                store.append(record)
+                summary["completed"] += 1
+                summary["passed"] += record["review_status"] == "pass"
+                summary["refined"] += record["refinement_needed"]
+                if progress:
+                    progress(record)
+        
+        try:
+            await asyncio.gather(*(worker() for _ in range(self.concurrency)))
+        finally:
+            store.close()
+            await close_async_session()
+        
+        elapsed = time.perf_counter() - start
+        summary["elapsed"] = elapsed
+        summary["jobs_per_minute"] = summary["completed"] / elapsed * 60 if elapsed > 0 else 0
+        return summary
+    
+    async def process_job(self, grade: int, topic: str) -> Dict:
+        """Run the generate -> review -> refine pipeline for a single job"""
+        start = time.perf_counter()
+        
+        # No template fallback: filler recorded as a finished job would never be retried
+        content = await self.generator.agenerate_content(grade, topic, fallback=False)
+        parts = self.reviewer.review_parts(content, grade, topic)
+        review = self.reviewer.summarize(parts)
+        initial_status = review['status']
+        
+        refinement_needed = initial_status == 'fail'
+        refinement_failed = False
+        if refinement_needed:
+            # Rewrite only the flagged parts and re-check only what changed
+            try:
+                refined = await self.generator.arefine_content(grade, topic, content, parts, fallback=False)
+            except Exception:
+                # Keep the model's content and its failing review rather than template filler
+                refinement_failed = True
+            else:
+                parts = self.reviewer.review_parts(refined, grade, topic, previous=(content, parts))
+                content = refined
+                review = self.reviewer.summarize(parts)
+        
+        self.generator.remember_reviewed(grade, topic, content, review)
+        
+        return {
+            "job_id": job_key(grade, topic),
+            "grade": grade,
+            "topic": topic,
+            "content": content,
+            "review": review,
+            "review_status": review['status'],
+            "initial_status": initial_status,
+            "refinement_needed": refinement_needed,
+            "refinement_failed": refinement_failed,
+            "total_time": time.perf_counter() - start
+        }
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Pre-generate content for a CSV of (grade, topic) jobs")
+    parser.add_argument("jobs", help="CSV file with 'grade' and 'topic' columns")
+    parser.add_argument("-o", "--output", default="batch_results.jsonl",
+                        help="JSON Lines results file; existing results are kept and skipped")
+    parser.add_argument("-c", "--concurrency", type=int, default=8,
+                        help="Maximum number of jobs in flight (default: 8)")
+    args = parser.parse_args(argv)
+    
+    jobs = load_jobs(args.jobs)
+    print(f"Loaded {len(jobs)} jobs from {args.jobs}")
+    
+    def report(record):
+        print(f"  [{record['review_status'].upper()}] Grade {record['grade']}: {record['topic']} "
+              f"({record['total_time']:.1f}s)")
+    
+    summary = BatchGenerator(concurrency=args.concurrency).run(jobs, args.output, progress=report)
+    
+    print("=" * 60)
+    print(f"Completed: {summary['completed']} | Skipped (already done): {summary['skipped']} | "
+          f"Errors: {summary['errors']}")
+    print(f"Passed review: {summary['passed']} | Refined: {summary['refined']}")
+    print(f"Elapsed: {summary['elapsed']:.1f}s ({summary['jobs_per_minute']:.1f} jobs/min)")
+    if summary['errors']:
+        print("Jobs that failed (e.g. while the API was down) were not recorded; rerun to retry them")
+    print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
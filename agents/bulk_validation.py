@@ -0,0 +1,246 @@
+"""
+Bulk Validation - Re-run the reviewer and validator checks over a library of stored content
+Fans chunks of items out across a process pool and streams results back in input order
+
+Usage: python -m agents.bulk_validation results.jsonl --output validation.jsonl --workers 8
+"""
+
+import argparse
+import json
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from utils.validator import AdvancedValidator
+
+from .batch import job_key
+from .json_extract import validate_content
+from .reviewer_agent import ReviewerAgent
+
+DEFAULT_CHUNKSIZE = 256
+# Chunks queued per worker, so the pool stays busy without reading the whole input ahead
+CHUNKS_IN_FLIGHT = 4
+# What one bad item can raise (bad JSON, or a check tripping over odd content); recorded, never fatal
+ITEM_ERRORS = (ValueError, TypeError, AttributeError, KeyError)
+
+# One reviewer per process, created on first use (its matchers and lexicon are reused per item)
+_reviewer: Optional[ReviewerAgent] = None
+
+
+def _worker_reviewer() -> ReviewerAgent:
+    global _reviewer
+    if _reviewer is None:
+        _reviewer = ReviewerAgent()
+    return _reviewer
+
+
+def validate_item(item: Dict, reviewer: Optional[ReviewerAgent] = None) -> Dict:
+    """
+    Review and validate one content item
+    
+    Args:
+        item: Dict with 'content', 'grade' and 'topic' (e.g. a batch results
+              record); an 'id' or 'job_id' is carried over to the result
+        reviewer: Reviewer to use (the process-wide one by default)
+    
+    Returns:
+        Record with the review, the comprehensive validation and whether both passed
+    
+    Raises:
+        ValueError: If the item is missing its content, grade or topic, or its
+                    content isn't an explanation string with well-formed MCQs
+    """
+    if not isinstance(item, dict):
+        raise ValueError("not a JSON object")
+    content = item.get('content')
+    topic = item.get('topic')
+    if not isinstance(content, dict) or not topic:
+        raise ValueError("item needs 'content', 'grade' and 'topic'")
+    try:
+        grade = int(item['grade'])
+    except (KeyError, TypeError, ValueError):
+        raise ValueError("item needs 'content', 'grade' and 'topic'") from None
+    if not validate_content(content):
+        raise ValueError("content needs a string 'explanation' and 'mcqs' with string "
+                         "'question', 'options' and 'answer'")
+    
+    review = (reviewer or _worker_reviewer()).review_content(content, grade, topic)
+    validation = AdvancedValidator.comprehensive_validation(content, grade, topic)
+    return {
+        "id": item.get('id') or item.get('job_id') or job_key(grade, topic),
+        "grade": grade,
+        "topic": topic,
+        "valid": review['status'] == 'pass' and validation['valid'],
+        "review": review,
+        "validation": validation
+    }
+
+
+def _validate_chunk(items: List[Dict]) -> List[Dict]:
+    results = []
+    for item in items:
+        try:
+            results.append(validate_item(item))
+        except ITEM_ERRORS as e:
+            item_id = (item.get('id') or item.get('job_id')) if isinstance(item, dict) else None
+            results.append({"id": item_id, "error": f"{type(e).__name__}: {e}"})
+    return results
+
+
+def _validate_lines(lines: List[Tuple[int, str]]) -> Tuple[List[str], int, int]:
+    """
+    Validate raw JSON lines, returning the encoded results with counts of
+    valid and unreadable items
+    
+    Decoding and encoding happen in the worker, so the parent process only
+    moves text between the files.
+    """
+    encoded = []
+    valid = errors = 0
+    for line_number, line in lines:
+        try:
+            record = validate_item(json.loads(line))
+        except ITEM_ERRORS as e:
+            # JSONDecodeError is a ValueError
+            record = {"line": line_number, "error": f"{type(e).__name__}: {e}"}
+            errors += 1
+        else:
+            valid += record['valid']
+        encoded.append(json.dumps(record))
+    return encoded, valid, errors
+
+
+def _chunks(iterable: Iterable, size: int) -> Iterator[List]:
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def _map_chunks(fn: Callable, chunks: Iterator[List], workers: int) -> Iterator:
+    """
+    fn(chunk) for every chunk, in order
+    
+    Unlike Executor.map, only workers * CHUNKS_IN_FLIGHT chunks are submitted
+    ahead of the one being yielded, so a million-item input is never held in
+    memory at once.
+    """
+    if workers == 1:
+        # In-process: no worker start-up or pickling
+        yield from map(fn, chunks)
+        return
+    
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = deque()
+        for chunk in chunks:
+            pending.append(pool.submit(fn, chunk))
+            if len(pending) >= workers * CHUNKS_IN_FLIGHT:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+class BulkValidator:
+    """Review and validate many stored content items across a process pool"""
+    
+    def __init__(self, workers: Optional[int] = None, chunksize: int = DEFAULT_CHUNKSIZE):
+        """
+        Args:
+            workers: Processes to use (one per CPU by default; 1 runs in-process)
+            chunksize: Items sent to a worker at a time
+        """
+        workers = workers or os.cpu_count() or 1
+        if workers < 1:
+            raise ValueError("workers must be at least 1")
+        if chunksize < 1:
+            raise ValueError("chunksize must be at least 1")
+        self.workers = workers
+        self.chunksize = chunksize
+    
+    def validate(self, items: Iterable[Dict]) -> Iterator[Dict]:
+        """
+        Stream one result record per item, in input order
+        
+        Items that can't be validated yield a record with an 'error' instead.
+        """
+        for results in _map_chunks(_validate_chunk, _chunks(items, self.chunksize), self.workers):
+            yield from results
+    
+    def run(self, input_path: str, output_path: str,
+            progress: Optional[Callable[[Dict], None]] = None) -> Dict:
+        """
+        Validate every item of a JSON Lines file, writing one result line per item
+        
+        Args:
+            input_path: JSON Lines file of items (e.g. agents.batch results)
+            output_path: JSON Lines results file, overwritten
+            progress: Optional callback invoked with the running summary after each chunk
+        
+        Returns:
+            Summary with counts, elapsed time and throughput
+        """
+        summary = {
+            "completed": 0,
+            "valid": 0,
+            "invalid": 0,
+            "errors": 0
+        }
+        start = time.perf_counter()
+        
+        with open(input_path, encoding='utf-8') as src, open(output_path, 'w', encoding='utf-8') as out:
+            lines = ((number, line) for number, line in enumerate(src, 1) if line.strip())
+            for encoded, valid, errors in _map_chunks(_validate_lines, _chunks(lines, self.chunksize),
+                                                      self.workers):
+                out.write("\n".join(encoded) + "\n")
+                summary["completed"] += len(encoded)
+                summary["valid"] += valid
+                summary["errors"] += errors
+                summary["invalid"] += len(encoded) - valid - errors
+                if progress:
+                    progress(summary)
+        
+        elapsed = time.perf_counter() - start
+        summary["elapsed"] = elapsed
+        summary["items_per_second"] = summary["completed"] / elapsed if elapsed > 0 else 0
+        return summary
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Re-run the content checks over a JSON Lines library")
+    parser.add_argument("items", help="JSON Lines file of {content, grade, topic} records "
+                                      "(e.g. agents.batch results)")
+    parser.add_argument("-o", "--output", default="validation_results.jsonl",
+                        help="JSON Lines results file (overwritten)")
+    parser.add_argument("-w", "--workers", type=int, default=None,
+                        help="Worker processes (default: one per CPU; 1 runs in-process)")
+    parser.add_argument("--chunksize", type=int, default=DEFAULT_CHUNKSIZE,
+                        help=f"Items sent to a worker at a time (default: {DEFAULT_CHUNKSIZE})")
+    args = parser.parse_args(argv)
+    
+    validator = BulkValidator(workers=args.workers, chunksize=args.chunksize)
+    print(f"Validating {args.items} with {validator.workers} worker(s)")
+    
+    last_report = [time.perf_counter()]
+    
+    def report(summary):
+        now = time.perf_counter()
+        if now - last_report[0] >= 5:
+            last_report[0] = now
+            print(f"  {summary['completed']} items checked")
+    
+    summary = validator.run(args.items, args.output, progress=report)
+    
+    print("=" * 60)
+    print(f"Checked: {summary['completed']} | Valid: {summary['valid']} | Invalid: {summary['invalid']} | "
+          f"Errors: {summary['errors']}")
+    print(f"Elapsed: {summary['elapsed']:.1f}s ({summary['items_per_second']:.0f} items/s)")
+    print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
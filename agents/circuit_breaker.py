@@ -0,0 +1,184 @@
+"""
+Circuit Breaker - Stop calling the inference API while it is unhealthy
+One breaker per endpoint, shared by every agent in the process
+"""
+
+import threading
+import time
+from collections import deque
+from typing import Awaitable, Callable, Dict
+
+from .retry import PermanentAPIError, RetryPolicy
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(PermanentAPIError):
+    """Raised instead of calling the API while the circuit is open"""
+
+
+class CircuitBreaker:
+    """
+    Closed / open / half-open circuit breaker driven by a rolling failure rate
+    
+    While closed, the outcome of the last `window_size` calls is tracked; once at
+    least `min_calls` are recorded and the failure rate reaches
+    `failure_rate_threshold`, the circuit opens and calls are rejected without
+    touching the network. After `open_duration` seconds it goes half-open and
+    lets up to `half_open_probes` probe calls through: a successful probe closes
+    the circuit, a failed one opens it again.
+    
+    Only upstream-health failures count (timeouts, connection errors, 429/5xx);
+    client errors and unparseable output mean the endpoint itself answered.
+    """
+    
+    def __init__(self, failure_rate_threshold: float = 0.5, window_size: int = 20,
+                 min_calls: int = 5, open_duration: float = 30.0, half_open_probes: int = 1,
+                 clock: Callable[[], float] = time.monotonic):
+        """
+        Args:
+            failure_rate_threshold: Failure fraction (0-1) of the window that opens the circuit
+            window_size: Number of recent calls the failure rate is computed over
+            min_calls: Calls needed in the window before the circuit may open
+            open_duration: Seconds to reject calls before probing the endpoint again
+            half_open_probes: Probe calls allowed at once while half-open
+            clock: Injectable for tests
+        """
+        self.failure_rate_threshold = failure_rate_threshold
+        self.min_calls = min_calls
+        self.open_duration = open_duration
+        self.half_open_probes = half_open_probes
+        self.clock = clock
+        
+        self._outcomes = deque(maxlen=window_size)
+        self._state = CLOSED
+        self._opened_at = 0.0
+        self._probes_in_flight = 0
+        self._lock = threading.Lock()
+        
+        self.rejected = 0
+        self.times_opened = 0
+    
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._current_state()
+    
+    def _current_state(self) -> str:
+        if self._state == OPEN and self.clock() - self._opened_at >= self.open_duration:
+            self._state = HALF_OPEN
+            self._probes_in_flight = 0
+        return self._state
+    
+    def allow_request(self) -> bool:
+        """Whether a call may go out now; reserves a probe slot when half-open"""
+        with self._lock:
+            state = self._current_state()
+            if state == CLOSED:
+                return True
+            if state == HALF_OPEN and self._probes_in_flight < self.half_open_probes:
+                self._probes_in_flight += 1
+                return True
+            self.rejected += 1
+            return False
+    
+    def record_success(self):
+        with self._lock:
+            if self._state == HALF_OPEN:
+                # Endpoint recovered - start over with a clean window
+                self._state = CLOSED
+                self._outcomes.clear()
+                self._probes_in_flight = 0
+            elif self._state == CLOSED:
+                self._outcomes.append(True)
+    
+    def record_failure(self):
+        with self._lock:
+            if self._state == HALF_OPEN:
+                self._open()
+            elif self._state == CLOSED:
+                self._outcomes.append(False)
+                failures = self._outcomes.count(False)
+                if (len(self._outcomes) >= self.min_calls
+                        and failures / len(self._outcomes) >= self.failure_rate_threshold):
+                    self._open()
+    
+    def release(self):
+        """Give back a probe slot for a call that ended without an outcome (e.g. cancelled)"""
+        with self._lock:
+            if self._state == HALF_OPEN and self._probes_in_flight:
+                self._probes_in_flight -= 1
+    
+    def _open(self):
+        self._state = OPEN
+        self._opened_at = self.clock()
+        self._outcomes.clear()
+        self._probes_in_flight = 0
+        self.times_opened += 1
+    
+    def _record(self, error: BaseException):
+        if RetryPolicy.is_transient(error):
+            self.record_failure()
+        else:
+            self.record_success()
+    
+    def call(self, fn: Callable, *args, **kwargs):
+        """Call fn through the breaker, raising CircuitOpenError while open"""
+        if not self.allow_request():
+            raise CircuitOpenError("Circuit open: inference API marked unavailable")
+        try:
+            result = fn(*args, **kwargs)
+        except Exception as e:
+            self._record(e)
+            raise
+        except BaseException:
+            self.release()
+            raise
+        self.record_success()
+        return result
+    
+    async def acall(self, fn: Callable[..., Awaitable], *args, **kwargs):
+        """Async counterpart of call"""
+        if not self.allow_request():
+            raise CircuitOpenError("Circuit open: inference API marked unavailable")
+        try:
+            result = await fn(*args, **kwargs)
+        except Exception as e:
+            self._record(e)
+            raise
+        except BaseException:
+            self.release()
+            raise
+        self.record_success()
+        return result
+    
+    def stats(self) -> Dict:
+        """Current state and counters for monitoring"""
+        with self._lock:
+            state = self._current_state()
+            calls = len(self._outcomes)
+            failures = self._outcomes.count(False)
+            retry_in = max(0.0, self.open_duration - (self.clock() - self._opened_at)) if state == OPEN else 0.0
+            return {
+                "state": state,
+                "failure_rate": failures / calls * 100 if calls else 0,
+                "window_calls": calls,
+                "rejected": self.rejected,
+                "times_opened": self.times_opened,
+                "retry_in": retry_in
+            }
+
+
+_breakers: Dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+
+def get_breaker(endpoint: str) -> CircuitBreaker:
+    """Return the process-wide circuit breaker for an API endpoint"""
+    with _breakers_lock:
+        breaker = _breakers.get(endpoint)
+        if breaker is None:
+            breaker = _breakers[endpoint] = CircuitBreaker()
+        return breaker
@@ -0,0 +1,194 @@
+"""
+Generation Cache - Reuse generated content for repeated requests
+In-memory LRU tier with an optional on-disk (SQLite) tier shared between processes
+"""
+
+import copy
+import hashlib
+import json
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+
+def normalize_topic(topic: str) -> str:
+    """Normalise a topic so trivially different spellings share a cache entry"""
+    topic = re.sub(r'\s+', ' ', topic.strip().lower())
+    return topic.strip(' .?!')
+
+
+class GenerationCache:
+    """
+    Two-tier cache for generated content keyed by grade, topic, feedback and model parameters
+    
+    Entries expire after `ttl` seconds. The memory tier keeps at most
+    `max_entries` items and the disk tier roughly `max_disk_entries`
+    (trimmed every DISK_EVICT_EVERY writes), evicting the least recently
+    used first.
+    """
+    
+    DISK_EVICT_EVERY = 64
+    
+    def __init__(self, max_entries: int = 256, ttl: float = 24 * 3600,
+                 disk_path: Optional[str] = None, max_disk_entries: int = 10000):
+        """
+        Args:
+            max_entries: Size bound of the in-memory LRU tier
+            ttl: Seconds before an entry expires
+            disk_path: Optional SQLite file for the persistent tier
+            max_disk_entries: Size bound of the disk tier
+        """
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.max_disk_entries = max_disk_entries
+        
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._disk = None
+        self._disk_writes = 0
+        
+        if disk_path:
+            try:
+                self._disk = sqlite3.connect(disk_path, timeout=5.0, check_same_thread=False,
+                                             isolation_level=None)
+                self._disk.execute("PRAGMA journal_mode=WAL")
+                self._disk.executescript("""
+                    CREATE TABLE IF NOT EXISTS generation_cache (
+                        key TEXT PRIMARY KEY,
+                        content TEXT NOT NULL,
+                        created REAL NOT NULL,
+                        accessed REAL NOT NULL
+                    );
+                    CREATE INDEX IF NOT EXISTS idx_generation_cache_accessed
+                        ON generation_cache (accessed);
+                """)
+            except sqlite3.Error:
+                # Disk tier is optional - carry on with memory only
+                self._disk = None
+    
+    @staticmethod
+    def make_key(grade: int, topic: str, feedback: Optional[List[str]] = None,
+                 model_params: Optional[Dict] = None) -> str:
+        """Build the cache key for a generation request"""
+        feedback_items = sorted({f.strip() for f in feedback or [] if f and f.strip()})
+        feedback_hash = hashlib.sha256("\n".join(feedback_items).encode('utf-8')).hexdigest()
+        raw = json.dumps({
+            "grade": grade,
+            "topic": normalize_topic(topic),
+            "feedback": feedback_hash,
+            "model": model_params or {}
+        }, sort_keys=True)
+        return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+    
+    def get(self, key: str) -> Optional[Dict]:
+        """Return a copy of the cached content, or None on a miss"""
+        now = time.time()
+        
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                created, content = entry
+                if now - created < self.ttl:
+                    self._memory.move_to_end(key)
+                    self.hits += 1
+                    return copy.deepcopy(content)
+                del self._memory[key]
+                self.expirations += 1
+            
+            if self._disk is not None:
+                content = self._disk_get(key, now)
+                if content is not None:
+                    self.hits += 1
+                    self.disk_hits += 1
+                    return copy.deepcopy(content)
+            
+            self.misses += 1
+            return None
+    
+    def put(self, key: str, content: Dict):
+        """Store content under a key in both tiers"""
+        now = time.time()
+        content = copy.deepcopy(content)
+        
+        with self._lock:
+            self._memory[key] = (now, content)
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_entries:
+                self._memory.popitem(last=False)
+                self.evictions += 1
+            
+            if self._disk is not None:
+                self._disk_put(key, content, now)
+    
+    def clear(self):
+        """Drop every entry from both tiers"""
+        with self._lock:
+            self._memory.clear()
+            if self._disk is not None:
+                self._disk.execute("DELETE FROM generation_cache")
+    
+    def stats(self) -> Dict:
+        """Hit/miss counters and current sizes"""
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups * 100 if lookups else 0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "memory_entries": len(self._memory)
+        }
+    
+    def _disk_get(self, key: str, now: float) -> Optional[Dict]:
+        try:
+            row = self._disk.execute(
+                "SELECT content, created FROM generation_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            
+            content_json, created = row
+            if now - created >= self.ttl:
+                self._disk.execute("DELETE FROM generation_cache WHERE key = ?", (key,))
+                self.expirations += 1
+                return None
+            
+            self._disk.execute("UPDATE generation_cache SET accessed = ? WHERE key = ?", (now, key))
+            content = json.loads(content_json)
+        except (sqlite3.Error, ValueError):
+            return None
+        
+        # Promote to the memory tier
+        self._memory[key] = (created, content)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+            self.evictions += 1
+        return content
+    
+    def _disk_put(self, key: str, content: Dict, now: float):
+        try:
+            self._disk.execute(
+                "INSERT OR REPLACE INTO generation_cache (key, content, created, accessed) VALUES (?, ?, ?, ?)",
+                (key, json.dumps(content), now, now)
+            )
+            self._disk_writes += 1
+            if self._disk_writes % self.DISK_EVICT_EVERY:
+                return
+            evicted = self._disk.execute(
+                "DELETE FROM generation_cache WHERE key IN ("
+                "SELECT key FROM generation_cache ORDER BY accessed DESC LIMIT -1 OFFSET ?)",
+                (self.max_disk_entries,)
+            ).rowcount
+            self.evictions += max(evicted, 0)
+        except sqlite3.Error:
+            pass
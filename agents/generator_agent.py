@@ -1,19 +1,100 @@
 """
 Generator Agent - Creates educational content for specified grade and topic
-Uses Hugging Face's free inference API (no API key required for rate-limited access)
+Uses Hugging Face's free inference API by default (no API key required for rate-limited access)
 """
 
+import copy
 import requests
 import json
-import time
-from typing import Dict, List
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import aiohttp
+
+from .backends import InferenceBackend, create_backend
+from .circuit_breaker import CircuitBreaker, get_breaker
+from .generation_cache import GenerationCache
+from .json_extract import extract_content, validate_mcq
+from .prompt_templates import PromptBuilder
+from .retry import RetryPolicy
+from .semantic_cache import SemanticCache
+from .single_flight import SingleFlight, get_single_flight
+from .streaming import CONTENT, EXPLANATION, MCQ, IncrementalContentParser, TokenStream
+from .template_library import TemplateLibrary, get_template_library
 
 class GeneratorAgent:
-    def __init__(self):
-        # Using Hugging Face's free inference API
-        # These models are free to use without API keys (with rate limits)
-        self.api_url = "https://api-inference.huggingface.co/models/mistralai/Mistral-7B-Instruct-v0.2"
-        self.headers = {"Content-Type": "application/json"}
+    MIN_MCQS = 3
+    
+    # Grade-appropriate vocabulary for the generic fallback
+    GRADE_LANGUAGE = {
+        1: "very simple",
+        2: "simple",
+        3: "easy",
+        4: "clear",
+        5: "straightforward"
+    }
+    
+    def __init__(self, cache: Optional[GenerationCache] = None,
+                 session: Optional[requests.Session] = None,
+                 retry_policy: Optional[RetryPolicy] = None,
+                 breaker: Optional[CircuitBreaker] = None,
+                 prompt_builder: Optional[PromptBuilder] = None,
+                 single_flight: Optional[SingleFlight] = None,
+                 backend=None,
+                 template_library: Optional[TemplateLibrary] = None,
+                 semantic_cache: Optional[SemanticCache] = None):
+        """
+        Args:
+            cache: Optional generation cache, typically shared between sessions
+            session: HTTP session for HTTP backends (defaults to the
+                process-wide pooled keep-alive session)
+            retry_policy: How API failures are retried before falling back
+                to templates (defaults to RetryPolicy())
+            breaker: Circuit breaker guarding API calls (defaults to the
+                process-wide breaker for api_url)
+            prompt_builder: Prompt templates and token budgets (defaults to PromptBuilder())
+            single_flight: Coalesces identical in-flight requests (defaults to
+                the process-wide group, shared by every session)
+            backend: InferenceBackend instance or backend name ("hf", "openai",
+                "llamacpp"); defaults to the INFERENCE_BACKEND environment
+                setting, or Hugging Face's free inference API if it is unset
+            template_library: Offline content served when the API fails
+                (defaults to the process-wide library built from agents/data)
+            semantic_cache: Optional cache serving reviewed content for
+                near-identical topics when the exact cache misses
+        """
+        # The HF models are free to use without API keys (with rate limits);
+        # see create_backend for switching to a local server or CPU model
+        if isinstance(backend, InferenceBackend):
+            self.backend = backend
+        else:
+            self.backend = create_backend(backend, session=session)
+        self.generation_params = {
+            "max_new_tokens": 800,
+            "temperature": 0.7,
+            "top_p": 0.9,
+            "return_full_text": False
+        }
+        self.cache = cache
+        self.retry_policy = retry_policy or RetryPolicy()
+        self._breaker = breaker
+        self.prompt_builder = prompt_builder or PromptBuilder()
+        self.single_flight = single_flight or get_single_flight()
+        self.template_library = template_library
+        self.semantic_cache = semantic_cache
+    
+    @property
+    def api_url(self) -> str:
+        """Endpoint of the inference backend"""
+        return self.backend.endpoint
+    
+    @api_url.setter
+    def api_url(self, url: str):
+        self.backend.endpoint = url
+    
+    @property
+    def breaker(self) -> CircuitBreaker:
+        """Circuit breaker for the current api_url, shared across the process"""
+        return self._breaker if self._breaker is not None else get_breaker(self.api_url)
     
     def generate_content(self, grade: int, topic: str, feedback: List[str] = None) -> Dict:
         """
@@ -27,165 +108,442 @@ class GeneratorAgent:
         Returns:
             Dictionary with explanation and MCQs
         """
-        # Build prompt based on grade level
-        prompt = self._build_prompt(grade, topic, feedback)
+        # Serve repeated requests from the cache
+        key = self._request_key(grade, topic, feedback)
+        cached = self._cached(key, grade, topic, feedback)
+        if cached is not None:
+            return cached
+        
+        # Identical requests already in flight (from any session) share one API call
+        return self.single_flight.do(key, lambda: self._generate(grade, topic, feedback, key))
+    
+    def _generate(self, grade: int, topic: str, feedback: Optional[List[str]], key: str) -> Dict:
+        # Build prompt and output cap based on grade level
+        prompt, params = self._prepare_request(grade, topic, feedback)
+        
+        # Call the inference backend, retrying transient failures; the breaker
+        # fails fast while the endpoint is known to be down
+        breaker = self.breaker
+        try:
+            content = self.retry_policy.call(
+                lambda timeout: self._parse_response(
+                    breaker.call(self._call_hf_api, prompt, timeout=timeout, parameters=params)
+                )
+            )
+        except Exception:
+            # Fallback to template-based generation if API fails
+            return self._fallback_generation(grade, topic)
+        
+        self._cache_put(key, content)
+        return content
+    
+    async def agenerate_content(self, grade: int, topic: str, feedback: List[str] = None,
+                                session: Optional[aiohttp.ClientSession] = None, fallback: bool = True) -> Dict:
+        """
+        Async counterpart of generate_content
+        
+        Backs off between retries without blocking the event loop, so many
+        generations can be in flight from a single loop.
+        
+        Args:
+            grade: Student grade level (1-12)
+            topic: Educational topic to explain
+            feedback: Optional feedback from reviewer for refinement
+            session: aiohttp session to use (defaults to the loop's pooled session)
+            fallback: Return template content if the API fails; if False, the
+                API error is raised instead (for callers that must not store filler)
+            
+        Returns:
+            Dictionary with explanation and MCQs
+        """
+        key = self._request_key(grade, topic, feedback)
+        cached = self._cached(key, grade, topic, feedback)
+        if cached is not None:
+            return cached
+        
+        try:
+            return await self.single_flight.ado(key, lambda: self._agenerate(grade, topic, feedback, key, session))
+        except Exception:
+            # Decided per caller, outside the shared call: coalesced callers may differ
+            if not fallback:
+                raise
+            return self._fallback_generation(grade, topic)
+    
+    async def _agenerate(self, grade: int, topic: str, feedback: Optional[List[str]], key: str,
+                         session: Optional[aiohttp.ClientSession]) -> Dict:
+        prompt, params = self._prepare_request(grade, topic, feedback)
+        breaker = self.breaker
+        
+        async def attempt(timeout):
+            response = await breaker.acall(self._acall_hf_api, prompt, session, timeout=timeout, parameters=params)
+            return self._parse_response(response)
+        
+        content = await self.retry_policy.acall(attempt)
+        self._cache_put(key, content)
+        return content
+    
+    async def agenerate_sample(self, grade: int, topic: str, temperature: Optional[float] = None,
+                               session: Optional[aiohttp.ClientSession] = None) -> Optional[Dict]:
+        """
+        One independent generation, for racing several candidates
+        
+        Skips the caches and request coalescing (identical candidates must not
+        share a call) and returns None instead of the template fallback when
+        the API fails.
+        
+        Args:
+            grade: Student grade level (1-12)
+            topic: Educational topic to explain
+            temperature: Sampling temperature for this candidate (defaults to generation_params)
+            session: aiohttp session to use (defaults to the loop's pooled session)
+        """
+        prompt, params = self._prepare_request(grade, topic)
+        if temperature is not None:
+            params = {**params, "temperature": temperature}
+        breaker = self.breaker
+        
+        async def attempt(timeout):
+            response = await breaker.acall(self._acall_hf_api, prompt, session, timeout=timeout, parameters=params)
+            return self._parse_response(response)
         
-        # Call Hugging Face API
-        max_retries = 3
-        for attempt in range(max_retries):
+        try:
+            return await self.retry_policy.acall(attempt)
+        except Exception:
+            return None
+    
+    def cached_content(self, grade: int, topic: str) -> Optional[Dict]:
+        """Content a first generation would be served from the caches, if any"""
+        return self._cached(self._request_key(grade, topic), grade, topic, None)
+    
+    def cache_content(self, grade: int, topic: str, content: Dict):
+        """Cache content generated outside generate_content for the (grade, topic) request"""
+        self._cache_put(self._request_key(grade, topic), content)
+    
+    def stream_content(self, grade: int, topic: str, feedback: List[str] = None) -> Iterator[Tuple[str, object]]:
+        """
+        Generate content with token streaming, yielding pieces as they complete
+        
+        Yields (EXPLANATION, str) once the explanation is written, (MCQ, dict)
+        for each finished question, and always ends with (CONTENT, dict) - the
+        final content. A stream that fails or can't be parsed is retried under
+        retry_policy like generate_content, without repeating pieces already
+        yielded; only if every attempt fails is the final content the template
+        fallback. Either way it may differ from the pieces already yielded.
+        
+        Args:
+            grade: Student grade level (1-12)
+            topic: Educational topic to explain
+            feedback: Optional feedback from reviewer for refinement
+        """
+        key = self._request_key(grade, topic, feedback)
+        cached = self._cached(key, grade, topic, feedback)
+        if cached is not None:
+            yield EXPLANATION, cached.get('explanation', '')
+            for mcq in cached.get('mcqs', []):
+                yield MCQ, mcq
+            yield CONTENT, cached
+            return
+        
+        # Joiners of an identical in-flight stream replay it from the start
+        yield from self.single_flight.stream(key, lambda: self._stream(grade, topic, feedback, key))
+    
+    def _stream(self, grade: int, topic: str, feedback: Optional[List[str]], key: str) -> Iterator[Tuple[str, object]]:
+        prompt, params = self._prepare_request(grade, topic, feedback)
+        breaker = self.breaker
+        policy = self.retry_policy
+        started = policy.clock()
+        attempt = 0
+        # Pieces already yielded; a retried stream replays them, and they can't be taken back
+        shown = 0
+        
+        while True:
+            attempt += 1
+            parser = IncrementalContentParser()
+            pieces = 0
             try:
-                response = self._call_hf_api(prompt)
-                content = self._parse_response(response)
-                return content
+                stream = breaker.call(self._open_hf_stream, prompt, timeout=policy.attempt_timeout(started),
+                                      parameters=params)
+                with stream:
+                    for token in stream:
+                        for piece in parser.feed(token):
+                            pieces += 1
+                            if pieces > shown:
+                                shown = pieces
+                                yield piece
+                content = self._parse_response(parser.text)
+                break
             except Exception as e:
-                if attempt < max_retries - 1:
-                    time.sleep(2)  # Wait before retry
-                    continue
-                else:
-                    # Fallback to template-based generation if API fails
-                    return self._fallback_generation(grade, topic)
+                delay = policy.next_delay(attempt, e, started)
+                if delay is None:
+                    yield CONTENT, self._fallback_generation(grade, topic)
+                    return
+                if delay:
+                    policy.sleep(delay)
+        
+        self._cache_put(key, content)
+        yield CONTENT, content
     
-    def _build_prompt(self, grade: int, topic: str, feedback: List[str] = None) -> str:
-        """Build the prompt for content generation"""
+    def refine_content(self, grade: int, topic: str, content: Dict, parts: Dict) -> Dict:
+        """
+        Regenerate only the parts of content the reviewer flagged
         
-        feedback_section = ""
-        if feedback:
-            feedback_section = f"\n\nIMPORTANT - Address this feedback:\n" + "\n".join([f"- {f}" for f in feedback])
+        The explanation and each MCQ with feedback are rewritten (and missing
+        MCQs added) in one smaller API call, then merged into a copy of the
+        content. Broken structure falls back to a full regeneration.
         
-        prompt = f"""You are an educational content creator. Create content for Grade {grade} students about "{topic}".
-
-REQUIREMENTS:
-- Use simple language appropriate for {grade}-year-old students
-- Provide a clear, easy-to-understand explanation
-- Create 3 multiple choice questions to test understanding
-- Each question should have 4 options (A, B, C, D)
-- Include the correct answer for each question
+        Args:
+            grade: Student grade level (1-12)
+            topic: Educational topic to explain
+            content: Content that failed review
+            parts: Per-part feedback from ReviewerAgent.review_parts
+            
+        Returns:
+            Dictionary with explanation and MCQs
+        """
+        targets = self._refinement_targets(content, parts)
+        if targets is None:
+            return self.generate_content(grade, topic, feedback=self._all_feedback(parts))
+        if not any(targets):
+            return copy.deepcopy(content)
+        
+        prompt = self._build_refinement_prompt(grade, topic, content, parts, targets)
+        params = self._refinement_params(grade, targets)
+        validate = self._refinement_validator(targets)
+        breaker = self.breaker
+        
+        def refine():
+            try:
+                revision = self.retry_policy.call(lambda timeout: extract_content(
+                    breaker.call(self._call_hf_api, prompt, timeout=timeout, parameters=params), validate
+                ))
+            except Exception:
+                return self._fallback_generation(grade, topic)
+            return self._merge_refinement(content, revision, targets)
+        
+        return self.single_flight.do(self._refinement_key(grade, topic, content, parts), refine)
+    
+    async def arefine_content(self, grade: int, topic: str, content: Dict, parts: Dict,
+                              session: Optional[aiohttp.ClientSession] = None, fallback: bool = True) -> Dict:
+        """Async counterpart of refine_content (fallback as for agenerate_content)"""
+        targets = self._refinement_targets(content, parts)
+        if targets is None:
+            return await self.agenerate_content(grade, topic, feedback=self._all_feedback(parts), session=session,
+                                                fallback=fallback)
+        if not any(targets):
+            return copy.deepcopy(content)
+        
+        prompt = self._build_refinement_prompt(grade, topic, content, parts, targets)
+        params = self._refinement_params(grade, targets)
+        validate = self._refinement_validator(targets)
+        breaker = self.breaker
+        
+        async def attempt(timeout):
+            response = await breaker.acall(self._acall_hf_api, prompt, session, timeout=timeout, parameters=params)
+            return extract_content(response, validate)
+        
+        async def refine():
+            revision = await self.retry_policy.acall(attempt)
+            return self._merge_refinement(content, revision, targets)
+        
+        try:
+            return await self.single_flight.ado(self._refinement_key(grade, topic, content, parts), refine)
+        except Exception:
+            if not fallback:
+                raise
+            return self._fallback_generation(grade, topic)
+    
+    @staticmethod
+    def _all_feedback(parts: Dict) -> List[str]:
+        feedback = parts["structure"] + parts["explanation"]
+        for mcq_feedback in parts["mcqs"]:
+            feedback.extend(mcq_feedback)
+        return feedback
+    
+    def _refinement_targets(self, content: Dict, parts: Dict) -> Optional[Tuple[bool, List[int], int]]:
+        """(rewrite explanation, MCQ indices to rewrite, MCQs to add) - None if the structure is broken"""
+        mcqs = content.get('mcqs')
+        if not isinstance(content.get('explanation'), str) or not isinstance(mcqs, list):
+            return None
+        
+        rewrite = [i for i, mcq_feedback in enumerate(parts["mcqs"]) if mcq_feedback]
+        missing = max(0, self.MIN_MCQS - len(mcqs))
+        return bool(parts["explanation"]), rewrite, missing
+    
+    def _refinement_params(self, grade: int, targets: Tuple[bool, List[int], int]) -> Dict:
+        """Generation parameters with max_new_tokens sized to the parts being rewritten"""
+        fix_explanation, rewrite, missing = targets
+        budget = self.prompt_builder.output_budget(grade, len(rewrite) + missing, explanation=fix_explanation)
+        return self._with_max_new_tokens(budget)
+    
+    def _with_max_new_tokens(self, budget: int) -> Dict:
+        # generation_params["max_new_tokens"] stays the hard cap
+        return {**self.generation_params,
+                "max_new_tokens": min(budget, self.generation_params["max_new_tokens"])}
+    
+    @staticmethod
+    def _refinement_validator(targets: Tuple[bool, List[int], int]):
+        fix_explanation, rewrite, missing = targets
+        needed = len(rewrite) + missing
+        
+        def validate(value) -> bool:
+            if not isinstance(value, dict):
+                return False
+            if fix_explanation and not isinstance(value.get('explanation'), str):
+                return False
+            if needed:
+                mcqs = value.get('mcqs')
+                if not isinstance(mcqs, list) or len(mcqs) < needed:
+                    return False
+                return all(validate_mcq(mcq) for mcq in mcqs[:needed])
+            return True
+        
+        return validate
+    
+    def _build_refinement_prompt(self, grade: int, topic: str, content: Dict, parts: Dict,
+                                 targets: Tuple[bool, List[int], int]) -> str:
+        """Prompt that asks only for the flagged parts"""
+        fix_explanation, rewrite, missing = targets
+        sections = []
+        
+        if fix_explanation:
+            sections.append(
+                f"EXPLANATION TO REWRITE (2-3 simple paragraphs):\n{content['explanation']}\n"
+                + "Address this feedback:\n"
+                + "\n".join(f"- {f}" for f in self.prompt_builder.compact_feedback(parts["explanation"]))
+            )
+        else:
+            sections.append(f"EXPLANATION (for context only - do not rewrite it):\n{content['explanation']}")
+        
+        for i in rewrite:
+            mcq = content['mcqs'][i]
+            sections.append(
+                f"QUESTION {i + 1} TO REWRITE:\n{json.dumps(mcq)}\n"
+                + "Address this feedback:\n"
+                + "\n".join(f"- {f}" for f in self.prompt_builder.compact_feedback(parts["mcqs"][i]))
+            )
+        
+        if missing:
+            existing = "\n".join(f"- {mcq.get('question', '')}" for mcq in content['mcqs'] if isinstance(mcq, dict))
+            sections.append(f"WRITE {missing} NEW QUESTION(S) that differ from the existing ones:\n{existing}")
+        
+        response_format = {}
+        if fix_explanation:
+            response_format["explanation"] = "Rewritten explanation"
+        new_mcqs = [f"Rewritten question {i + 1}" for i in rewrite] + ["New question"] * missing
+        if new_mcqs:
+            response_format["mcqs"] = [
+                {"question": f"{label} text?",
+                 "options": ["A) option1", "B) option2", "C) option3", "D) option4"],
+                 "answer": "A"}
+                for label in new_mcqs
+            ]
+        
+        sections_text = "\n\n".join(sections)
+        return f"""You are an educational content creator improving content for Grade {grade} students about "{topic}".
+Use simple language appropriate for {grade}-year-old students. Only produce the parts requested below.
+Each question must have 4 options (A, B, C, D) and the letter of the correct answer.
 
-{feedback_section}
+{sections_text}
 
-Respond ONLY with valid JSON in this exact format:
-{{
-  "explanation": "Your explanation here in 2-3 simple paragraphs",
-  "mcqs": [
-    {{
-      "question": "First question text?",
-      "options": ["A) option1", "B) option2", "C) option3", "D) option4"],
-      "answer": "A"
-    }},
-    {{
-      "question": "Second question text?",
-      "options": ["A) option1", "B) option2", "C) option3", "D) option4"],
-      "answer": "B"
-    }},
-    {{
-      "question": "Third question text?",
-      "options": ["A) option1", "B) option2", "C) option3", "D) option4"],
-      "answer": "C"
-    }}
-  ]
-}}
+Respond ONLY with valid JSON in this exact format, questions in the order listed above:
+{json.dumps(response_format, indent=2)}
 
 Generate the JSON now:"""
+    
+    @staticmethod
+    def _merge_refinement(content: Dict, revision: Dict, targets: Tuple[bool, List[int], int]) -> Dict:
+        """Copy of content with the rewritten parts swapped in"""
+        fix_explanation, rewrite, missing = targets
+        merged = copy.deepcopy(content)
+        if fix_explanation:
+            merged['explanation'] = revision['explanation']
         
-        return prompt
-    
-    def _call_hf_api(self, prompt: str) -> str:
-        """Call Hugging Face API"""
-        payload = {
-            "inputs": prompt,
-            "parameters": {
-                "max_new_tokens": 800,
-                "temperature": 0.7,
-                "top_p": 0.9,
-                "return_full_text": False
-            }
-        }
+        new_mcqs = revision.get('mcqs', [])
+        for position, i in enumerate(rewrite):
+            merged['mcqs'][i] = new_mcqs[position]
+        merged['mcqs'].extend(new_mcqs[len(rewrite):len(rewrite) + missing])
+        return merged
+    
+    def _request_key(self, grade: int, topic: str, feedback: List[str] = None) -> str:
+        """Key identifying equivalent requests, for caching and coalescing"""
+        return GenerationCache.make_key(grade, topic, feedback, self._model_params())
+    
+    def _refinement_key(self, grade: int, topic: str, content: Dict, parts: Dict) -> str:
+        # The content being refined and its review stand in for feedback
+        return self._request_key(grade, topic, [json.dumps({"refine": content, "parts": parts}, sort_keys=True)])
+    
+    def remember_reviewed(self, grade: int, topic: str, content: Dict, review: Dict) -> bool:
+        """
+        Offer content that passed review to the semantic cache
         
-        response = requests.post(
-            self.api_url,
-            headers=self.headers,
-            json=payload,
-            timeout=30
-        )
-        
-        if response.status_code == 200:
-            result = response.json()
-            if isinstance(result, list) and len(result) > 0:
-                return result[0].get('generated_text', '')
-            return ''
-        else:
-            raise Exception(f"API call failed: {response.status_code}")
+        Template fallback content is skipped - it is cheap to rebuild and
+        generic content must not be served for other topics.
+        
+        Returns:
+            Whether the content was cached
+        """
+        if self.semantic_cache is None or review.get('status') != 'pass':
+            return False
+        if content == self._fallback_generation(grade, topic):
+            return False
+        self.semantic_cache.add(grade, topic, content, self.backend.model_id)
+        return True
+    
+    def _cached(self, key: str, grade: int, topic: str, feedback: Optional[List[str]]) -> Optional[Dict]:
+        """Exact cache hit, else reviewed content for a near-identical topic (first generations only)"""
+        cached = self._cache_get(key)
+        if cached is None and self.semantic_cache is not None and not feedback:
+            cached = self.semantic_cache.lookup(grade, topic, self.backend.model_id)
+        return cached
+    
+    def _cache_get(self, key: str) -> Optional[Dict]:
+        return self.cache.get(key) if self.cache is not None else None
+    
+    def _cache_put(self, key: str, content: Dict):
+        if self.cache is not None:
+            self.cache.put(key, content)
+    
+    def _model_params(self) -> Dict:
+        """Model identity and sampling parameters that affect the output"""
+        return {"api_url": self.backend.model_id, **self.generation_params}
+    
+    def _prepare_request(self, grade: int, topic: str, feedback: List[str] = None) -> Tuple[str, Dict]:
+        """Build the prompt for content generation and the generation parameters to send with it"""
+        prompt, max_new_tokens = self.prompt_builder.build(grade, topic, feedback)
+        return prompt, self._with_max_new_tokens(max_new_tokens)
+    
+    def _call_hf_api(self, prompt: str, timeout: float = 30, parameters: Optional[Dict] = None) -> str:
+        """Call the inference backend (the Hugging Face API unless configured otherwise)"""
+        return self.backend.generate(prompt, parameters or self.generation_params, timeout)
+    
+    def _open_hf_stream(self, prompt: str, timeout: float = 30,
+                        parameters: Optional[Dict] = None) -> TokenStream:
+        """Start a streamed call to the inference backend"""
+        return self.backend.open_stream(prompt, parameters or self.generation_params, timeout)
+    
+    async def _acall_hf_api(self, prompt: str, session: Optional[aiohttp.ClientSession] = None,
+                            timeout: float = 30, parameters: Optional[Dict] = None) -> str:
+        """Call the inference backend without blocking the event loop"""
+        return await self.backend.agenerate(prompt, parameters or self.generation_params, timeout, session)
     
     def _parse_response(self, response_text: str) -> Dict:
         """Parse API response to extract JSON"""
-        # Try to find JSON in the response
-        try:
-            # Look for JSON object in the text
-            start = response_text.find('{')
-            end = response_text.rfind('}') + 1
-            
-            if start != -1 and end > start:
-                json_str = response_text[start:end]
-                content = json.loads(json_str)
-                
-                # Validate structure
-                if 'explanation' in content and 'mcqs' in content:
-                    return content
-        except:
-            pass
-        
-        # If parsing fails, raise exception to trigger fallback
-        raise Exception("Failed to parse response")
+        # Raises ResponseParseError to trigger a resample or fallback
+        return extract_content(response_text)
     
     def _fallback_generation(self, grade: int, topic: str) -> Dict:
         """
         Fallback content generation using templates when API fails
         This ensures the app always works even without API access
         """
+        # Reviewed content from the template library, matched on a normalised or fuzzy topic
+        library = self.template_library or get_template_library()
+        if library is not None:
+            content = library.lookup(grade, topic)
+            if content is not None:
+                return content
         
-        # Grade-appropriate vocabulary
-        grade_language = {
-            1: "very simple",
-            2: "simple", 
-            3: "easy",
-            4: "clear",
-            5: "straightforward"
-        }
-        
-        lang_level = grade_language.get(grade, "clear")
-        
-        # Template-based content for common topics
-        templates = {
-            "types of angles": {
-                "explanation": f"""Angles are everywhere around us! When two lines meet at a point, they make an angle.
-
-There are different types of angles based on how big they are. A right angle is like the corner of a book - it makes an 'L' shape. An acute angle is smaller than a right angle, like a slice of pizza. An obtuse angle is bigger than a right angle, like when you open a door wide.
-
-Learning about angles helps us understand shapes and spaces better!""",
-                "mcqs": [
-                    {
-                        "question": "What does a right angle look like?",
-                        "options": ["A) Like the corner of a book", "B) Like a full circle", "C) Like a straight line", "D) Like the letter Z"],
-                        "answer": "A"
-                    },
-                    {
-                        "question": "Which angle is smaller than a right angle?",
-                        "options": ["A) Obtuse angle", "B) Straight angle", "C) Acute angle", "D) Full angle"],
-                        "answer": "C"
-                    },
-                    {
-                        "question": "An obtuse angle is:",
-                        "options": ["A) Smaller than a right angle", "B) Bigger than a right angle", "C) Equal to a right angle", "D) Always 180 degrees"],
-                        "answer": "B"
-                    }
-                ]
-            }
-        }
-        
-        # Check if we have a template for this topic
-        topic_lower = topic.lower()
-        if topic_lower in templates:
-            return templates[topic_lower]
+        lang_level = self.GRADE_LANGUAGE.get(grade, "clear")
         
         # Generic fallback
         return {
@@ -0,0 +1,88 @@
+"""
+HTTP Session Pool - Shared keep-alive connections for inference API calls
+One pooled requests.Session per pool configuration, shared by every agent in the process,
+and one aiohttp.ClientSession per event loop for the async path
+"""
+
+import asyncio
+import threading
+import weakref
+from typing import Dict, Tuple
+
+import aiohttp
+import requests
+from requests.adapters import HTTPAdapter
+
+_sessions: Dict[Tuple, requests.Session] = {}
+_sessions_lock = threading.Lock()
+
+# aiohttp sessions are bound to the loop they were created on
+_async_sessions = weakref.WeakKeyDictionary()
+
+
+def get_shared_session(pool_connections: int = 4, pool_maxsize: int = 16,
+                       pool_block: bool = False, keep_alive: bool = True) -> requests.Session:
+    """
+    Return the process-wide pooled session for a pool configuration
+    
+    Args:
+        pool_connections: Number of per-host connection pools to keep
+        pool_maxsize: Connections kept open per host
+        pool_block: Block instead of opening extra connections once a host
+            has pool_maxsize connections in use (hard per-host limit)
+        keep_alive: Reuse connections between requests
+    
+    Returns:
+        A requests.Session that is safe to share between Streamlit sessions
+    """
+    key = (pool_connections, pool_maxsize, pool_block, keep_alive)
+    
+    with _sessions_lock:
+        session = _sessions.get(key)
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(
+                pool_connections=pool_connections,
+                pool_maxsize=pool_maxsize,
+                pool_block=pool_block
+            )
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            if not keep_alive:
+                session.headers["Connection"] = "close"
+            _sessions[key] = session
+        return session
+
+
+def close_shared_sessions():
+    """Close every pooled session (e.g. on shutdown or in tests)"""
+    with _sessions_lock:
+        for session in _sessions.values():
+            session.close()
+        _sessions.clear()
+
+
+def get_async_session(limit: int = 100, limit_per_host: int = 16) -> aiohttp.ClientSession:
+    """
+    Return the pooled aiohttp session for the running event loop
+    
+    Args:
+        limit: Total simultaneous connections
+        limit_per_host: Simultaneous connections per host
+        
+    Must be called from inside a coroutine. Close it with close_async_session().
+    """
+    loop = asyncio.get_running_loop()
+    session = _async_sessions.get(loop)
+    if session is None or session.closed:
+        connector = aiohttp.TCPConnector(limit=limit, limit_per_host=limit_per_host)
+        session = aiohttp.ClientSession(connector=connector)
+        _async_sessions[loop] = session
+    return session
+
+
+async def close_async_session():
+    """Close the running loop's pooled aiohttp session, if any"""
+    session = _async_sessions.pop(asyncio.get_running_loop(), None)
+    if session is not None:
+        await session.close()
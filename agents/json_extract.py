@@ -0,0 +1,229 @@
+"""
+JSON Extraction - Pull the content object out of free-form model output
+Single-pass, brace-balanced and string-aware, with repairs for common LLM JSON faults
+"""
+
+import json
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+from .retry import ResponseParseError
+
+# How far back to look for a complete element when a response was cut off
+MAX_TRUNCATION_CANDIDATES = 16
+
+_CLOSERS = {'{': '}', '[': ']'}
+# A single quote only opens a string where a JSON value or key can start
+_VALUE_START = set('{[,:')
+
+
+def validate_mcq(mcq) -> bool:
+    """Whether a parsed MCQ has a question, string options and an answer"""
+    if not isinstance(mcq, dict):
+        return False
+    if not isinstance(mcq.get('question'), str) or not isinstance(mcq.get('answer'), str):
+        return False
+    options = mcq.get('options')
+    return isinstance(options, list) and all(isinstance(option, str) for option in options)
+
+
+def validate_content(content) -> bool:
+    """Whether a parsed object has the explanation/mcqs shape the app renders"""
+    if not isinstance(content, dict):
+        return False
+    if not isinstance(content.get('explanation'), str) or not isinstance(content.get('mcqs'), list):
+        return False
+    return all(validate_mcq(mcq) for mcq in content['mcqs'])
+
+
+def iter_json_candidates(text: str) -> Iterator[Tuple[str, bool]]:
+    """
+    Yield each top-level {...} fragment of text in order
+    
+    Brace matching skips braces inside strings. Yields (fragment, terminated);
+    only the last fragment can be unterminated (the response was cut off).
+    """
+    start = None
+    depth = 0
+    quote = None
+    escape = False
+    last = ''
+    
+    for i, char in enumerate(text):
+        if quote:
+            if escape:
+                escape = False
+            elif char == '\\':
+                escape = True
+            elif char == quote:
+                quote = None
+                last = '"'
+            continue
+        
+        if start is None:
+            if char == '{':
+                start, depth, last = i, 1, '{'
+            continue
+        
+        if char == '"' or (char == "'" and last in _VALUE_START):
+            quote = char
+        elif char in '{[':
+            depth += 1
+        elif char in '}]':
+            depth -= 1
+            if depth == 0:
+                yield text[start:i + 1], True
+                start = None
+                continue
+        if not char.isspace():
+            last = char
+    
+    if start is not None:
+        yield text[start:], False
+
+
+def repair_json(fragment: str) -> List[str]:
+    """
+    Rewrite a JSON-like fragment into candidate strict JSON texts
+    
+    Converts single-quoted strings, drops trailing commas and closes any open
+    containers. For a cut-off fragment the first candidate closes everything at
+    the end (unless it stops inside a string, which would keep a half-written
+    value); the rest cut back to earlier element boundaries so a half-written
+    last element is dropped.
+    """
+    out = []
+    stack = []
+    quote = None
+    escape = False
+    last = ''
+    # (output length, open containers) at each element-separating comma
+    checkpoints = []
+    
+    for char in fragment:
+        if quote:
+            if escape:
+                escape = False
+                if char == "'":
+                    # \' is not a JSON escape
+                    out[-1] = "'"
+                    continue
+                out.append(char)
+            elif char == '\\':
+                escape = True
+                out.append(char)
+            elif char == quote:
+                quote = None
+                out.append('"')
+                last = '"'
+            elif char == '"':
+                out.append('\\"')
+            else:
+                out.append(char)
+            continue
+        
+        if char == '"' or (char == "'" and last in _VALUE_START):
+            quote = char
+            out.append('"')
+            continue
+        if char in '{[':
+            stack.append(_CLOSERS[char])
+        elif char in '}]':
+            _strip_trailing_comma(out)
+            if stack and stack[-1] == char:
+                stack.pop()
+        elif char == ',':
+            checkpoints.append((len(out), tuple(stack)))
+        out.append(char)
+        if not char.isspace():
+            last = char
+    
+    if not quote and not stack:
+        return [''.join(out)]
+    
+    # Cut off mid-way: close what is open now, then try earlier boundaries
+    candidates = [] if quote else [_close(out, stack)]
+    for length, open_stack in reversed(checkpoints[-MAX_TRUNCATION_CANDIDATES:]):
+        candidates.append(_close(out[:length], list(open_stack)))
+    return candidates
+
+
+def _strip_trailing_comma(out: List[str]):
+    i = len(out) - 1
+    while i >= 0 and out[i].isspace():
+        i -= 1
+    if i >= 0 and out[i] == ',':
+        del out[i]
+
+
+def _close(out: List[str], stack: List[str]) -> str:
+    text = ''.join(out).rstrip()
+    if text.endswith(','):
+        text = text[:-1]
+    elif text.endswith(':'):
+        text += ' null'
+    return text + ''.join(reversed(stack))
+
+
+# strict=False accepts raw newlines inside strings, which models emit freely
+_decoder = json.JSONDecoder(strict=False)
+
+
+def _loads(text: str):
+    return _decoder.decode(text)
+
+
+def _find_content(value, validate: Callable) -> Optional[Dict]:
+    """The value itself if it validates, else the first valid object nested in it"""
+    if validate(value):
+        return value
+    children = value.values() if isinstance(value, dict) else value if isinstance(value, list) else ()
+    for child in children:
+        if isinstance(child, (dict, list)):
+            found = _find_content(child, validate)
+            if found is not None:
+                return found
+    return None
+
+
+def extract_content(text: str, validate: Callable[[object], bool] = validate_content) -> Dict:
+    """
+    Extract the first valid {"explanation", "mcqs"} object from model output
+    
+    Surrounding prose, code fences, extra braces and further JSON objects are
+    ignored. Fragments that are not strict JSON are repaired before giving up.
+    
+    Args:
+        text: Raw model output
+        validate: Schema check for the wanted object (defaults to full content)
+    
+    Raises:
+        ResponseParseError: if no fragment yields valid content
+    """
+    # Fast path: well-formed object at the first '{', whatever follows it
+    start = text.find('{')
+    if start != -1:
+        try:
+            value, _ = _decoder.raw_decode(text, start)
+        except ValueError:
+            value = None
+        if validate(value):
+            return value
+    
+    while True:
+        fragment = None
+        for fragment, terminated in iter_json_candidates(text):
+            attempts = [fragment] if terminated else []
+            for candidate in attempts + repair_json(fragment):
+                try:
+                    value = _loads(candidate)
+                except ValueError:
+                    continue
+                found = _find_content(value, validate)
+                if found is not None:
+                    return found
+        
+        # A stray '{' in prose can swallow the real object into one unterminated
+        # fragment - rescan from just after it
+        if fragment is None or terminated:
+            raise ResponseParseError("Failed to parse response")
+        text = fragment[1:]
@@ -0,0 +1,166 @@
+"""
+Prompt Templates - Precompiled generation prompts with token budgets
+Static prompt text is built once per grade; output caps and feedback are sized to fit
+"""
+
+import re
+import threading
+from typing import Dict, List, Optional, Tuple
+
+# Rough characters per token for English text with the Mistral tokenizer
+CHARS_PER_TOKEN = 4
+
+_NUMBER = re.compile(r'\d+')
+_SPACE = re.compile(r'\s+')
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate (no tokenizer round trip)"""
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+class PromptBuilder:
+    """
+    Builds generation prompts from per-grade precompiled templates
+    
+    The static parts of the prompt (requirements and response format) are
+    rendered once per (grade, MCQ count); a request only joins in the topic and
+    feedback. Output is capped by an estimate of the tokens the requested
+    content needs rather than a fixed maximum.
+    """
+    
+    # Estimated output tokens for the explanation by highest grade in the band
+    EXPLANATION_TOKENS = ((3, 220), (6, 280), (12, 350))
+    # One question, four options, the answer and its JSON punctuation
+    MCQ_TOKENS = 90
+    # Braces, keys and whitespace around the content
+    JSON_OVERHEAD_TOKENS = 30
+    # Headroom so a slightly long answer is not cut off mid-JSON
+    SAFETY_MARGIN = 1.15
+    
+    def __init__(self, max_new_tokens: int = 800, feedback_budget: int = 200):
+        """
+        Args:
+            max_new_tokens: Hard cap on generated tokens
+            feedback_budget: Prompt tokens allowed for reviewer feedback
+        """
+        self.max_new_tokens = max_new_tokens
+        self.feedback_budget = feedback_budget
+        self._templates: Dict[Tuple[int, int], Tuple[str, str, str]] = {}
+        self._lock = threading.Lock()
+    
+    def output_budget(self, grade: int, mcq_count: int = 3, explanation: bool = True) -> int:
+        """max_new_tokens for an explanation (optional) plus mcq_count questions"""
+        tokens = self.JSON_OVERHEAD_TOKENS + mcq_count * self.MCQ_TOKENS
+        if explanation:
+            tokens += self.explanation_tokens(grade)
+        return min(self.max_new_tokens, int(tokens * self.SAFETY_MARGIN))
+    
+    def explanation_tokens(self, grade: int) -> int:
+        for max_grade, tokens in self.EXPLANATION_TOKENS:
+            if grade <= max_grade:
+                return tokens
+        return self.EXPLANATION_TOKENS[-1][1]
+    
+    def build(self, grade: int, topic: str, feedback: Optional[List[str]] = None,
+              mcq_count: int = 3) -> Tuple[str, int]:
+        """
+        Render the generation prompt
+        
+        Returns:
+            (prompt, max_new_tokens)
+        """
+        head, middle, tail = self._template(grade, mcq_count)
+        
+        feedback_section = ""
+        feedback = self.compact_feedback(feedback)
+        if feedback:
+            feedback_section = "\n\nIMPORTANT - Address this feedback:\n" + "\n".join(f"- {f}" for f in feedback)
+        
+        return head + topic + middle + feedback_section + tail, self.output_budget(grade, mcq_count)
+    
+    def compact_feedback(self, feedback: Optional[List[str]], budget: Optional[int] = None) -> List[str]:
+        """
+        Deduplicate feedback and trim it to a token budget
+        
+        Items differing only in numbers ("Sentence 2 is too long (24 words)...")
+        are merged into the first one with a count. Critical items (must /
+        missing) are kept first; the rest fill the budget in their original order.
+        """
+        if not feedback:
+            return []
+        budget = self.feedback_budget if budget is None else budget
+        
+        groups: Dict[str, List[str]] = {}
+        for item in feedback:
+            item = item.strip()
+            if not item or item == "Content looks good!":
+                continue
+            key = _SPACE.sub(' ', _NUMBER.sub('#', item.lower()))
+            groups.setdefault(key, []).append(item)
+        
+        merged = []
+        for items in groups.values():
+            item = items[0]
+            if len(items) > 1:
+                item += f" (and {len(items) - 1} similar)"
+            merged.append(item)
+        
+        critical = [f for f in merged if 'must' in f.lower() or 'missing' in f.lower()]
+        ordered = critical + [f for f in merged if f not in critical]
+        
+        kept = set()
+        used = 0
+        for item in ordered:
+            cost = estimate_tokens(item) + 1
+            if used + cost > budget:
+                continue
+            kept.add(item)
+            used += cost
+        return [f for f in merged if f in kept]
+    
+    def _template(self, grade: int, mcq_count: int) -> Tuple[str, str, str]:
+        key = (grade, mcq_count)
+        template = self._templates.get(key)
+        if template is None:
+            with self._lock:
+                template = self._templates.setdefault(key, self._compile(grade, mcq_count))
+        return template
+    
+    @staticmethod
+    def _compile(grade: int, mcq_count: int) -> Tuple[str, str, str]:
+        """Static prompt text around the topic and feedback slots"""
+        ordinals = ["First", "Second", "Third", "Fourth", "Fifth", "Sixth"]
+        letters = "ABCD"
+        examples = ",\n".join(
+            "    {\n"
+            f'      "question": "{ordinals[i] if i < len(ordinals) else f"Question {i + 1}"} question text?",\n'
+            '      "options": ["A) option1", "B) option2", "C) option3", "D) option4"],\n'
+            f'      "answer": "{letters[i % 4]}"\n'
+            "    }"
+            for i in range(mcq_count)
+        )
+        
+        head = f'You are an educational content creator. Create content for Grade {grade} students about "'
+        middle = f'''".
+
+REQUIREMENTS:
+- Use simple language appropriate for {grade}-year-old students
+- Provide a clear, easy-to-understand explanation
+- Create {mcq_count} multiple choice questions to test understanding
+- Each question should have 4 options (A, B, C, D)
+- Include the correct answer for each question
+
+'''
+        tail = f'''
+
+Respond ONLY with valid JSON in this exact format:
+{{
+  "explanation": "Your explanation here in 2-3 simple paragraphs",
+  "mcqs": [
+{examples}
+  ]
+}}
+
+Generate the JSON now:'''
+        return head, middle, tail
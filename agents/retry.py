@@ -0,0 +1,181 @@
+"""
+Retry Policy - Classified retries with exponential backoff for inference API calls
+Distinguishes transient failures (rate limits, model loading, timeouts) from permanent ones
+"""
+
+import asyncio
+import random
+import time
+from email.utils import parsedate_to_datetime
+from typing import Awaitable, Callable, Optional
+
+import aiohttp
+import requests
+
+# HTTP statuses worth retrying: rate limiting, model loading and gateway hiccups
+TRANSIENT_STATUSES = {408, 425, 429, 500, 502, 503, 504}
+
+
+class APIError(Exception):
+    """Failed inference API call"""
+    
+    def __init__(self, message: str, status: Optional[int] = None, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.status = status
+        # Seconds the server asked us to wait (Retry-After or model-loading estimated_time)
+        self.retry_after = retry_after
+
+
+class TransientAPIError(APIError):
+    """Failure that may succeed if retried later"""
+
+
+class PermanentAPIError(APIError):
+    """Failure that will not go away by retrying (bad request, auth, unknown model)"""
+
+
+class ResponseParseError(Exception):
+    """The model answered but the content could not be parsed"""
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Parse a Retry-After header given as seconds or as an HTTP date"""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def error_for_status(status: int, body=None, retry_after_header: Optional[str] = None) -> APIError:
+    """Build a classified APIError from a non-200 response"""
+    retry_after = parse_retry_after(retry_after_header)
+    
+    # HF returns {"error": "Model ... is currently loading", "estimated_time": 20.0} while warming up
+    if isinstance(body, dict) and body.get("estimated_time") is not None:
+        try:
+            estimated = float(body["estimated_time"])
+            retry_after = max(retry_after or 0.0, estimated)
+        except (TypeError, ValueError):
+            pass
+    
+    message = f"API call failed: {status}"
+    if status in TRANSIENT_STATUSES:
+        return TransientAPIError(message, status, retry_after)
+    return PermanentAPIError(message, status, retry_after)
+
+
+class RetryPolicy:
+    """
+    Retry an API call with exponential backoff, full jitter and an overall deadline
+    
+    Transient errors back off exponentially (or wait as long as the server asked),
+    parse failures are resampled immediately and everything else fails fast.
+    No wait extends past the deadline: if the server asks for longer than the
+    remaining budget we give up straight away.
+    """
+    
+    def __init__(self, max_attempts: int = 5, base_delay: float = 1.0, max_delay: float = 20.0,
+                 multiplier: float = 2.0, jitter: bool = True, deadline: float = 60.0,
+                 request_timeout: float = 30.0, sleep: Callable[[float], None] = time.sleep,
+                 async_sleep: Callable[[float], Awaitable] = asyncio.sleep,
+                 clock: Callable[[], float] = time.monotonic):
+        """
+        Args:
+            max_attempts: Total attempts including the first one
+            base_delay: Backoff before the first retry, in seconds
+            max_delay: Cap on a single backoff (server-requested waits may exceed it)
+            multiplier: Backoff growth factor per attempt
+            jitter: Use full jitter (uniform between 0 and the backoff)
+            deadline: Overall time budget for all attempts and waits, in seconds
+            request_timeout: Per-attempt timeout (shrunk to fit the deadline)
+            sleep, async_sleep, clock: Injectable for tests
+        """
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.multiplier = multiplier
+        self.jitter = jitter
+        self.deadline = deadline
+        self.request_timeout = request_timeout
+        self.sleep = sleep
+        self.async_sleep = async_sleep
+        self.clock = clock
+    
+    @staticmethod
+    def is_transient(error: BaseException) -> bool:
+        """Whether an error is worth retrying after a wait"""
+        if isinstance(error, TransientAPIError):
+            return True
+        if isinstance(error, (requests.Timeout, requests.ConnectionError)):
+            return True
+        return isinstance(error, (asyncio.TimeoutError, aiohttp.ClientConnectionError, aiohttp.ClientPayloadError))
+    
+    def backoff(self, attempt: int, error: BaseException) -> float:
+        """Seconds to wait before retry number `attempt` (1-based)"""
+        if isinstance(error, ResponseParseError):
+            return 0.0
+        
+        delay = min(self.max_delay, self.base_delay * self.multiplier ** (attempt - 1))
+        if self.jitter:
+            delay = random.uniform(0, delay)
+        
+        retry_after = getattr(error, "retry_after", None)
+        if retry_after is not None:
+            delay = max(delay, retry_after)
+        return delay
+    
+    def next_delay(self, attempt: int, error: BaseException, started: float) -> Optional[float]:
+        """Wait before the next attempt, or None to stop retrying"""
+        if attempt >= self.max_attempts:
+            return None
+        if not (isinstance(error, ResponseParseError) or self.is_transient(error)):
+            return None
+        
+        delay = self.backoff(attempt, error)
+        if self.clock() - started + delay >= self.deadline:
+            return None
+        return delay
+    
+    def attempt_timeout(self, started: float) -> float:
+        """Timeout for an attempt of a call that started at `started` (clock time)"""
+        return max(0.1, min(self.request_timeout, self.deadline - (self.clock() - started)))
+    
+    def call(self, fn: Callable[[float], object]):
+        """
+        Call fn(timeout) until it succeeds or the policy gives up
+        
+        Raises the last error when retries are exhausted or not allowed.
+        """
+        started = self.clock()
+        attempt = 0
+        while True:
+            attempt += 1
+            try:
+                return fn(self.attempt_timeout(started))
+            except Exception as e:
+                delay = self.next_delay(attempt, e, started)
+                if delay is None:
+                    raise
+                if delay:
+                    self.sleep(delay)
+    
+    async def acall(self, fn: Callable[[float], Awaitable]):
+        """Async counterpart of call - waits without blocking the event loop"""
+        started = self.clock()
+        attempt = 0
+        while True:
+            attempt += 1
+            try:
+                return await fn(self.attempt_timeout(started))
+            except Exception as e:
+                delay = self.next_delay(attempt, e, started)
+                if delay is None:
+                    raise
+                if delay:
+                    await self.async_sleep(delay)
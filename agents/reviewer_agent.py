@@ -3,10 +3,26 @@ Reviewer Agent - Evaluates educational content quality
 Checks for age-appropriateness, correctness, and clarity
 """
 
-import re
-from typing import Dict, List, Tuple
+from typing import Dict, List, Optional, Set, Tuple
+
+from utils.lexicon import get_lexicon
+from utils.phrase_matcher import PhraseMatcher, compile_phrases
+from utils.text_analysis import analyze
+
+
+def _singular(word: str) -> str:
+    """Crude singular, enough to match 'angle' to a topic about 'angles'"""
+    return word[:-1] if len(word) > 3 and word.endswith('s') and not word.endswith('ss') else word
+
 
 class ReviewerAgent:
+    # Signs an explanation speaks to the student (questions, examples, relatable content)
+    ENGAGEMENT_MARKERS = ('?', 'example', 'like', 'imagine', 'think about', 'we can')
+    # Question openers that only test recall
+    TRIVIAL_PATTERNS = ('what is', 'define', 'meaning of')
+    # Grades above the student's at which a word the lexicon knows counts as too complex
+    LEXICON_GRADE_MARGIN = 2
+    
     def __init__(self):
         # Grade-level vocabulary complexity thresholds
         self.max_word_length = {
@@ -14,6 +30,9 @@ class ReviewerAgent:
             6: 13, 7: 14, 8: 15, 9: 16, 10: 17
         }
         
+        # Word difficulty data; words it doesn't know (or all, if None) are judged by length
+        self.lexicon = get_lexicon()
+        
         # Words too complex for lower grades
         self.complex_words_by_grade = {
             1: ['complex', 'difficult', 'sophisticated', 'intricate'],
@@ -21,6 +40,11 @@ class ReviewerAgent:
             3: ['fundamental', 'essential', 'particular'],
             4: ['perpendicular', 'parallel', 'symmetrical'],
         }
+        
+        # Matchers compiled on first use; replace the dict rather than editing its lists
+        self._vocabulary_matchers: Dict[int, PhraseMatcher] = {}
+        self._engagement_matcher = compile_phrases(self.ENGAGEMENT_MARKERS)
+        self._trivial_matcher = compile_phrases(self.TRIVIAL_PATTERNS)
     
     def review_content(self, content: Dict, grade: int, topic: str) -> Dict:
         """
@@ -34,27 +58,59 @@ class ReviewerAgent:
         Returns:
             Dictionary with status (pass/fail) and feedback list
         """
-        feedback = []
+        return self.summarize(self.review_parts(content, grade, topic))
+    
+    def review_parts(self, content: Dict, grade: int, topic: str,
+                     previous: Optional[Tuple[Dict, Dict]] = None) -> Dict:
+        """
+        Review content part by part
+        
+        Args:
+            content: Generated content dictionary
+            grade: Target grade level
+            topic: Educational topic
+            previous: Optional (content, parts) from an earlier review; parts
+                identical to that content reuse its feedback instead of being
+                checked again
+            
+        Returns:
+            Dictionary with 'structure' and 'explanation' feedback lists and
+            'mcqs', one feedback list per question
+        """
+        old_content, old_parts = previous if previous else ({}, None)
         
         # Check structure
-        structure_feedback = self._check_structure(content)
-        feedback.extend(structure_feedback)
+        parts = {"structure": self._check_structure(content)}
         
         # Check explanation quality
-        explanation_feedback = self._check_explanation(
-            content.get('explanation', ''), 
-            grade, 
-            topic
-        )
-        feedback.extend(explanation_feedback)
+        explanation = content.get('explanation', '')
+        if old_parts is not None and 'explanation' in old_content and old_content['explanation'] == explanation:
+            parts["explanation"] = list(old_parts["explanation"])
+        else:
+            parts["explanation"] = self._check_explanation(explanation, grade, topic)
         
         # Check MCQs quality
-        mcq_feedback = self._check_mcqs(
-            content.get('mcqs', []), 
-            grade, 
-            topic
-        )
-        feedback.extend(mcq_feedback)
+        mcqs = content.get('mcqs', [])
+        old_mcqs = old_content.get('mcqs', []) if old_parts is not None else []
+        parts["mcqs"] = []
+        for i, mcq in enumerate(mcqs, 1):
+            if i <= len(old_mcqs) and old_mcqs[i - 1] == mcq:
+                parts["mcqs"].append(list(old_parts["mcqs"][i - 1]))
+            else:
+                parts["mcqs"].append(self._check_mcq(mcq, i, grade, topic))
+        
+        return parts
+    
+    def summarize(self, parts: Dict) -> Dict:
+        """
+        Combine per-part feedback from review_parts into an overall review
+        
+        Returns:
+            Dictionary with status (pass/fail) and feedback list
+        """
+        feedback = parts["structure"] + parts["explanation"]
+        for mcq_feedback in parts["mcqs"]:
+            feedback.extend(mcq_feedback)
         
         # Determine pass/fail
         critical_issues = [f for f in feedback if 'must' in f.lower() or 'missing' in f.lower()]
@@ -89,10 +145,9 @@ class ReviewerAgent:
             feedback.append("Explanation is too short - needs more detail")
             return feedback
         
-        # Check sentence length (age-appropriate)
-        sentences = re.split(r'[.!?]+', explanation)
-        sentences = [s.strip() for s in sentences if s.strip()]
+        doc = analyze(explanation)
         
+        # Check sentence length (age-appropriate)
         max_words_per_sentence = {
             1: 8, 2: 10, 3: 12, 4: 15, 5: 18,
             6: 20, 7: 22, 8: 25, 9: 28, 10: 30
@@ -100,8 +155,7 @@ class ReviewerAgent:
         
         max_words = max_words_per_sentence.get(grade, 20)
         
-        for i, sentence in enumerate(sentences, 1):
-            word_count = len(sentence.split())
+        for i, word_count in enumerate(doc.sentence_word_counts(), 1):
             if word_count > max_words + 5:
                 feedback.append(
                     f"Sentence {i} is too long ({word_count} words) for Grade {grade} - "
@@ -109,15 +163,12 @@ class ReviewerAgent:
                 )
         
         # Check for overly complex words
-        words = explanation.lower().split()
         max_length = self.max_word_length.get(grade, 12)
-        
-        complex_words_found = []
-        for word in words:
-            # Clean word
-            clean_word = re.sub(r'[^a-z]', '', word)
-            if len(clean_word) > max_length + 3:
-                complex_words_found.append(clean_word)
+        if self.lexicon is None:
+            complex_words_found = [word for word in doc.words if len(word) > max_length + 3]
+        else:
+            too_complex = self._complex_words(set(doc.words), grade, topic, max_length)
+            complex_words_found = [word for word in doc.words if word in too_complex]
         
         if complex_words_found and grade <= 5:
             feedback.append(
@@ -126,81 +177,101 @@ class ReviewerAgent:
         
         # Check for grade-inappropriate vocabulary
         if grade in self.complex_words_by_grade:
-            inappropriate = []
-            for complex_word in self.complex_words_by_grade[grade]:
-                if complex_word in explanation.lower():
-                    inappropriate.append(complex_word)
-            
+            inappropriate = self._vocabulary_matcher(grade).find_all(doc.lower)
             if inappropriate:
                 feedback.append(
                     f"These words might be too advanced for Grade {grade}: {', '.join(inappropriate)}"
                 )
         
         # Check if topic is mentioned
-        if topic.lower() not in explanation.lower():
+        if not doc.contains(topic.lower()):
             feedback.append(f"Explanation should clearly mention the topic '{topic}'")
         
         # Check for engagement (questions, examples, relatable content)
-        engagement_markers = ['?', 'example', 'like', 'imagine', 'think about', 'we can']
-        has_engagement = any(marker in explanation.lower() for marker in engagement_markers)
+        has_engagement = self._engagement_matcher.contains_any(doc.lower)
         
         if not has_engagement and grade <= 5:
             feedback.append("Consider adding examples or questions to make it more engaging for young students")
         
         return feedback
     
-    def _check_mcqs(self, mcqs: List[Dict], grade: int, topic: str) -> List[str]:
-        """Check MCQ quality and appropriateness"""
+    def _complex_words(self, words: Set[str], grade: int, topic: str, max_length: int) -> Set[str]:
+        """Words above the grade by their lexicon grade, or by length if the lexicon doesn't know them"""
+        word_grade = self.lexicon.grade
+        max_grade = grade + self.LEXICON_GRADE_MARGIN
+        too_complex = set()
+        for word in words:
+            known = word_grade(word)
+            if known is None:
+                if len(word) > max_length + 3:
+                    too_complex.add(word)
+            elif known > max_grade:
+                too_complex.add(word)
+        
+        # The topic's own words (either number) are expected to be new to the student
+        if too_complex:
+            topic_words = {_singular(word) for word in analyze(topic.lower()).words}
+            too_complex = {word for word in too_complex if _singular(word) not in topic_words}
+        return too_complex
+    
+    def _vocabulary_matcher(self, grade: int) -> PhraseMatcher:
+        """Matcher for the words too advanced for a grade, built once per grade"""
+        matcher = self._vocabulary_matchers.get(grade)
+        if matcher is None:
+            matcher = compile_phrases(self.complex_words_by_grade[grade])
+            self._vocabulary_matchers[grade] = matcher
+        return matcher
+    
+    def _check_mcq(self, mcq: Dict, i: int, grade: int, topic: str) -> List[str]:
+        """Check a single MCQ (i is its 1-based position)"""
         feedback = []
         
-        for i, mcq in enumerate(mcqs, 1):
-            # Check structure
-            if 'question' not in mcq:
-                feedback.append(f"Question {i} is missing the 'question' field")
-                continue
-            
-            if 'options' not in mcq:
-                feedback.append(f"Question {i} is missing the 'options' field")
-                continue
-            
-            if 'answer' not in mcq:
-                feedback.append(f"Question {i} is missing the 'answer' field")
-                continue
-            
-            # Check options count
-            if len(mcq['options']) != 4:
-                feedback.append(f"Question {i} must have exactly 4 options (A, B, C, D)")
-            
-            # Check answer validity
-            valid_answers = ['A', 'B', 'C', 'D']
-            if mcq['answer'] not in valid_answers:
-                feedback.append(f"Question {i} has invalid answer '{mcq['answer']}' - must be A, B, C, or D")
-            
-            # Check question clarity
-            question_text = mcq['question']
-            if len(question_text.split()) > 20 and grade <= 5:
-                feedback.append(f"Question {i} is too wordy for Grade {grade} students")
-            
-            if not question_text.endswith('?'):
-                feedback.append(f"Question {i} should end with a question mark")
-            
-            # Check if question tests understanding of the topic
-            topic_words = set(topic.lower().split())
-            question_words = set(question_text.lower().split())
-            
-            if not topic_words.intersection(question_words) and i == 1:
-                # At least first question should relate to topic
-                feedback.append(f"Question {i} should relate more directly to '{topic}'")
-            
-            # Check for trivial questions
-            trivial_patterns = ['what is', 'define', 'meaning of']
-            if any(pattern in question_text.lower() for pattern in trivial_patterns) and i > 1:
-                feedback.append(f"Question {i} seems too basic - try testing deeper understanding")
-            
-            # Check options for reasonable distractors
-            options_text = ' '.join(mcq['options']).lower()
-            if 'none of the above' in options_text and 'all of the above' in options_text:
-                feedback.append(f"Question {i} shouldn't have both 'none' and 'all' of the above")
+        # Check structure
+        if 'question' not in mcq:
+            feedback.append(f"Question {i} is missing the 'question' field")
+            return feedback
+        
+        if 'options' not in mcq:
+            feedback.append(f"Question {i} is missing the 'options' field")
+            return feedback
+        
+        if 'answer' not in mcq:
+            feedback.append(f"Question {i} is missing the 'answer' field")
+            return feedback
+        
+        # Check options count
+        if len(mcq['options']) != 4:
+            feedback.append(f"Question {i} must have exactly 4 options (A, B, C, D)")
+        
+        # Check answer validity
+        valid_answers = ['A', 'B', 'C', 'D']
+        if mcq['answer'] not in valid_answers:
+            feedback.append(f"Question {i} has invalid answer '{mcq['answer']}' - must be A, B, C, or D")
+        
+        # Check question clarity
+        question_text = mcq['question']
+        if len(question_text.split()) > 20 and grade <= 5:
+            feedback.append(f"Question {i} is too wordy for Grade {grade} students")
+        
+        if not question_text.endswith('?'):
+            feedback.append(f"Question {i} should end with a question mark")
+        
+        # Check if question tests understanding of the topic
+        topic_words = set(topic.lower().split())
+        question_words = set(question_text.lower().split())
+        
+        if not topic_words.intersection(question_words) and i == 1:
+            # At least first question should relate to topic
+            feedback.append(f"Question {i} should relate more directly to '{topic}'")
+        
+        # Check for trivial questions
+        if i > 1 and self._trivial_matcher.contains_any(question_text.lower()):
+            feedback.append(f"Question {i} seems too basic - try testing deeper understanding")
+        
+        # Check options for reasonable distractors
+        options_text = ' '.join(mcq['options']).lower()
+        if 'none of the above' in options_text and 'all of the above' in options_text:
+            feedback.append(f"Question {i} shouldn't have both 'none' and 'all' of the above")
         
         return feedback
     
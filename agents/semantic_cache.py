@@ -0,0 +1,259 @@
+"""
+Semantic Cache - Serve reviewed content for near-identical topics
+TF-IDF topic vectors (or a pluggable local embedding model) searched per grade through an inverted index
+"""
+
+import copy
+import math
+import threading
+import time
+from collections import Counter, OrderedDict
+from typing import Callable, Dict, Iterable, Optional, Sequence, Set, Tuple
+
+from .generation_cache import normalize_topic
+from .template_library import topic_words
+
+
+# Words at least this long may be corrected for a wrong, missing or extra letter;
+# shorter ones only for a swapped pair ("cylce"), since one edit turns "plant" into "planet"
+MIN_EDIT_TYPO_LENGTH = 7
+MIN_TYPO_LENGTH = 4
+
+
+def is_typo(word: str, known: str) -> bool:
+    """Whether word is known with two adjacent letters swapped, or (if long enough) one letter changed"""
+    if word == known or len(word) < MIN_TYPO_LENGTH:
+        return False
+    if len(word) == len(known):
+        diffs = [i for i, (a, b) in enumerate(zip(word, known)) if a != b]
+        if len(diffs) == 2 and diffs[1] == diffs[0] + 1:
+            return word[diffs[0]] == known[diffs[1]] and word[diffs[1]] == known[diffs[0]]
+        return len(diffs) == 1 and len(word) >= MIN_EDIT_TYPO_LENGTH
+    if abs(len(word) - len(known)) != 1 or len(word) < MIN_EDIT_TYPO_LENGTH:
+        return False
+    # One letter missing or extra: dropping one from the longer word gives the shorter
+    short, long = sorted((word, known), key=len)
+    i = next((i for i, (a, b) in enumerate(zip(short, long)) if a != b), len(short))
+    return short[i:] == long[i + 1:]
+
+
+class _Entry:
+    __slots__ = ("topic", "features", "content", "created")
+    
+    def __init__(self, topic: str, features: Dict, content: Dict, created: float):
+        self.topic = topic
+        self.features = features
+        self.content = content
+        self.created = created
+
+
+class _GradeIndex:
+    """Entries cached for one grade, with an inverted index from feature to topics"""
+    
+    def __init__(self):
+        self.entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        self.postings: Dict[object, Set[str]] = {}
+    
+    def add(self, entry: _Entry):
+        self.entries[entry.topic] = entry
+        self.entries.move_to_end(entry.topic)
+        for feature in entry.features:
+            self.postings.setdefault(feature, set()).add(entry.topic)
+    
+    def remove(self, topic: str) -> _Entry:
+        entry = self.entries.pop(topic)
+        for feature in entry.features:
+            topics = self.postings[feature]
+            topics.discard(topic)
+            if not topics:
+                del self.postings[feature]
+        return entry
+
+
+class SemanticCache:
+    """
+    Cache of reviewed content looked up by topic similarity within a grade
+    
+    Catches rewordings the exact GenerationCache misses ("angle types" for
+    "types of angles", "the water cycle"). Topics are vectorised
+    as TF-IDF over content words and character trigrams, with document
+    frequencies taken from the cached topics of the same model; only entries
+    sharing a feature with the query are scored. IDF is floored at the weight
+    of a feature one topic has, so a lone cached topic scores a query the
+    same as one among hundreds. A hit must also contain every content word
+    of the query: one more word ("adding fractions", "photosynthesis in
+    animals") makes a different topic, however little the word weighs.
+    
+    Query words no cached topic uses are first corrected to a cached word one
+    typo away (see is_typo: "cylce", "fracions", "photosynthesys"), if exactly
+    one is. Pass `embed` (e.g. a sentence-transformers model's encode) to
+    match paraphrases such as "how plants make food" instead.
+    
+    Entries are namespaced (by model) and bounded per grade, least recently
+    used first, and expire after `ttl` seconds.
+    """
+    
+    def __init__(self, threshold: float = 0.75, max_entries: int = 500, ttl: float = 7 * 24 * 3600,
+                 embed: Optional[Callable[[str], Sequence[float]]] = None,
+                 clock: Callable[[], float] = time.time):
+        """
+        Args:
+            threshold: Minimum cosine similarity for a hit (1.0 = same topic)
+            max_entries: Topics kept per grade and namespace
+            ttl: Seconds before an entry expires
+            embed: Optional function mapping a topic to a dense embedding,
+                replacing TF-IDF vectors
+            clock: Time source (tests)
+        """
+        if not 0 < threshold <= 1:
+            raise ValueError("threshold must be in (0, 1]")
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.embed = embed
+        self.clock = clock
+        
+        self.hits = 0
+        self.misses = 0
+        
+        self._indexes: Dict[Tuple[str, int], _GradeIndex] = {}
+        # Document frequencies and counts per namespace, for IDF
+        self._df: Dict[str, Counter] = {}
+        self._docs: Counter = Counter()
+        self._lock = threading.Lock()
+    
+    def lookup(self, grade: int, topic: str, namespace: str = "") -> Optional[Dict]:
+        """Return a copy of the content cached for the most similar topic, or None"""
+        with self._lock:
+            match = self._search(grade, topic, namespace)
+            if match is None:
+                self.misses += 1
+                return None
+            
+            entry, _ = match
+            self._indexes[(namespace, grade)].entries.move_to_end(entry.topic)
+            self.hits += 1
+            return copy.deepcopy(entry.content)
+    
+    def search(self, grade: int, topic: str, namespace: str = "") -> Optional[Tuple[str, float]]:
+        """(cached topic, similarity) of the best match above the threshold"""
+        with self._lock:
+            match = self._search(grade, topic, namespace)
+        return (match[0].topic, match[1]) if match else None
+    
+    def add(self, grade: int, topic: str, content: Dict, namespace: str = ""):
+        """Cache content that passed review for a grade and topic"""
+        topic = normalize_topic(topic)
+        entry = _Entry(topic, self._features(topic), copy.deepcopy(content), self.clock())
+        
+        with self._lock:
+            index = self._indexes.setdefault((namespace, grade), _GradeIndex())
+            if topic in index.entries:
+                self._forget(namespace, index, topic)
+            index.add(entry)
+            self._df.setdefault(namespace, Counter()).update(entry.features.keys())
+            self._docs[namespace] += 1
+            
+            while len(index.entries) > self.max_entries:
+                self._forget(namespace, index, next(iter(index.entries)))
+    
+    def clear(self):
+        with self._lock:
+            self._indexes.clear()
+            self._df.clear()
+            self._docs.clear()
+    
+    def stats(self) -> Dict:
+        """Hit/miss counters and the number of cached topics"""
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups * 100 if lookups else 0,
+            "entries": sum(len(index.entries) for index in self._indexes.values())
+        }
+    
+    def _search(self, grade: int, topic: str, namespace: str) -> Optional[Tuple[_Entry, float]]:
+        index = self._indexes.get((namespace, grade))
+        if not index:
+            return None
+        
+        if self.embed is None:
+            query = self._word_features(self._correct(topic_words(normalize_topic(topic)), namespace))
+        else:
+            query = self._features(normalize_topic(topic))
+        weight = self._weights(namespace)
+        query_norm = math.sqrt(sum((value * weight(feature)) ** 2 for feature, value in query.items()))
+        if not query_norm:
+            return None
+        
+        # Only topics sharing a feature with the query can score above zero
+        dots: Dict[str, float] = {}
+        for feature, value in query.items():
+            for candidate in index.postings.get(feature, ()):
+                entry = index.entries[candidate]
+                dots[candidate] = dots.get(candidate, 0.0) + value * entry.features[feature] * weight(feature) ** 2
+        
+        now = self.clock()
+        best, best_score = None, 0.0
+        for candidate, dot in dots.items():
+            entry = index.entries[candidate]
+            if now - entry.created >= self.ttl:
+                continue
+            norm = math.sqrt(sum((value * weight(feature)) ** 2 for feature, value in entry.features.items()))
+            score = dot / (query_norm * norm)
+            if score > best_score:
+                best, best_score = entry, score
+        
+        if best is None or best_score < self.threshold:
+            return None
+        
+        if self.embed is None and any(feature[:2] == "w:" and feature not in best.features for feature in query):
+            return None
+        
+        # Rounding can push an identical topic a hair over 1
+        return best, min(best_score, 1.0)
+    
+    def _weights(self, namespace: str) -> Callable[[object], float]:
+        if self.embed is not None:
+            return lambda feature: 1.0
+        df = self._df.get(namespace, Counter())
+        docs = self._docs[namespace]
+        # Features no cached topic has weigh as if one did, or they would outweigh the rest
+        return lambda feature: math.log((docs + 1) / (max(df[feature], 1) + 1)) + 1
+    
+    def _correct(self, words: Set[str], namespace: str) -> Set[str]:
+        """Words with unknown ones replaced by the single cached word they are a typo of"""
+        df = self._df.get(namespace, Counter())
+        corrected = set()
+        for word in words:
+            if not df["w:" + word]:
+                known = [feature[2:] for feature in df if feature[:2] == "w:" and is_typo(word, feature[2:])]
+                if len(known) == 1:
+                    word = known[0]
+            corrected.add(word)
+        return corrected
+    
+    def _features(self, topic: str) -> Dict:
+        if self.embed is not None:
+            return {i: float(value) for i, value in enumerate(self.embed(topic)) if value}
+        return self._word_features(topic_words(topic))
+    
+    @staticmethod
+    def _word_features(words: Iterable[str]) -> Dict:
+        features = Counter()
+        for word in words:
+            features["w:" + word] += 1
+            padded = f" {word} "
+            for i in range(len(padded) - 2):
+                features["c:" + padded[i:i + 3]] += 1
+        return dict(features)
+    
+    def _forget(self, namespace: str, index: _GradeIndex, topic: str):
+        entry = index.remove(topic)
+        df = self._df[namespace]
+        df.subtract(entry.features.keys())
+        for feature in entry.features:
+            if df[feature] <= 0:
+                del df[feature]
+        self._docs[namespace] -= 1
@@ -0,0 +1,152 @@
+"""
+Single Flight - Share one in-flight upstream call between identical concurrent requests
+Works across threads (Streamlit sessions) and within an event loop (async batches)
+"""
+
+import asyncio
+import copy
+import threading
+import weakref
+from typing import Awaitable, Callable, Dict, Iterator
+
+
+class _Call:
+    """One in-flight blocking call"""
+    
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class _Stream:
+    """One in-flight stream, buffered so late joiners replay what they missed"""
+    
+    def __init__(self):
+        self.cond = threading.Condition()
+        self.items = []
+        self.done = False
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Coalesce concurrent calls that share a key
+    
+    The first caller for a key (the leader) runs the call; callers arriving
+    while it is in flight wait for it and receive a deep copy of its result
+    (or its exception). Nothing is kept once the call finishes - caching
+    completed results is GenerationCache's job.
+    """
+    
+    def __init__(self):
+        self._calls: Dict[str, _Call] = {}
+        self._streams: Dict[str, _Stream] = {}
+        self._lock = threading.Lock()
+        # asyncio tasks are bound to the loop they were created on
+        self._tasks = weakref.WeakKeyDictionary()
+        
+        self.leaders = 0
+        self.shared = 0
+    
+    def do(self, key: str, fn: Callable[[], object]):
+        """Run fn() unless an identical call is in flight, then share its result"""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self.leaders += 1
+            else:
+                self.shared += 1
+        
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return copy.deepcopy(call.result)
+        
+        try:
+            result = fn()
+            # Followers copy from a snapshot the leader's caller can't mutate
+            call.result = copy.deepcopy(result)
+            return result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+    
+    def stream(self, key: str, fn: Callable[[], Iterator]) -> Iterator:
+        """
+        Iterate fn() unless an identical stream is in flight, then share its items
+        
+        The source is driven by a background thread so it runs to completion
+        (and fills the cache) even if every consumer stops early.
+        """
+        with self._lock:
+            flight = self._streams.get(key)
+            if flight is None:
+                flight = self._streams[key] = _Stream()
+                self.leaders += 1
+                threading.Thread(target=self._drive, args=(key, flight, fn), daemon=True).start()
+            else:
+                self.shared += 1
+        
+        i = 0
+        while True:
+            with flight.cond:
+                while i >= len(flight.items) and not flight.done:
+                    flight.cond.wait()
+                if i >= len(flight.items):
+                    break
+                item = flight.items[i]
+            i += 1
+            yield copy.deepcopy(item)
+        
+        if flight.error is not None:
+            raise flight.error
+    
+    def _drive(self, key: str, flight: _Stream, fn: Callable[[], Iterator]):
+        try:
+            for item in fn():
+                with flight.cond:
+                    flight.items.append(item)
+                    flight.cond.notify_all()
+        except BaseException as e:
+            flight.error = e
+        finally:
+            with self._lock:
+                del self._streams[key]
+            with flight.cond:
+                flight.done = True
+                flight.cond.notify_all()
+    
+    async def ado(self, key: str, fn: Callable[[], Awaitable]):
+        """Async counterpart of do, coalescing within the running event loop"""
+        loop = asyncio.get_running_loop()
+        tasks = self._tasks.setdefault(loop, {})
+        task = tasks.get(key)
+        if task is None:
+            task = tasks[key] = asyncio.ensure_future(fn())
+            task.add_done_callback(lambda _: tasks.pop(key, None))
+            self.leaders += 1
+        else:
+            self.shared += 1
+        
+        # Shielded, so one cancelled caller doesn't cancel the call for the others
+        return copy.deepcopy(await asyncio.shield(task))
+    
+    def stats(self) -> Dict:
+        """Upstream calls made vs. requests that shared one"""
+        return {"leaders": self.leaders, "shared": self.shared}
+
+
+_single_flight = SingleFlight()
+
+
+def get_single_flight() -> SingleFlight:
+    """Return the process-wide single-flight group"""
+    return _single_flight
@@ -0,0 +1,158 @@
+"""
+Speculative Generation - Race several candidates and keep the first that passes review
+Trades extra upstream calls for lower tail latency than generate -> review -> refine
+"""
+
+import asyncio
+import time
+from typing import Dict, Optional, Sequence
+
+import aiohttp
+
+from .generator_agent import GeneratorAgent
+from .http_session import close_async_session
+from .reviewer_agent import ReviewerAgent
+
+# Candidate states
+_WAITING = "waiting"
+_SENT = "sent"
+_DONE = "done"
+
+
+class SpeculativeGenerator:
+    """
+    Generate candidates concurrently and return the first one that passes review
+    
+    Each candidate samples at its own temperature and is reviewed as soon as it
+    arrives; the first pass wins and the others are cancelled, dropping their
+    connections. With `stagger`, candidate i is only sent after i * stagger
+    seconds without a winner (hedged requests), so a fast pass costs a single
+    upstream call. If no candidate passes, the one with the least feedback is
+    refined once, as in the serial flow.
+    """
+    
+    def __init__(self, generator: Optional[GeneratorAgent] = None,
+                 reviewer: Optional[ReviewerAgent] = None,
+                 temperatures: Sequence[float] = (0.7, 0.9, 0.5), stagger: float = 0.0):
+        """
+        Args:
+            generator: Generator to use (a new GeneratorAgent by default)
+            reviewer: Reviewer to use (a new ReviewerAgent by default)
+            temperatures: Sampling temperature of each candidate; one candidate per entry
+            stagger: Seconds between sending successive candidates (0 sends all at once)
+        """
+        if not temperatures:
+            raise ValueError("temperatures must name at least one candidate")
+        self.generator = generator or GeneratorAgent()
+        self.reviewer = reviewer or ReviewerAgent()
+        self.temperatures = list(temperatures)
+        self.stagger = stagger
+    
+    def generate(self, grade: int, topic: str) -> Dict:
+        """Blocking wrapper around agenerate"""
+        async def run():
+            try:
+                return await self.agenerate(grade, topic)
+            finally:
+                await close_async_session()
+        
+        return asyncio.run(run())
+    
+    async def agenerate(self, grade: int, topic: str, session: Optional[aiohttp.ClientSession] = None) -> Dict:
+        """
+        Produce reviewed content for a grade and topic
+        
+        Returns:
+            Dictionary with the final 'content' and 'review', 'initial_content'
+            and 'initial_review' (before refinement), 'refined', 'source'
+            ("cache", "candidate", "refined" or "fallback"), 'winner' (index of
+            the passing candidate), 'sent' and 'cancelled' candidate counts and
+            'elapsed' seconds. Of those, 'review_time' were spent reviewing the
+            initial content and candidates and 'generation_time' producing them;
+            the rest went on refinement.
+        """
+        start = time.perf_counter()
+        result = {"refined": False, "winner": None, "sent": 0, "cancelled": 0}
+        review_time = 0.0
+        
+        def timed_review(review, *args, **kwargs):
+            nonlocal review_time
+            review_start = time.perf_counter()
+            try:
+                return review(*args, **kwargs)
+            finally:
+                review_time += time.perf_counter() - review_start
+        
+        def split_time():
+            result["review_time"] = review_time
+            result["generation_time"] = time.perf_counter() - start - review_time
+        
+        cached = self.generator.cached_content(grade, topic)
+        if cached is not None:
+            review = timed_review(self.reviewer.review_content, cached, grade, topic)
+            if review['status'] == 'pass':
+                split_time()
+                return self._finish(result, start, grade, topic, "cache", cached, review)
+        
+        states = [_WAITING] * len(self.temperatures)
+        
+        async def candidate(i: int, temperature: float):
+            if i and self.stagger:
+                await asyncio.sleep(i * self.stagger)
+            states[i] = _SENT
+            content = await self.generator.agenerate_sample(grade, topic, temperature, session)
+            states[i] = _DONE
+            return i, content
+        
+        tasks = [asyncio.ensure_future(candidate(i, t)) for i, t in enumerate(self.temperatures)]
+        best = None
+        try:
+            for finished in asyncio.as_completed(tasks):
+                i, content = await finished
+                if content is None:
+                    continue
+                parts = timed_review(self.reviewer.review_parts, content, grade, topic)
+                review = self.reviewer.summarize(parts)
+                if review['status'] == 'pass':
+                    result["winner"] = i
+                    best = (content, parts, review)
+                    break
+                if best is None or len(review['feedback']) < len(best[2]['feedback']):
+                    best = (content, parts, review)
+        finally:
+            result["cancelled"] = states.count(_SENT)
+            result["sent"] = len(states) - states.count(_WAITING)
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+        split_time()
+        
+        if result["winner"] is not None:
+            content, _, review = best
+            self.generator.cache_content(grade, topic, content)
+            return self._finish(result, start, grade, topic, "candidate", content, review)
+        
+        if best is None:
+            # Every candidate failed upstream
+            content = self.generator._fallback_generation(grade, topic)
+            review = timed_review(self.reviewer.review_content, content, grade, topic)
+            split_time()
+            return self._finish(result, start, grade, topic, "fallback", content, review)
+        
+        content, parts, review = best
+        refined = await self.generator.arefine_content(grade, topic, content, parts, session)
+        refined_review = self.reviewer.summarize(
+            self.reviewer.review_parts(refined, grade, topic, previous=(content, parts))
+        )
+        result["refined"] = True
+        result["initial_content"] = content
+        result["initial_review"] = review
+        return self._finish(result, start, grade, topic, "refined", refined, refined_review)
+    
+    def _finish(self, result: Dict, start: float, grade: int, topic: str, source: str,
+                content: Dict, review: Dict) -> Dict:
+        result.setdefault("initial_content", content)
+        result.setdefault("initial_review", review)
+        result.update(source=source, content=content, review=review, elapsed=time.perf_counter() - start)
+        self.generator.remember_reviewed(grade, topic, content, review)
+        return result
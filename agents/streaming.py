@@ -0,0 +1,168 @@
+"""
+Streaming - Server-sent token streams and incremental parsing of generated content
+Lets the UI show the explanation and each MCQ as soon as the model has finished writing it
+"""
+
+import json
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from .retry import APIError
+
+# Event kinds yielded while streaming
+EXPLANATION = "explanation"
+MCQ = "mcq"
+CONTENT = "content"
+
+
+def iter_sse_tokens(lines: Iterable) -> Iterator[str]:
+    """
+    Yield token texts from a text-generation-inference or OpenAI completions SSE stream
+    
+    Args:
+        lines: Raw lines of the response body (bytes or str)
+    """
+    for line in lines:
+        if isinstance(line, bytes):
+            line = line.decode('utf-8')
+        line = line.strip()
+        if not line.startswith('data:'):
+            continue
+        data = line[5:].strip()
+        if not data or data == '[DONE]':
+            continue
+        
+        event = json.loads(data)
+        if event.get('error'):
+            raise APIError(f"Stream failed: {event['error']}")
+        if 'choices' in event:
+            choices = event['choices']
+            if choices and choices[0].get('text'):
+                yield choices[0]['text']
+            continue
+        token = event.get('token') or {}
+        if token.get('text') and not token.get('special'):
+            yield token['text']
+
+
+class TokenStream:
+    """An opened token stream: iterate for token texts, close to release the connection"""
+    
+    def __init__(self, tokens: Iterable[str], close: Optional[Callable[[], None]] = None):
+        self._tokens = tokens
+        self._close = close
+    
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._tokens)
+    
+    def close(self):
+        if self._close is not None:
+            self._close()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc):
+        self.close()
+
+
+class IncrementalContentParser:
+    """
+    Incremental parser for the {"explanation": ..., "mcqs": [...]} response
+    
+    Feed it text as it arrives; it tracks just enough JSON structure (nesting,
+    strings and escapes) to notice when the explanation string or an MCQ object
+    is complete, and parses only that piece. Text before the first '{' is
+    ignored, like the preamble skipped by _parse_response.
+    """
+    
+    def __init__(self):
+        self.text = ""
+        self.explanation: Optional[str] = None
+        self.mcqs: List[Dict] = []
+        self.done = False
+        
+        self._pos = 0
+        # One entry per open container: [bracket, key in parent, start offset, expecting key]
+        self._stack = []
+        self._in_string = False
+        self._escape = False
+        self._string_start = 0
+        self._key = None
+    
+    def feed(self, chunk: str) -> List[Tuple[str, object]]:
+        """
+        Add streamed text
+        
+        Returns:
+            (EXPLANATION, str) and (MCQ, dict) events completed by this chunk
+        """
+        self.text += chunk
+        events = []
+        text = self.text
+        i = self._pos
+        
+        while i < len(text) and not self.done:
+            char = text[i]
+            
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif char == '\\':
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+                    self._end_string(text[self._string_start:i + 1], events)
+            elif not self._stack:
+                # Skip preamble until the top-level object opens
+                if char == '{':
+                    self._stack.append(['{', None, i, True])
+            elif char == '"':
+                self._in_string = True
+                self._string_start = i
+            elif char in '{[':
+                self._stack.append([char, self._key, i, char == '{'])
+                self._key = None
+            elif char in '}]':
+                self._close(text, i, events)
+            elif char == ':':
+                self._stack[-1][3] = False
+            elif char == ',':
+                if self._stack[-1][0] == '{':
+                    self._stack[-1][3] = True
+                self._key = None
+            i += 1
+        
+        self._pos = i
+        return events
+    
+    def _end_string(self, raw: str, events: List):
+        try:
+            value = json.loads(raw)
+        except ValueError:
+            value = None
+        
+        top = self._stack[-1]
+        if top[0] == '{' and top[3]:
+            self._key = value
+            return
+        if len(self._stack) == 1 and self._key == 'explanation' and value is not None:
+            self.explanation = value
+            events.append((EXPLANATION, value))
+        self._key = None
+    
+    def _close(self, text: str, i: int, events: List):
+        bracket, _, start, _ = self._stack.pop()
+        self._key = None
+        if not self._stack:
+            self.done = True
+            return
+        
+        # An object directly inside the top-level "mcqs" array
+        parent = self._stack[-1]
+        if bracket == '{' and len(self._stack) == 2 and parent[0] == '[' and parent[1] == 'mcqs':
+            try:
+                mcq = json.loads(text[start:i + 1])
+            except ValueError:
+                return
+            self.mcqs.append(mcq)
+            events.append((MCQ, mcq))
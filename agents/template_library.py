@@ -0,0 +1,291 @@
+"""
+Template Library - Indexed offline content for the generator's fallback path
+Reviewed (grade band x topic) content compiled into a memory-mapped index with fuzzy topic lookup
+
+Usage: python -m agents.template_library build [--source library.json] [--output library.idx]
+       python -m agents.template_library lookup 4 "kinds of angles"
+"""
+
+import argparse
+import difflib
+import hashlib
+import json
+import mmap
+import os
+import re
+import struct
+import tempfile
+import threading
+from typing import Dict, List, Optional, Set
+
+from .generation_cache import normalize_topic
+from .json_extract import validate_content
+
+DEFAULT_SOURCE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "template_library.json")
+
+# Magic, then the length of the JSON index that precedes the content blobs
+_HEADER = struct.Struct("<8sI")
+_MAGIC = b"EDTLIB1\n"
+
+# Words that don't tell topics apart
+_STOPWORDS = frozenset("a an and are about do does for how in is of on our the to what why with your".split())
+_WORD = re.compile(r"[a-z0-9]+")
+
+
+def topic_words(topic: str) -> Set[str]:
+    """Content words of a topic, crudely singularised ("Food Chains" -> {"food", "chain"})"""
+    words = set()
+    for word in _WORD.findall(topic.lower()):
+        if word in _STOPWORDS:
+            continue
+        if len(word) > 3 and word.endswith('s') and not word.endswith('ss'):
+            word = word[:-1]
+        words.add(word)
+    return words
+
+
+def source_digest(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def build_library(source: str = DEFAULT_SOURCE, output: Optional[str] = None) -> str:
+    """
+    Compile a JSON template source into a binary index
+    
+    The source holds {"topics": [{"topic", "aliases", "levels": [{"grades":
+    [low, high], "content"}]}]}. The index file is a small JSON header mapping
+    topics and aliases to (low, high, offset, length) entries, followed by
+    each content item as compact JSON, so a lookup decodes only what it needs.
+    
+    Returns:
+        Path of the written index
+    """
+    with open(source, 'rb') as f:
+        data = f.read()
+    digest = source_digest(data)
+    if output is None:
+        output = default_index_path(digest)
+    
+    topics: Dict[str, List[List[int]]] = {}
+    aliases: Dict[str, str] = {}
+    blobs = bytearray()
+    for item in json.loads(data)["topics"]:
+        key = normalize_topic(item["topic"])
+        entries = topics.setdefault(key, [])
+        for level in item["levels"]:
+            low, high = level["grades"]
+            if not validate_content(level["content"]):
+                raise ValueError(f"Template for '{key}' (grades {low}-{high}) is not valid content")
+            blob = json.dumps(level["content"], ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+            entries.append([low, high, len(blobs), len(blob)])
+            blobs += blob
+        for alias in item.get("aliases", []):
+            aliases[normalize_topic(alias)] = key
+    
+    index = json.dumps({"digest": digest, "topics": topics, "aliases": aliases}).encode('utf-8')
+    
+    # Write then rename, so concurrent readers never see a partial file
+    tmp_path = f"{output}.{os.getpid()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(_HEADER.pack(_MAGIC, len(index)))
+        f.write(index)
+        f.write(blobs)
+    os.replace(tmp_path, output)
+    return output
+
+
+def default_index_path(digest: str) -> str:
+    """Index location for a source version (the temp directory is writable on cloud hosts)"""
+    return os.path.join(tempfile.gettempdir(), f"edu_template_library_{digest[:16]}.idx")
+
+
+class TemplateLibrary:
+    """
+    Read-only view of a compiled template library
+    
+    The index file is memory-mapped: only the header is parsed up front and a
+    lookup decodes just the matching content item, so opening is cheap and
+    untouched content is never read from disk. Topic resolution is memoised.
+    """
+    
+    # Minimum word overlap (Jaccard) for a fuzzy topic match
+    MIN_WORD_SCORE = 0.5
+    # Minimum similarity for matching a misspelt topic
+    MIN_SPELLING_SCORE = 0.85
+    MAX_MEMO = 4096
+    
+    def __init__(self, index_path: str):
+        """
+        Args:
+            index_path: File written by build_library
+        """
+        self.path = index_path
+        self._file = open(index_path, 'rb')
+        try:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            magic, index_length = _HEADER.unpack_from(self._map, 0)
+            if magic != _MAGIC:
+                raise ValueError(f"{index_path} is not a template library index")
+            index = json.loads(self._map[_HEADER.size:_HEADER.size + index_length])
+        except Exception:
+            self.close()
+            raise
+        
+        self.digest = index["digest"]
+        self._blobs_start = _HEADER.size + index_length
+        self._topics: Dict[str, List[List[int]]] = index["topics"]
+        self._aliases: Dict[str, str] = index["aliases"]
+        
+        # Every name (topic or alias) -> topic, and content word -> names using it
+        self._names = {**self._aliases, **{key: key for key in self._topics}}
+        self._name_words = {name: topic_words(name) for name in self._names}
+        self._word_index: Dict[str, List[str]] = {}
+        # Every word any name of a topic uses, which a fuzzy match must account for
+        self._topic_words: Dict[str, Set[str]] = {key: set() for key in self._topics}
+        for name, words in self._name_words.items():
+            self._topic_words[self._names[name]] |= words
+            for word in words:
+                self._word_index.setdefault(word, []).append(name)
+        self._memo: Dict[str, Optional[str]] = {}
+    
+    @classmethod
+    def open(cls, source: str = DEFAULT_SOURCE, index_path: Optional[str] = None) -> "TemplateLibrary":
+        """Open the index for source, (re)building it if it is missing or stale"""
+        with open(source, 'rb') as f:
+            digest = source_digest(f.read())
+        index_path = index_path or default_index_path(digest)
+        
+        if os.path.exists(index_path):
+            try:
+                library = cls(index_path)
+            except (OSError, ValueError, struct.error):
+                library = None
+            if library is not None and library.digest == digest:
+                return library
+            if library is not None:
+                library.close()
+        
+        return cls(build_library(source, index_path))
+    
+    @property
+    def topics(self) -> List[str]:
+        return list(self._topics)
+    
+    def lookup(self, grade: int, topic: str) -> Optional[Dict]:
+        """
+        Content for the topic at the grade level, or None if the library has no match
+        
+        Topics match after normalisation, through an alias, by content-word
+        overlap where the topic's names use every word of the request
+        ("Photosynthesis in plants", but not "heart attack") or by spelling similarity
+        ("photosynthesys"). The band covering the grade is used, else the nearest.
+        Each call returns a freshly decoded copy.
+        """
+        key = self.resolve(topic)
+        if key is None:
+            return None
+        
+        low, high, offset, length = min(
+            self._topics[key],
+            key=lambda entry: 0 if entry[0] <= grade <= entry[1] else min(abs(grade - entry[0]), abs(grade - entry[1]))
+        )
+        start = self._blobs_start + offset
+        return json.loads(self._map[start:start + length])
+    
+    def resolve(self, topic: str) -> Optional[str]:
+        """Library topic a requested topic maps to"""
+        normalized = normalize_topic(topic)
+        if normalized in self._memo:
+            return self._memo[normalized]
+        
+        key = self._names.get(normalized)
+        if key is None:
+            key = self._match_words(topic_words(normalized))
+        if key is None:
+            close = difflib.get_close_matches(normalized, self._names, n=1, cutoff=self.MIN_SPELLING_SCORE)
+            key = self._names[close[0]] if close else None
+        
+        if len(self._memo) >= self.MAX_MEMO:
+            self._memo.clear()
+        self._memo[normalized] = key
+        return key
+    
+    def _match_words(self, words: Set[str]) -> Optional[str]:
+        if not words:
+            return None
+        candidates = {name for word in words for name in self._word_index.get(word, ())}
+        
+        best, best_score = None, 0.0
+        for name in sorted(candidates):
+            # A word the topic never uses makes it a different topic ("angles of triangles")
+            if not words <= self._topic_words[self._names[name]]:
+                continue
+            name_words = self._name_words[name]
+            score = len(words & name_words) / len(words | name_words)
+            if score > best_score:
+                best, best_score = name, score
+        return self._names[best] if best_score >= self.MIN_WORD_SCORE else None
+    
+    def close(self):
+        if getattr(self, '_map', None) is not None:
+            self._map.close()
+            self._map = None
+        self._file.close()
+
+
+_library: Optional[TemplateLibrary] = None
+_library_failed = False
+_library_lock = threading.Lock()
+
+
+def get_template_library() -> Optional[TemplateLibrary]:
+    """
+    Return the process-wide template library, opened on first use
+    
+    Returns None if it can't be opened or built (e.g. no writable temp
+    directory); callers fall back to generic content.
+    """
+    global _library, _library_failed
+    if _library is None and not _library_failed:
+        with _library_lock:
+            if _library is None and not _library_failed:
+                try:
+                    _library = TemplateLibrary.open()
+                except (OSError, ValueError, KeyError):
+                    _library_failed = True
+    return _library
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Build or query the offline template library")
+    commands = parser.add_subparsers(dest="command", required=True)
+    
+    build = commands.add_parser("build", help="Compile the JSON source into an index file")
+    build.add_argument("--source", default=DEFAULT_SOURCE, help="Template source JSON")
+    build.add_argument("--output", help="Index path (defaults to the temp directory)")
+    
+    lookup = commands.add_parser("lookup", help="Show the content served for a grade and topic")
+    lookup.add_argument("grade", type=int)
+    lookup.add_argument("topic")
+    lookup.add_argument("--index", help="Index path (defaults to building from the bundled source)")
+    args = parser.parse_args(argv)
+    
+    if args.command == "build":
+        path = build_library(args.source, args.output)
+        library = TemplateLibrary(path)
+        print(f"Wrote {len(library.topics)} topics to {path}")
+        library.close()
+        return
+    
+    library = TemplateLibrary(args.index) if args.index else TemplateLibrary.open()
+    key = library.resolve(args.topic)
+    if key is None:
+        print(f"No template for '{args.topic}'")
+    else:
+        print(f"'{args.topic}' -> '{key}'")
+        print(json.dumps(library.lookup(args.grade, args.topic), indent=2, ensure_ascii=False))
+    library.close()
+
+
+if __name__ == "__main__":
+    main()
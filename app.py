@@ -5,10 +5,16 @@ Multi-Agent System for generating and reviewing educational content
 
 import streamlit as st
 import json
+import os
+import tempfile
 from datetime import datetime
 
+from agents.generation_cache import GenerationCache
 from agents.generator_agent import GeneratorAgent
 from agents.reviewer_agent import ReviewerAgent
+from agents.semantic_cache import SemanticCache
+from agents.speculative import SpeculativeGenerator
+from agents.streaming import EXPLANATION, MCQ
 from utils.analytics import AnalyticsTracker
 from utils.export import ContentExporter
 from utils.validator import AdvancedValidator
@@ -82,13 +88,24 @@ st.markdown("""
     </style>
 """, unsafe_allow_html=True)
 
+@st.cache_resource
+def get_generation_cache():
+    """Generation cache shared by every session served by this process"""
+    return GenerationCache(disk_path=os.path.join(tempfile.gettempdir(), "generation_cache.db"))
+
+@st.cache_resource
+def get_semantic_cache():
+    """Reviewed content for near-identical topics, shared by every session"""
+    return SemanticCache()
+
 # Initialize session state
 if 'generator' not in st.session_state:
-    st.session_state.generator = GeneratorAgent()
+    st.session_state.generator = GeneratorAgent(cache=get_generation_cache(),
+                                                semantic_cache=get_semantic_cache())
 if 'reviewer' not in st.session_state:
     st.session_state.reviewer = ReviewerAgent()
 if 'analytics' not in st.session_state:
-    st.session_state.analytics = AnalyticsTracker()
+    st.session_state.analytics = AnalyticsTracker(lazy=True, backend="sqlite")
 if 'generated_content' not in st.session_state:
     st.session_state.generated_content = None
 if 'review_result' not in st.session_state:
@@ -146,6 +163,20 @@ with st.sidebar:
     st.markdown("### System Status")
     st.write("🟢 Generator Agent: Ready")
     st.write("🟢 Reviewer Agent: Ready")
+    cache_stats = get_generation_cache().stats()
+    st.caption(f"Generation cache: {cache_stats['hits']} hits / {cache_stats['misses']} misses "
+               f"({cache_stats['hit_rate']:.0f}% hit rate)")
+    semantic_stats = get_semantic_cache().stats()
+    st.caption(f"Similar-topic cache: {semantic_stats['hits']} hits across {semantic_stats['entries']} reviewed topics")
+    flight_stats = st.session_state.generator.single_flight.stats()
+    st.caption(f"Coalesced requests: {flight_stats['shared']} shared {flight_stats['leaders']} upstream calls")
+    breaker_stats = st.session_state.generator.breaker.stats()
+    if breaker_stats['state'] == 'closed':
+        st.caption(f"Inference API: healthy ({breaker_stats['failure_rate']:.0f}% recent failures)")
+    elif breaker_stats['state'] == 'open':
+        st.caption(f"🔴 Inference API unavailable - using templates, retrying in {breaker_stats['retry_in']:.0f}s")
+    else:
+        st.caption("🟡 Inference API: probing for recovery")
 
 # Main interface
 st.markdown("### Input Parameters")
@@ -191,6 +222,12 @@ with col2:
     else:
         topic = selected_topic
 
+speculative = st.checkbox(
+    "Speculative mode",
+    help="Generate 3 candidates at once and keep the first that passes review - "
+         "a faster worst case for more API calls"
+)
+
 st.markdown("---")
 
 # Generate button
@@ -211,10 +248,33 @@ if st.button("Generate Content", type="primary", use_container_width=True):
         progress_bar.progress(25)
         
         gen_start = time.time()
-        with st.spinner("Generating content..."):
-            generated_content = st.session_state.generator.generate_content(grade, topic)
-            st.session_state.generated_content = generated_content
-        gen_time = time.time() - gen_start
+        preview = st.empty()
+        partial_content = {"explanation": "", "mcqs": []}
+        if speculative:
+            # Candidates are reviewed (and refined if none pass) as they arrive
+            with st.spinner("Racing candidates..."):
+                speculation = SpeculativeGenerator(
+                    st.session_state.generator, st.session_state.reviewer
+                ).generate(grade, topic)
+                generated_content = speculation['initial_content']
+                st.session_state.generated_content = generated_content
+        else:
+            with st.spinner("Generating content..."):
+                # Show the explanation and each question as soon as they are written
+                for kind, value in st.session_state.generator.stream_content(grade, topic):
+                    if kind == EXPLANATION:
+                        partial_content["explanation"] = value
+                    elif kind == MCQ:
+                        partial_content["mcqs"].append(value)
+                    else:
+                        generated_content = value
+                        break
+                    with preview.container():
+                        display_content(partial_content, "Generating...")
+                st.session_state.generated_content = generated_content
+        preview.empty()
+        # Speculation reviews (and may refine) while generating; log only its generation share
+        gen_time = speculation['generation_time'] if speculative else time.time() - gen_start
         
         progress_bar.progress(50)
         
@@ -222,12 +282,17 @@ if st.button("Generate Content", type="primary", use_container_width=True):
         status_text.text("Reviewer Agent is evaluating content...")
         
         review_start = time.time()
-        with st.spinner("Reviewing content..."):
-            review_result = st.session_state.reviewer.review_content(
-                generated_content, grade, topic
-            )
+        if speculative:
+            review_result = speculation['initial_review']
             st.session_state.review_result = review_result
-        review_time = time.time() - review_start
+        else:
+            with st.spinner("Reviewing content..."):
+                review_parts = st.session_state.reviewer.review_parts(
+                    generated_content, grade, topic
+                )
+                review_result = st.session_state.reviewer.summarize(review_parts)
+                st.session_state.review_result = review_result
+        review_time = speculation['review_time'] if speculative else time.time() - review_start
         
         # Advanced validation
         advanced_val = AdvancedValidator.comprehensive_validation(
@@ -241,28 +306,41 @@ if st.button("Generate Content", type="primary", use_container_width=True):
         refinement_needed = review_result['status'] == 'fail'
         refinement_improved = None
         
-        if refinement_needed:
+        if speculative:
+            # Already refined while racing if no candidate passed
+            if refinement_needed:
+                refined_content = speculation['content']
+                refined_review = speculation['review']
+                st.session_state.refined_content = refined_content
+                st.session_state.refined_review = refined_review
+                refinement_improved = refined_review['status'] == 'pass'
+        elif refinement_needed:
             status_text.text("Refining content based on feedback...")
             
             with st.spinner("Refining content..."):
-                # Extract feedback for refinement
-                feedback_list = review_result['feedback']
-                
-                # Regenerate with feedback
-                refined_content = st.session_state.generator.generate_content(
-                    grade, topic, feedback=feedback_list
+                # Regenerate only the explanation / questions the reviewer flagged
+                refined_content = st.session_state.generator.refine_content(
+                    grade, topic, generated_content, review_parts
                 )
                 st.session_state.refined_content = refined_content
                 
-                # Review refined content
-                refined_review = st.session_state.reviewer.review_content(
-                    refined_content, grade, topic
+                # Review refined content, re-checking only the parts that changed
+                refined_parts = st.session_state.reviewer.review_parts(
+                    refined_content, grade, topic, previous=(generated_content, review_parts)
                 )
+                refined_review = st.session_state.reviewer.summarize(refined_parts)
                 st.session_state.refined_review = refined_review
                 
                 # Check if refinement improved
                 refinement_improved = refined_review['status'] == 'pass'
         
+        # Reviewed content can be served for similar topics later (speculation already did)
+        if not speculative:
+            if refinement_needed:
+                st.session_state.generator.remember_reviewed(grade, topic, refined_content, refined_review)
+            else:
+                st.session_state.generator.remember_reviewed(grade, topic, generated_content, review_result)
+        
         progress_bar.progress(100)
         status_text.text("Process complete")
         
@@ -416,6 +494,13 @@ if st.session_state.generated_content is not None:
                     if 'issues' in check_data and check_data['issues']:
                         for issue in check_data['issues']:
                             st.markdown(f"  • {issue}")
+                
+                if 'scores' in check_data:
+                    scores = check_data['scores']
+                    st.caption(
+                        f"Flesch Reading Ease {scores['flesch_reading_ease']} · "
+                        f"SMOG {scores['smog_index']} · Coleman-Liau {scores['coleman_liau_index']}"
+                    )
             
             st.markdown('</div>', unsafe_allow_html=True)
         else:
@@ -0,0 +1,4 @@
+"""
+Benchmark scripts for Educational Content Generator
+Run individual benchmarks with: python -m benchmarks.<name>
+"""
@@ -0,0 +1,157 @@
+"""
+Benchmark - AnalyticsTracker statistics latency, startup cost and memory footprint
+Run with: python -m benchmarks.bench_analytics [--max-sessions 10000000] [--startup-sessions 1000000]
+"""
+
+import argparse
+import json
+import os
+import tempfile
+import time
+import tracemalloc
+
+from utils.analytics import AnalyticsTracker, SessionColumns, SessionStats
+
+TOPICS = ["Types of angles", "Photosynthesis", "Water cycle", "Solar system", "Food chains"]
+
+
+def _fill_stats(n: int) -> SessionStats:
+    """Feed n synthetic sessions into a fresh set of running aggregates"""
+    stats = SessionStats()
+    session = {
+        "grade": 1,
+        "topic": TOPICS[0],
+        "generation_time": 1.0,
+        "review_status": "pass",
+        "feedback_count": 1,
+        "refinement_needed": False
+    }
+    for i in range(n):
+        session["grade"] = i % 12 + 1
+        session["topic"] = TOPICS[i % len(TOPICS)]
+        session["review_status"] = "pass" if i % 3 else "fail"
+        session["refinement_needed"] = not i % 3
+        stats.add(session)
+    return stats
+
+
+def _time_call(fn, repeat: int = 1000) -> float:
+    """Median latency of fn() in microseconds"""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    samples.sort()
+    return samples[len(samples) // 2] * 1e6
+
+
+def _write_log(path: str, n: int):
+    """Write n synthetic sessions straight to a JSON Lines log"""
+    with open(path, 'w') as f:
+        for i in range(n):
+            f.write(json.dumps({
+                "timestamp": f"2024-01-01T00:00:{i % 60:02d}",
+                "grade": i % 12 + 1,
+                "topic": TOPICS[i % len(TOPICS)],
+                "generation_time": 1.0,
+                "review_status": "pass" if i % 3 else "fail",
+                "feedback_count": 1,
+                "refinement_needed": not i % 3
+            }) + "\n")
+
+
+def _measure_startup(path: str, lazy: bool):
+    """Seconds and peak traced memory (MB) to construct a tracker"""
+    tracemalloc.start()
+    start = time.perf_counter()
+    tracker = AnalyticsTracker(analytics_file=path, lazy=lazy)
+    tracker.get_recent_sessions()
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1] / 1e6
+    tracemalloc.stop()
+    return elapsed, peak
+
+
+def _measure_memory(n: int):
+    """Traced MB to hold n sessions as a list of dicts vs. SessionColumns"""
+    results = {}
+    for label, factory in [("dicts", list), ("columns", SessionColumns)]:
+        tracemalloc.start()
+        store = factory()
+        for i in range(n):
+            store.append({
+                "timestamp": f"2024-01-01T10:{i // 60 % 60:02d}:{i % 60:02d}.{i % 1000000:06d}",
+                "grade": i % 12 + 1,
+                "topic": TOPICS[i % len(TOPICS)],
+                "generation_time": i * 0.001,
+                "review_time": i * 0.0001,
+                "total_time": i * 0.0011,
+                "review_status": "pass" if i % 3 else "fail",
+                "feedback_count": i % 5,
+                "refinement_needed": not i % 3,
+                "refinement_improved": None,
+                "mcq_count": 3,
+                "explanation_length": 400 + i % 100
+            })
+        results[label] = tracemalloc.get_traced_memory()[0] / 1e6
+        tracemalloc.stop()
+        del store
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--max-sessions", type=int, default=1_000_000,
+                        help="Largest history size to benchmark (default: 1,000,000)")
+    parser.add_argument("--memory-sessions", type=int, default=100_000,
+                        help="History size for the in-memory footprint comparison")
+    parser.add_argument("--startup-sessions", type=int, default=200_000,
+                        help="History size for the eager vs. lazy startup comparison")
+    args = parser.parse_args()
+    
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        tracker = AnalyticsTracker(analytics_file=os.path.join(tmp_dir, "bench.jsonl"))
+        
+        print("=" * 60)
+        print("get_statistics() latency by history size")
+        print("=" * 60)
+        print(f"{'sessions':>12} | {'build (s)':>10} | {'median (us)':>12}")
+        print("-" * 60)
+        
+        n = 10
+        while n <= args.max_sessions:
+            start = time.perf_counter()
+            tracker.stats = _fill_stats(n)
+            build_time = time.perf_counter() - start
+            
+            latency = _time_call(tracker.get_statistics)
+            print(f"{n:>12,} | {build_time:>10.2f} | {latency:>12.2f}")
+            n *= 10
+        
+        log_file = os.path.join(tmp_dir, "startup.jsonl")
+        _write_log(log_file, args.startup_sessions)
+        # First lazy start has no snapshot yet and builds one with a streaming scan
+        _measure_startup(log_file, lazy=True)
+        
+        print()
+        print("=" * 60)
+        print(f"Tracker startup with {args.startup_sessions:,} logged sessions")
+        print("=" * 60)
+        for label, lazy in [("eager", False), ("lazy", True)]:
+            elapsed, peak = _measure_startup(log_file, lazy)
+            print(f"{label:>8} | {elapsed * 1000:>10.1f} ms | peak {peak:>8.1f} MB")
+    
+    
+    memory = _measure_memory(args.memory_sessions)
+    print()
+    print("=" * 60)
+    print(f"In-memory footprint of {args.memory_sessions:,} sessions")
+    print("=" * 60)
+    for label, mb in memory.items():
+        print(f"{label:>8} | {mb:>8.1f} MB | {mb * 1e6 / args.memory_sessions:>6.0f} bytes/session")
+    print(f"reduction: {memory['dicts'] / memory['columns']:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""
+Benchmark - Latency, time to first token and throughput of each inference backend
+Run with: python -m benchmarks.bench_backends [--requests 50] [--concurrency 4] [--openai-url URL] [--llama-model model.gguf]
+"""
+
+import argparse
+import os
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from agents.backends import HFInferenceBackend, InferenceBackend, LlamaCppBackend, OpenAICompatibleBackend
+from agents.prompt_templates import PromptBuilder, estimate_tokens
+from benchmarks.stub_server import StubInferenceServer
+
+
+def _percentile(samples, fraction: float) -> float:
+    samples = sorted(samples)
+    return samples[max(0, int(len(samples) * fraction) - 1)]
+
+
+def _first_token_ms(backend: InferenceBackend, prompt: str, params) -> float:
+    start = time.perf_counter()
+    with backend.open_stream(prompt, params, timeout=300) as stream:
+        for _ in stream:
+            elapsed = (time.perf_counter() - start) * 1000
+            break
+        else:
+            elapsed = (time.perf_counter() - start) * 1000
+        for _ in stream:
+            pass
+    return elapsed
+
+
+def _bench(backend: InferenceBackend, prompt: str, params, n: int, concurrency: int):
+    """(median ms, p95 ms, median first-token ms, requests/s, output tokens/s)"""
+    # Warm up: connection pools, or loading the model into memory
+    backend.generate(prompt, params, timeout=300)
+    
+    latencies = []
+    for _ in range(n):
+        start = time.perf_counter()
+        backend.generate(prompt, params, timeout=300)
+        latencies.append((time.perf_counter() - start) * 1000)
+    
+    first_tokens = [_first_token_ms(backend, prompt, params) for _ in range(max(1, n // 5))]
+    
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        outputs = list(pool.map(lambda _: backend.generate(prompt, params, timeout=300), range(n)))
+    elapsed = time.perf_counter() - start
+    tokens = sum(estimate_tokens(text) for text in outputs)
+    
+    return (statistics.median(latencies), _percentile(latencies, 0.95), statistics.median(first_tokens),
+            n / elapsed, tokens / elapsed)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--requests", type=int, default=50, help="Requests per backend and mode")
+    parser.add_argument("--concurrency", type=int, default=4, help="Threads for the throughput run")
+    parser.add_argument("--latency", type=float, default=0.0, help="Stub server think time in seconds")
+    parser.add_argument("--max-tokens", type=int, default=200, help="max_new_tokens per request")
+    parser.add_argument("--openai-url", help="Real OpenAI-compatible server to measure (default: the stub)")
+    parser.add_argument("--openai-model", default="local-model")
+    parser.add_argument("--llama-model", help="GGUF file to measure in-process with llama-cpp-python")
+    parser.add_argument("--llama-threads", type=int, help="CPU threads for llama.cpp")
+    args = parser.parse_args()
+    
+    prompt, _ = PromptBuilder().build(4, "Photosynthesis")
+    params = {"max_new_tokens": args.max_tokens, "temperature": 0.7, "top_p": 0.9, "return_full_text": False}
+    
+    with StubInferenceServer(latency=args.latency) as server:
+        backends = [
+            ("hf (stub)", HFInferenceBackend(server.url)),
+            ("openai (stub)", OpenAICompatibleBackend(server.openai_url)),
+        ]
+        if args.openai_url:
+            backends.append(("openai", OpenAICompatibleBackend(args.openai_url, args.openai_model)))
+        if args.llama_model:
+            try:
+                backends.append(("llamacpp", LlamaCppBackend(args.llama_model, n_threads=args.llama_threads)))
+            except ImportError as e:
+                print(f"Skipping llamacpp: {e}")
+        
+        print("=" * 78)
+        print(f"{args.requests} requests per backend, {args.concurrency} threads for throughput, "
+              f"{os.cpu_count()} CPUs")
+        print("=" * 78)
+        print(f"{'backend':>14} | {'median ms':>9} | {'p95 ms':>8} | {'1st token ms':>12} | {'req/s':>7} | {'tok/s':>8}")
+        print("-" * 78)
+        for label, backend in backends:
+            try:
+                median, p95, first_token, rps, tps = _bench(backend, prompt, params, args.requests, args.concurrency)
+            except Exception as e:
+                print(f"{label:>14} | failed: {e}")
+                continue
+            print(f"{label:>14} | {median:>9.2f} | {p95:>8.2f} | {first_token:>12.2f} | {rps:>7.1f} | {tps:>8.0f}")
+        print()
+        print("Stub rows measure client overhead only; point --openai-url / --llama-model at real models")
+        print("to compare CPU inference. llama.cpp calls are serialised, so its req/s won't scale with threads.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""
+Benchmark - Re-validating a content library: a one-at-a-time loop vs. the bulk validator's process pool
+Run with: python -m benchmarks.bench_bulk_validation [--items 20000] [--workers 1,2,4] [--chunksize 256]
+"""
+
+import argparse
+import json
+import os
+import random
+import tempfile
+import time
+
+from agents.bulk_validation import BulkValidator
+from agents.reviewer_agent import ReviewerAgent
+from agents.template_library import TemplateLibrary
+from utils.validator import AdvancedValidator
+
+
+def write_library(path: str, n: int, seed: int = 0):
+    """n stored items (template content at random grades) as JSON Lines"""
+    library = TemplateLibrary.open()
+    rnd = random.Random(seed)
+    with open(path, 'w', encoding='utf-8') as f:
+        for i in range(n):
+            topic = rnd.choice(library.topics)
+            grade = rnd.randint(1, 12)
+            content = library.lookup(grade, topic)
+            f.write(json.dumps({"id": str(i), "grade": grade, "topic": topic, "content": content}) + "\n")
+
+
+def loop_validate(input_path: str, output_path: str) -> int:
+    """The loop the library re-check used to be: decode, review, validate, encode, one item at a time"""
+    reviewer = ReviewerAgent()
+    count = 0
+    with open(input_path, encoding='utf-8') as src, open(output_path, 'w', encoding='utf-8') as out:
+        for line in src:
+            item = json.loads(line)
+            review = reviewer.review_content(item["content"], item["grade"], item["topic"])
+            validation = AdvancedValidator.comprehensive_validation(item["content"], item["grade"], item["topic"])
+            out.write(json.dumps({"id": item["id"], "review": review, "validation": validation}) + "\n")
+            count += 1
+    return count
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--items", type=int, default=20000)
+    parser.add_argument("--workers", default=None,
+                        help=f"Comma-separated worker counts (default: 1 and {os.cpu_count()})")
+    parser.add_argument("--chunksize", type=int, default=256)
+    args = parser.parse_args()
+    workers = [int(w) for w in args.workers.split(",")] if args.workers else sorted({1, os.cpu_count() or 1})
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        input_path = os.path.join(tmp, "library.jsonl")
+        output_path = os.path.join(tmp, "results.jsonl")
+        write_library(input_path, args.items)
+        
+        rows = []
+        start = time.perf_counter()
+        loop_validate(input_path, output_path)
+        rows.append(("one-at-a-time loop", time.perf_counter() - start))
+        
+        for count in workers:
+            summary = BulkValidator(workers=count, chunksize=args.chunksize).run(input_path, output_path)
+            rows.append((f"BulkValidator, {count} worker(s)", summary["elapsed"]))
+    
+    print("=" * 72)
+    print(f"{args.items} items, chunks of {args.chunksize}, {os.cpu_count()} CPU(s)")
+    print("=" * 72)
+    print(f"{'mode':>32} | {'seconds':>8} | {'items/s':>8} | {'1M items':>9}")
+    for label, seconds in rows:
+        rate = args.items / seconds
+        print(f"{label:>32} | {seconds:>8.2f} | {rate:>8.0f} | {1_000_000 / rate / 60:>7.1f} m")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""
+Benchmark - Per-request cost of new connections vs. the pooled keep-alive session
+Run with: python -m benchmarks.bench_http_pool [--requests 500] [--latency 0]
+"""
+
+import argparse
+import statistics
+import time
+
+import requests
+
+from agents.generator_agent import GeneratorAgent
+from agents.http_session import get_shared_session
+from benchmarks.stub_server import StubInferenceServer
+
+
+def _run(server: StubInferenceServer, post, n: int):
+    """Median/p95 latency in ms and TCP connections opened for n calls"""
+    connections_before = server.connections
+    samples = []
+    for _ in range(n):
+        start = time.perf_counter()
+        response = post(server.url, json={"inputs": "ping", "parameters": {}}, timeout=30)
+        response.json()
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    return statistics.median(samples), samples[int(len(samples) * 0.95) - 1], server.connections - connections_before
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--requests", type=int, default=500, help="Requests per mode")
+    parser.add_argument("--latency", type=float, default=0.0, help="Stub server think time in seconds")
+    args = parser.parse_args()
+    
+    with StubInferenceServer(latency=args.latency) as server:
+        print("=" * 60)
+        print(f"{args.requests} requests against a local stub (plain HTTP, no TLS)")
+        print("=" * 60)
+        print(f"{'mode':>18} | {'median ms':>9} | {'p95 ms':>7} | {'connections':>11}")
+        print("-" * 60)
+        
+        for label, post in [("requests.post", requests.post),
+                            ("pooled session", get_shared_session().post)]:
+            median, p95, connections = _run(server, post, args.requests)
+            print(f"{label:>18} | {median:>9.3f} | {p95:>7.3f} | {connections:>11}")
+        
+        generator = GeneratorAgent()
+        generator.api_url = server.url
+        start = time.perf_counter()
+        for _ in range(args.requests):
+            generator._call_hf_api("ping")
+        per_call = (time.perf_counter() - start) * 1000 / args.requests
+        print(f"{'GeneratorAgent':>18} | {per_call:>9.3f} | {'-':>7} | {'(shared pool)':>11}")
+        print()
+        print("TLS handshakes against the real endpoint make the saving per request larger.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+Benchmark - Response parsing success rate and cost: find/rfind slicing vs. the JSON extractor
+Run with: python -m benchmarks.bench_json_extract [--cases 5000] [--seed 0]
+"""
+
+import argparse
+import json
+import time
+from collections import Counter
+
+from agents.json_extract import extract_content
+from benchmarks.json_corpus import SAMPLES, fuzz_corpus
+
+
+def legacy_parse(response_text: str):
+    """The original _parse_response: first '{' to last '}' through json.loads"""
+    start = response_text.find('{')
+    end = response_text.rfind('}') + 1
+    if start != -1 and end > start:
+        content = json.loads(response_text[start:end])
+        if 'explanation' in content and 'mcqs' in content:
+            return content
+    raise ValueError("Failed to parse response")
+
+
+def _succeeds(parse, text: str) -> bool:
+    try:
+        parse(text)
+        return True
+    except Exception:
+        return False
+
+
+def _time_us(parse, texts) -> float:
+    start = time.perf_counter()
+    for text in texts:
+        _succeeds(parse, text)
+    return (time.perf_counter() - start) / len(texts) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--cases", type=int, default=5000, help="Number of fuzzed outputs")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    
+    print("=" * 60)
+    print("Hand-written samples")
+    print("=" * 60)
+    print(f"{'sample':>30} | {'legacy':>6} | {'extractor':>9}")
+    for name, text, _ in SAMPLES:
+        legacy = "ok" if _succeeds(legacy_parse, text) else "FAIL"
+        new = "ok" if _succeeds(extract_content, text) else "FAIL"
+        print(f"{name:>30} | {legacy:>6} | {new:>9}")
+    
+    cases = fuzz_corpus(args.cases, args.seed)
+    totals = Counter(mutation for mutation, _ in cases)
+    legacy_ok = Counter(mutation for mutation, text in cases if _succeeds(legacy_parse, text))
+    new_ok = Counter(mutation for mutation, text in cases if _succeeds(extract_content, text))
+    
+    print()
+    print("=" * 60)
+    print(f"Fuzzed outputs ({args.cases} cases, seed {args.seed}) - % parsed")
+    print("=" * 60)
+    print(f"{'mutation':>16} | {'cases':>5} | {'legacy':>7} | {'extractor':>9}")
+    for mutation in sorted(totals):
+        print(f"{mutation:>16} | {totals[mutation]:>5} | {legacy_ok[mutation] / totals[mutation]:>7.0%} | "
+              f"{new_ok[mutation] / totals[mutation]:>9.0%}")
+    print(f"{'all':>16} | {len(cases):>5} | {sum(legacy_ok.values()) / len(cases):>7.0%} | "
+          f"{sum(new_ok.values()) / len(cases):>9.0%}")
+    
+    clean = [text for name, text, _ in SAMPLES if name == "clean"] * 200
+    fuzzed = [text for _, text in cases]
+    print()
+    print(f"{'cost (us/parse)':>16} | {'legacy':>7} | {'extractor':>9}")
+    print(f"{'clean output':>16} | {_time_us(legacy_parse, clean):>7.1f} | {_time_us(extract_content, clean):>9.1f}")
+    print(f"{'fuzzed output':>16} | {_time_us(legacy_parse, fuzzed):>7.1f} | {_time_us(extract_content, fuzzed):>9.1f}")
+    print()
+    print("Every failed parse costs a full API round trip (plus backoff) to resample.")
+
+
+if __name__ == "__main__":
+    main()
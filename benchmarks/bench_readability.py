@@ -0,0 +1,75 @@
+"""
+Benchmark - Reading level scoring: the original per-character syllable loop vs. the readability engine
+Run with: python -m benchmarks.bench_readability [--documents 2000] [--seed 0]
+"""
+
+import argparse
+import random
+import time
+
+from agents.template_library import TemplateLibrary
+from benchmarks.bench_review import legacy_reading_level
+from utils import readability, text_analysis
+from utils.validator import AdvancedValidator
+
+
+def documents(n: int, seed: int):
+    """n explanations of 3-30 sentences drawn from the template library"""
+    library = TemplateLibrary.open()
+    sentences = []
+    for topic in library.topics:
+        for grade in (3, 9):
+            sentences.extend(s.strip() + "." for s in library.lookup(grade, topic)["explanation"].split(".") if s.strip())
+    rnd = random.Random(seed)
+    return [" ".join(rnd.choice(sentences) for _ in range(rnd.randint(3, 30))) for _ in range(n)]
+
+
+def _time_ms(fn, setup=lambda: None, repeat: int = 5) -> float:
+    """Best of repeat runs of fn(), each after setup()"""
+    best = float('inf')
+    for _ in range(repeat):
+        setup()
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--documents", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    
+    texts = documents(args.documents, args.seed)
+    words = sum(len(text.split()) for text in texts)
+    same = all(legacy_reading_level(text, 5) == AdvancedValidator.check_reading_level(text, 5) for text in texts)
+    
+    def cold():
+        readability.count_syllables.cache_clear()
+        text_analysis._analyze.cache_clear()
+    
+    legacy = _time_ms(lambda: [legacy_reading_level(text, 5) for text in texts])
+    first = _time_ms(lambda: [AdvancedValidator.check_reading_level(text, 5) for text in texts], cold)
+    warm = _time_ms(lambda: [AdvancedValidator.check_reading_level(text, 5) for text in texts],
+                    text_analysis._analyze.cache_clear)
+    batch = _time_ms(lambda: readability.score_batch(texts), cold)
+    
+    print("=" * 70)
+    print(f"{len(texts)} documents, {words} words")
+    print("=" * 70)
+    print(f"{'mode':>42} | {'total ms':>9} | {'us/doc':>7}")
+    for label, ms in [("legacy check_reading_level (FK only)", legacy),
+                      ("check_reading_level, empty syllable memo", first),
+                      ("check_reading_level, warm syllable memo", warm),
+                      ("score_batch (FK, FRE, SMOG, Coleman-Liau)", batch)]:
+        print(f"{label:>42} | {ms:>9.1f} | {ms / len(texts) * 1000:>7.1f}")
+    print()
+    print(f"Flesch-Kincaid messages identical to the original: {'yes' if same else 'NO'}")
+    
+    scores = readability.score(texts[0])
+    print(f"First document: {scores.as_dict()}")
+
+
+if __name__ == "__main__":
+    main()
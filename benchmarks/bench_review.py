@@ -0,0 +1,209 @@
+"""
+Benchmark - Explanation checks (reviewer + validator) before and after shared text analysis
+Run with: python -m benchmarks.bench_review [--repeat 200]
+"""
+
+import argparse
+import re
+import time
+
+from agents.reviewer_agent import ReviewerAgent
+from agents.template_library import TemplateLibrary
+from utils import text_analysis
+from utils.validator import AdvancedValidator
+
+GRADES = (2, 4, 7, 10)
+
+
+def legacy_check_explanation(reviewer: ReviewerAgent, explanation: str, grade: int, topic: str):
+    """The original ReviewerAgent._check_explanation"""
+    feedback = []
+    
+    if not explanation or len(explanation.strip()) < 50:
+        feedback.append("Explanation is too short - needs more detail")
+        return feedback
+    
+    sentences = re.split(r'[.!?]+', explanation)
+    sentences = [s.strip() for s in sentences if s.strip()]
+    
+    max_words_per_sentence = {
+        1: 8, 2: 10, 3: 12, 4: 15, 5: 18,
+        6: 20, 7: 22, 8: 25, 9: 28, 10: 30
+    }
+    max_words = max_words_per_sentence.get(grade, 20)
+    
+    for i, sentence in enumerate(sentences, 1):
+        word_count = len(sentence.split())
+        if word_count > max_words + 5:
+            feedback.append(
+                f"Sentence {i} is too long ({word_count} words) for Grade {grade} - "
+                f"try breaking it into shorter sentences"
+            )
+    
+    words = explanation.lower().split()
+    max_length = reviewer.max_word_length.get(grade, 12)
+    
+    complex_words_found = []
+    for word in words:
+        clean_word = re.sub(r'[^a-z]', '', word)
+        if len(clean_word) > max_length + 3:
+            complex_words_found.append(clean_word)
+    
+    if complex_words_found and grade <= 5:
+        feedback.append(
+            f"Some words may be too complex for Grade {grade}: {', '.join(set(complex_words_found[:3]))}"
+        )
+    
+    if grade in reviewer.complex_words_by_grade:
+        inappropriate = []
+        for complex_word in reviewer.complex_words_by_grade[grade]:
+            if complex_word in explanation.lower():
+                inappropriate.append(complex_word)
+        
+        if inappropriate:
+            feedback.append(
+                f"These words might be too advanced for Grade {grade}: {', '.join(inappropriate)}"
+            )
+    
+    if topic.lower() not in explanation.lower():
+        feedback.append(f"Explanation should clearly mention the topic '{topic}'")
+    
+    engagement_markers = ['?', 'example', 'like', 'imagine', 'think about', 'we can']
+    has_engagement = any(marker in explanation.lower() for marker in engagement_markers)
+    
+    if not has_engagement and grade <= 5:
+        feedback.append("Consider adding examples or questions to make it more engaging for young students")
+    
+    return feedback
+
+
+def legacy_count_syllables(word: str) -> int:
+    """The original AdvancedValidator._count_syllables"""
+    word = word.lower()
+    vowels = 'aeiouy'
+    syllable_count = 0
+    previous_was_vowel = False
+    
+    for char in word:
+        is_vowel = char in vowels
+        if is_vowel and not previous_was_vowel:
+            syllable_count += 1
+        previous_was_vowel = is_vowel
+    
+    if word.endswith('e'):
+        syllable_count -= 1
+    
+    return max(1, syllable_count)
+
+
+def legacy_reading_level(text: str, grade: int):
+    """The original AdvancedValidator.check_reading_level"""
+    if not text:
+        return False, "Empty text"
+    
+    sentences = len(re.split(r'[.!?]+', text))
+    if sentences == 0:
+        sentences = 1
+    
+    words = len(text.split())
+    if words == 0:
+        return False, "No words in text"
+    
+    syllables = sum(legacy_count_syllables(word) for word in text.split())
+    
+    avg_words_per_sentence = words / sentences
+    avg_syllables_per_word = syllables / words if words > 0 else 0
+    reading_level = (0.39 * avg_words_per_sentence) + (11.8 * avg_syllables_per_word) - 15.59
+    
+    if abs(reading_level - grade) <= 2:
+        return True, f"Reading level appropriate (~Grade {reading_level:.1f})"
+    else:
+        return False, f"Reading level mismatch: text is Grade {reading_level:.1f}, target is Grade {grade}"
+
+
+def legacy_structure(explanation: str, grade: int):
+    """The original AdvancedValidator.check_explanation_structure"""
+    issues = []
+    
+    word_count = len(explanation.split())
+    min_words = 30 + (grade * 5)
+    max_words = 150 + (grade * 10)
+    
+    if word_count < min_words:
+        issues.append(f"Explanation too brief ({word_count} words, need ~{min_words})")
+    elif word_count > max_words:
+        issues.append(f"Explanation too long ({word_count} words, max ~{max_words})")
+    
+    paragraphs = explanation.split('\n\n')
+    if len(paragraphs) < 2 and word_count > 100:
+        issues.append("Long explanation should be split into paragraphs")
+    
+    example_markers = ['example', 'like', 'such as', 'for instance', 'imagine']
+    has_example = any(marker in explanation.lower() for marker in example_markers)
+    
+    if not has_example and grade <= 6:
+        issues.append("Consider adding examples for better understanding")
+    
+    questions = explanation.count('?')
+    if questions == 0 and grade <= 5:
+        issues.append("Could use questions to engage younger students")
+    
+    return len(issues) == 0, issues
+
+
+def legacy_checks(reviewer: ReviewerAgent, text: str, grade: int, topic: str):
+    return (legacy_check_explanation(reviewer, text, grade, topic), legacy_reading_level(text, grade),
+            legacy_structure(text, grade))
+
+
+def current_checks(reviewer: ReviewerAgent, text: str, grade: int, topic: str):
+    return (reviewer._check_explanation(text, grade, topic), AdvancedValidator.check_reading_level(text, grade),
+            AdvancedValidator.check_explanation_structure(text, grade))
+
+
+def corpus():
+    """(label, topic, explanation) at a few lengths, built from the template library"""
+    library = TemplateLibrary.open()
+    texts = [(topic, library.lookup(4, topic)["explanation"]) for topic in library.topics]
+    joined = "\n\n".join(text for _, text in texts)
+    return [
+        ("single lesson", texts[0][0], texts[0][1]),
+        ("10 lessons", texts[1][0], joined),
+        ("100 lessons", texts[2][0], "\n\n".join([joined] * 10)),
+    ]
+
+
+def _time_us(check, reviewer, text, topic, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for grade in GRADES:
+            # Each review is of a new text: don't let the analysis cache answer across passes
+            text_analysis._analyze.cache_clear()
+            check(reviewer, text, grade, topic)
+    return (time.perf_counter() - start) / (repeat * len(GRADES)) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=200, help="Timed passes over the smallest text")
+    args = parser.parse_args()
+    
+    # Compare like with like: the legacy checks had no lexicon
+    reviewer = ReviewerAgent()
+    reviewer.lexicon = None
+    print("=" * 64)
+    print("Reviewer explanation check + validator reading level and structure")
+    print("=" * 64)
+    print(f"{'text':>14} | {'words':>6} | {'legacy us':>10} | {'shared us':>10} | {'speedup':>7} | same")
+    for label, topic, text in corpus():
+        same = all(legacy_checks(reviewer, text, grade, topic) == current_checks(reviewer, text, grade, topic)
+                   for grade in GRADES)
+        repeat = max(1, args.repeat * 150 // len(text.split()))
+        legacy = _time_us(legacy_checks, reviewer, text, topic, repeat)
+        current = _time_us(current_checks, reviewer, text, topic, repeat)
+        print(f"{label:>14} | {len(text.split()):>6} | {legacy:>10.1f} | {current:>10.1f} | "
+              f"{legacy / current:>6.1f}x | {'yes' if same else 'NO'}")
+
+
+if __name__ == "__main__":
+    main()
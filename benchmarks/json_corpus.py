@@ -0,0 +1,94 @@
+"""
+JSON Corpus - Model-output samples for exercising the response parser
+Hand-written samples of the formatting faults instruction-tuned models produce,
+plus a seeded fuzzer that applies those faults to valid content
+"""
+
+import json
+import random
+from typing import List, Tuple
+
+from benchmarks.stub_server import STUB_CONTENT
+
+CONTENT = {
+    "explanation": "Plants make their own food using sunlight. This is called photosynthesis.\n\n"
+                   "Leaves take in air and roots drink water. The sun gives the energy!",
+    "mcqs": [
+        {
+            "question": "What do plants need to make food?",
+            "options": ["A) Sunlight", "B) Toys", "C) Music", "D) Sand"],
+            "answer": "A"
+        },
+        {
+            "question": "Which part of a plant drinks water?",
+            "options": ["A) Flower", "B) Roots", "C) Leaf", "D) Seed"],
+            "answer": "B"
+        },
+        {
+            "question": "What is it called when plants make food?",
+            "options": ["A) Digestion", "B) Breathing", "C) Photosynthesis", "D) Sleeping"],
+            "answer": "C"
+        }
+    ]
+}
+
+_PRETTY = json.dumps(CONTENT, indent=2)
+_STUB = json.dumps(STUB_CONTENT)
+
+# (name, model output, parseable) - written by hand to mirror common failure
+# modes, not captured from the live endpoint
+SAMPLES: List[Tuple[str, str, bool]] = [
+    ("clean", _PRETTY, True),
+    ("preamble", "Sure! Here is the content for Grade 4 students:\n\n" + _PRETTY, True),
+    ("code_fence", "```json\n" + _PRETTY + "\n```", True),
+    ("trailing_prose_with_braces", _PRETTY + "\n\nNote: use {curly braces} for sets.", True),
+    ("second_object", _PRETTY + "\n\nHere is another version:\n" + _STUB, True),
+    ("stray_closing_brace", _PRETTY + "\n}", True),
+    ("stray_opening_brace", "Format { explanation, mcqs }:\n" + _PRETTY, True),
+    ("unbalanced_prose_brace", "The answer { is below\n" + _PRETTY, True),
+    ("braces_in_strings", json.dumps({**CONTENT, "explanation": "Sets look like {1, 2} and lists like [3]."}), True),
+    ("trailing_commas", _PRETTY.replace('"A"\n', '"A",\n').replace('}\n  ]', '},\n  ]'), True),
+    ("single_quotes", "{'explanation': 'Plants make food from sunlight.', 'mcqs': ["
+                      "{'question': 'What do plants need?', 'options': ['A) Sun', 'B) Toys', 'C) Sand', 'D) Rock'],"
+                      " 'answer': 'A'}]}", True),
+    ("single_quotes_with_apostrophe", "{'explanation': 'A plant\\'s leaves are \"kitchens\".', 'mcqs': []}", True),
+    ("raw_newlines", '{"explanation": "Line one.\nLine two.", "mcqs": []}', True),
+    ("truncated_in_last_mcq", _PRETTY[:_PRETTY.rindex('"answer"') - 10], True),
+    ("truncated_after_mcq", _PRETTY[:_PRETTY.rindex('{') - 4], True),
+    ("wrapped", json.dumps({"response": CONTENT}), True),
+    ("no_json", "I'm sorry, I can't help with that request.", False),
+    ("wrong_schema", '{"text": "Plants make food", "questions": []}', False),
+    ("truncated_in_explanation", _PRETTY[:60], False),
+]
+
+MUTATIONS = ("preamble", "suffix", "fence", "trailing_comma", "single_quotes", "truncate", "duplicate")
+
+
+def mutate(rng: random.Random, content=CONTENT) -> Tuple[str, str]:
+    """Apply one random fault to serialised content; returns (mutation, text)"""
+    mutation = rng.choice(MUTATIONS)
+    text = json.dumps(content, indent=rng.choice([None, 2]))
+    
+    if mutation == "preamble":
+        text = rng.choice(["Here you go:\n", "Sure! {Grade 4} content:\n", "Answer:\n\n"]) + text
+    elif mutation == "suffix":
+        text += rng.choice(["\n}", "\nLet me know if you need {more}!", "\n\n{\"note\": 1}"])
+    elif mutation == "fence":
+        text = "```json\n" + text + "\n```"
+    elif mutation == "trailing_comma":
+        text = text.replace("]", ",]", 1).replace("}", ",}", 1)
+    elif mutation == "single_quotes":
+        text = text.replace('"', "'")
+    elif mutation == "truncate":
+        # Cut somewhere after the second question has been written
+        cut = text.index("Which part")
+        text = text[:rng.randint(cut, len(text) - 1)]
+    elif mutation == "duplicate":
+        text = text + "\n" + text
+    return mutation, text
+
+
+def fuzz_corpus(n: int = 1000, seed: int = 0) -> List[Tuple[str, str]]:
+    """n seeded (mutation, text) cases, each recoverable to at least one MCQ"""
+    rng = random.Random(seed)
+    return [mutate(rng) for _ in range(n)]
@@ -0,0 +1,171 @@
+"""
+Stub Inference Server - Local stand-in for the Hugging Face inference endpoint (and OpenAI-compatible servers)
+Used by benchmarks and tests so they never touch the public API
+"""
+
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Tuple
+
+STUB_CONTENT = {
+    "explanation": "Angles are everywhere around us! When two lines meet at a point, they make an angle.",
+    "mcqs": [
+        {
+            "question": "What does a right angle look like?",
+            "options": ["A) Like the corner of a book", "B) Like a full circle",
+                        "C) Like a straight line", "D) Like the letter Z"],
+            "answer": "A"
+        }
+    ]
+}
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Headers and body go out in separate writes; avoid Nagle/delayed-ACK stalls
+    disable_nagle_algorithm = True
+    
+    def setup(self):
+        super().setup()
+        with self.server.stub.lock:
+            self.server.stub.connections += 1
+    
+    def do_POST(self):
+        stub = self.server.stub
+        length = int(self.headers.get("Content-Length", 0))
+        body = json.loads(self.rfile.read(length) or b"{}")
+        
+        with stub.lock:
+            stub.requests += 1
+            stub.last_payload = body
+            scripted = stub.script.pop(0) if stub.script else None
+            stub.in_flight += 1
+            stub.peak_in_flight = max(stub.peak_in_flight, stub.in_flight)
+        try:
+            self._answer(stub, body, scripted)
+        finally:
+            with stub.lock:
+                stub.in_flight -= 1
+    
+    def _answer(self, stub, body: Dict, scripted: Optional[Tuple[int, object, Dict[str, str]]]):
+        if stub.latency:
+            time.sleep(stub.latency)
+        
+        # OpenAI-compatible servers answer on <root>/completions
+        openai = self.path.endswith("/completions")
+        
+        if scripted is None and body.get("stream"):
+            self._stream_tokens(stub, openai)
+            return
+        
+        if scripted is not None:
+            status, response_body, headers = scripted
+        elif openai:
+            status, headers = 200, {}
+            response_body = {"object": "text_completion", "model": body.get("model"),
+                             "choices": [{"index": 0, "text": stub.response_text, "finish_reason": "stop"}]}
+        else:
+            status, response_body, headers = 200, [{"generated_text": stub.response_text}], {}
+        
+        payload = json.dumps(response_body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(payload)
+    
+    def _stream_tokens(self, stub, openai: bool = False):
+        """Answer as server-sent events, one token per event (chunked encoding)"""
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        
+        text = stub.response_text
+        tokens = [text[i:i + stub.token_size] for i in range(0, len(text), stub.token_size)]
+        for n, token in enumerate(tokens):
+            if openai:
+                event = {"object": "text_completion", "choices": [{"index": 0, "text": token, "finish_reason": None}]}
+            else:
+                event = {"token": {"id": n, "text": token, "special": False}, "generated_text": None}
+                if n == len(tokens) - 1:
+                    event["generated_text"] = text
+            self._write_chunk(f"data: {json.dumps(event)}\n\n".encode("utf-8"))
+            if stub.token_delay:
+                time.sleep(stub.token_delay)
+        if openai:
+            self._write_chunk(b"data: [DONE]\n\n")
+        self._write_chunk(b"")
+    
+    def _write_chunk(self, data: bytes):
+        self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+        self.wfile.flush()
+    
+    def log_message(self, format, *args):
+        pass
+
+
+class StubInferenceServer:
+    """
+    Threaded local HTTP server that answers like the inference API
+    
+    Use as a context manager; `url` is the endpoint to point an agent at
+    (`openai_url` for the OpenAI-compatible completions API).
+    Counts TCP connections and requests so callers can check connection reuse,
+    and the most requests it was answering at once so they can check concurrency.
+    """
+    
+    def __init__(self, response_text: Optional[str] = None, latency: float = 0.0,
+                 script: Optional[List[Tuple[int, object, Dict[str, str]]]] = None,
+                 token_size: int = 8, token_delay: float = 0.0):
+        """
+        Args:
+            response_text: generated_text to return (defaults to STUB_CONTENT as JSON)
+            latency: Seconds to wait before answering each request
+            script: (status, JSON body, headers) responses served in order
+                before falling back to normal 200 answers, e.g. to simulate
+                rate limiting or a model that is still loading
+            token_size: Characters per token event for streamed ("stream": true) requests
+            token_delay: Seconds between streamed token events
+        """
+        self.response_text = response_text if response_text is not None else json.dumps(STUB_CONTENT)
+        self.latency = latency
+        self.script = list(script or [])
+        self.token_size = token_size
+        self.token_delay = token_delay
+        self.connections = 0
+        self.requests = 0
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.last_payload: Optional[Dict] = None
+        self.lock = threading.Lock()
+        self._server = None
+        self._thread = None
+    
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/models/stub"
+    
+    @property
+    def openai_url(self) -> str:
+        """API root for an OpenAICompatibleBackend"""
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/v1"
+    
+    def __enter__(self):
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), _StubHandler)
+        self._server.daemon_threads = True
+        self._server.stub = self
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+    
+    def __exit__(self, *exc):
+        self._server.shutdown()
+        self._server.server_close()
+        self._thread.join()
@@ -0,0 +1,292 @@
+"""
+Tests for analytics tracking and the append-only session log
+Run with: python -m pytest test_analytics.py
+"""
+
+import fcntl
+import json
+import os
+import sqlite3
+import threading
+from datetime import datetime, timedelta
+
+from utils.analytics import AnalyticsTracker, SessionColumns
+from utils.analytics_store import AnalyticsStore, JSONLinesStore, SQLiteStore
+
+
+def _session(grade=4, topic="Types of angles", status="pass"):
+    return {
+        "grade": grade,
+        "topic": topic,
+        "generation_time": 1.5,
+        "review_time": 0.1,
+        "total_time": 1.6,
+        "review_status": status,
+        "feedback_count": 1,
+        "refinement_needed": status == "fail",
+        "mcq_count": 3,
+        "explanation_length": 400
+    }
+
+
+def test_sessions_persist_across_trackers(tmp_path):
+    """Logged sessions are appended and reloaded by a new tracker"""
+    log_file = str(tmp_path / "analytics.jsonl")
+    tracker = AnalyticsTracker(analytics_file=log_file)
+    tracker.log_session(_session())
+    tracker.log_session(_session(grade=5, status="fail"))
+    
+    with open(log_file) as f:
+        assert len(f.readlines()) == 2
+    
+    reloaded = AnalyticsTracker(analytics_file=log_file)
+    assert len(reloaded.sessions) == 2
+    assert reloaded.get_statistics()["pass_rate"] == 50
+
+
+def test_torn_last_record_is_recovered(tmp_path):
+    """A half-written final record is dropped and the log stays appendable"""
+    log_file = str(tmp_path / "analytics.jsonl")
+    tracker = AnalyticsTracker(analytics_file=log_file)
+    tracker.log_session(_session())
+    tracker.store.close()
+    
+    with open(log_file, 'a') as f:
+        f.write('{"timestamp": "2024-01-01T00:00:00", "gra')
+    
+    reloaded = AnalyticsTracker(analytics_file=log_file)
+    assert len(reloaded.sessions) == 1
+    
+    reloaded.log_session(_session(grade=6))
+    assert [s["grade"] for s in AnalyticsTracker(analytics_file=log_file).sessions] == [4, 6]
+
+
+def test_append_in_progress_is_not_truncated_or_lost(tmp_path):
+    """While another process is appending, starting trackers and compaction leave its record alone"""
+    log_file = str(tmp_path / "analytics.jsonl")
+    store = JSONLinesStore(log_file, fsync_policy="never")
+    store.append({"n": 0})
+    
+    # Another writer, holding the shared append lock, has written half its record
+    other = os.open(log_file + ".lock", os.O_RDWR)
+    fcntl.flock(other, fcntl.LOCK_SH)
+    with open(log_file, 'a') as f:
+        f.write('{"n": 1')
+    
+    assert len(AnalyticsTracker(analytics_file=log_file).sessions) == 1
+    compaction = threading.Thread(target=JSONLinesStore(log_file, max_records=10).compact)
+    compaction.start()
+    compaction.join(0.1)
+    # Compaction waits for the append to finish before reading the log
+    assert compaction.is_alive()
+    
+    with open(log_file, 'a') as f:
+        f.write('}\n')
+    fcntl.flock(other, fcntl.LOCK_UN)
+    os.close(other)
+    compaction.join()
+    
+    assert [record["n"] for record in store.load()] == [0, 1]
+    store.close()
+
+
+def test_compaction_drops_corrupt_records_and_applies_retention(tmp_path):
+    """Compaction rewrites the log with only the newest valid records"""
+    log_file = str(tmp_path / "analytics.jsonl")
+    with open(log_file, 'w') as f:
+        f.write('not json\n')
+    
+    store = JSONLinesStore(log_file, fsync_policy="never", compact_every=5, max_records=3)
+    store.load()
+    for i in range(5):
+        store.append({"n": i})
+    
+    with open(log_file) as f:
+        assert [json.loads(line)["n"] for line in f] == [2, 3, 4]
+    assert store.record_count == 3
+
+
+def test_retention_applies_to_a_reopened_log(tmp_path):
+    """A log already over max_sessions is trimmed once compact_every more sessions are logged"""
+    log_file = str(tmp_path / "analytics.jsonl")
+    with open(log_file, 'w') as f:
+        for i in range(30):
+            f.write(json.dumps(_session(grade=i % 12 + 1)) + "\n")
+    
+    tracker = AnalyticsTracker(analytics_file=log_file, fsync_policy="never", max_sessions=20, compact_every=5)
+    assert tracker.store.record_count == 30
+    tracker.log_sessions([_session() for _ in range(5)])
+    
+    with open(log_file) as f:
+        assert sum(1 for _ in f) == 20
+    assert tracker.store.record_count == 20
+    assert tracker.get_statistics()["total_generations"] == 20
+
+
+def test_legacy_json_log_is_migrated(tmp_path):
+    """An existing analytics_log.json is imported into the JSON Lines log once"""
+    legacy_file = tmp_path / "analytics.json"
+    legacy_file.write_text(json.dumps([dict(_session(), timestamp="2024-01-01T00:00:00")]))
+    
+    tracker = AnalyticsTracker(analytics_file=str(tmp_path / "analytics.jsonl"))
+    assert len(tracker.sessions) == 1
+    assert os.path.exists(tmp_path / "analytics.jsonl")
+
+
+def test_running_statistics_match_reloaded_history(tmp_path):
+    """Counters updated in log_session agree with the ones rebuilt at load"""
+    log_file = str(tmp_path / "analytics.jsonl")
+    tracker = AnalyticsTracker(analytics_file=log_file)
+    for grade, topic, status in [(4, "Angles", "pass"), (4, "Fractions", "fail"),
+                                 (5, "Angles", "pass"), (None, "", "pass")]:
+        tracker.log_session(_session(grade=grade, topic=topic, status=status))
+    
+    stats = tracker.get_statistics()
+    assert stats["total_generations"] == 4
+    assert stats["pass_rate"] == 75
+    assert stats["refinement_rate"] == 25
+    assert stats["most_common_grade"] == 4
+    assert stats["total_topics"] == 2
+    assert tracker.get_grade_distribution() == {4: 2, 5: 1}
+    
+    reloaded = AnalyticsTracker(analytics_file=log_file)
+    assert reloaded.get_statistics() == stats
+
+
+def test_lazy_tracker_starts_from_snapshot(tmp_path):
+    """Lazy trackers reuse the saved aggregates and read recent sessions from the log tail"""
+    log_file = str(tmp_path / "analytics.jsonl")
+    writer = AnalyticsTracker(analytics_file=log_file)
+    writer.SNAPSHOT_EVERY = 3
+    for grade in range(1, 8):
+        writer.log_session(_session(grade=grade))
+    
+    with open(log_file + ".stats.json") as f:
+        assert json.load(f)["stats"]["total"] == 6
+    # Snapshots are written through a per-process temp file, renamed into place
+    assert not list(tmp_path.glob("*.tmp"))
+    
+    lazy = AnalyticsTracker(analytics_file=log_file, lazy=True)
+    assert lazy._sessions is None
+    assert lazy.get_statistics() == writer.get_statistics()
+    assert [s["grade"] for s in lazy.get_recent_sessions(limit=2)] == [7, 6]
+    assert lazy.get_performance_trends()["recent_pass_rate"] == 100
+    
+    writer.log_session(_session(grade=8))
+    assert lazy.get_statistics()["total_generations"] == 8
+    assert [s["grade"] for s in lazy.sessions] == list(range(1, 9))
+
+
+def test_session_columns_round_trip_and_trends():
+    """Columnar rows read back as the original session dicts"""
+    tracker = AnalyticsTracker(analytics_file="")
+    sessions = SessionColumns()
+    for i in range(20):
+        session = dict(_session(grade=i % 12 + 1, status="pass" if i >= 10 else "fail"),
+                       timestamp=f"2024-05-01T10:00:{i:02d}.250000",
+                       review_time=0.1, total_time=1.6, refinement_improved=None)
+        sessions.append(session)
+        tracker.log_session(session)
+    
+    assert sessions[-1] == session
+    assert sessions[0]["review_status"] == "fail"
+    assert len(sessions[5:8]) == 3
+    assert sessions.status_count("pass") == 10
+    
+    trends = tracker.get_performance_trends()
+    assert trends["recent_pass_rate"] == 100
+    assert trends["older_pass_rate"] == 0
+    assert trends["improving"]
+
+
+def test_session_columns_keep_values_the_columns_cannot_hold():
+    """Offset timestamps, odd field types and unknown keys round-trip unchanged"""
+    sessions = SessionColumns()
+    odd = dict(_session(), timestamp="2024-05-01T10:00:00+02:00", grade="5", feedback_count=2.5,
+               mcq_count=2 ** 40, generation_time=None, refinement_needed=1, review_status=None,
+               model="local", review_time=0.1, total_time=1.6, refinement_improved=None)
+    plain = dict(_session(), timestamp="2024-05-01T08:00:00", review_time=0.1, total_time=1.6,
+                 refinement_improved=None)
+    sessions.append(odd)
+    sessions.append(plain)
+    
+    assert sessions[0] == odd
+    assert sessions[1] == plain
+    # The offset timestamp is still stored as its UTC instant
+    assert sessions.timestamp[0] == sessions.timestamp[1]
+    assert sessions.status_count("unknown") == 1
+    assert len(sessions._overflow) == 1
+    
+    # Non-canonical spellings of a timestamp come back as written
+    for timestamp in ("2024-05-01T08:00:00.000000", "2024-05-01 08:00:00", "2024-05-01T08:00"):
+        sessions.append(dict(plain, timestamp=timestamp))
+        assert sessions[-1]["timestamp"] == timestamp
+    
+    # Statuses aren't limited by the column's integer width
+    for i in range(300):
+        sessions.append(dict(plain, review_status=f"status {i}"))
+    assert sessions[-1]["review_status"] == "status 299"
+    assert sessions.status_count("status 200") == 1
+
+
+def test_sqlite_backend_queries_and_sharing(tmp_path):
+    """The SQLite backend serves filtered and windowed queries and is shared between trackers"""
+    db_file = str(tmp_path / "analytics.db")
+    first = AnalyticsTracker(analytics_file=db_file, backend="sqlite")
+    second = AnalyticsTracker(analytics_file=db_file, backend="sqlite", lazy=True)
+    
+    first.log_sessions([_session(grade=4, topic="Angles"), _session(grade=5, topic="Fractions", status="fail")])
+    second.log_session(_session(grade=4, topic="Fractions"))
+    
+    assert first.get_statistics()["total_generations"] == 3
+    assert second.get_statistics() == first.get_statistics()
+    assert [s["topic"] for s in first.get_recent_sessions(grade=4)] == ["Fractions", "Angles"]
+    assert len(second.get_recent_sessions(topic="Fractions", limit=1)) == 1
+    
+    window = first.get_window_statistics(start=datetime.now() - timedelta(minutes=5), grade=5)
+    assert window["total_generations"] == 1
+    assert window["pass_rate"] == 0
+    assert first.get_window_statistics(end="2000-01-01")["total_generations"] == 0
+    assert round(first.get_performance_trends(window=timedelta(hours=1))["recent_pass_rate"]) == 67
+    
+    with sqlite3.connect(db_file) as conn:
+        assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+
+
+def test_sqlite_retention_resets_readers(tmp_path):
+    """Compaction with a retention limit makes other trackers rebuild their counters"""
+    db_file = str(tmp_path / "analytics.db")
+    reader = AnalyticsTracker(analytics_file=db_file, backend="sqlite")
+    tracker = AnalyticsTracker(analytics_file=db_file, backend="sqlite", max_sessions=2, compact_every=3)
+    tracker.log_sessions([_session(grade=grade) for grade in (1, 2)])
+    reader.log_session(_session(grade=3))
+    assert reader.get_statistics()["total_generations"] == 3
+    
+    tracker.log_session(_session(grade=4))
+    assert tracker.get_grade_distribution() == {3: 1, 4: 1}
+    assert reader.get_grade_distribution() == {3: 1, 4: 1}
+
+
+def test_sqlite_retention_runs_while_appending(tmp_path):
+    """max_records is enforced every compact_every inserts, without an explicit compaction"""
+    store = SQLiteStore(str(tmp_path / "analytics.db"), max_records=3, compact_every=4)
+    for grade in range(1, 9):
+        store.append(_session(grade=grade))
+    
+    assert store.record_count == 3
+    assert [record["grade"] for record in store.tail(10)] == [6, 7, 8]
+    store.close()
+
+
+def test_backends_must_implement_the_store_interface():
+    """AnalyticsStore is abstract: a backend missing append, scan or identity can't be created"""
+    class Incomplete(AnalyticsStore):
+        def append(self, record):
+            pass
+    
+    for backend in (AnalyticsStore, Incomplete):
+        try:
+            backend()
+            assert False, f"{backend.__name__} was instantiated"
+        except TypeError:
+            pass
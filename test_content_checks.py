@@ -0,0 +1,386 @@
+"""
+Tests for the content checks (ReviewerAgent, AdvancedValidator) and the text utilities behind them
+Run with: python -m pytest test_content_checks.py
+"""
+
+import json
+import random
+import re
+
+from agents.bulk_validation import BulkValidator, validate_item
+from agents.reviewer_agent import ReviewerAgent
+from agents.template_library import TemplateLibrary
+from utils import readability
+from utils.lexicon import Lexicon, build_lexicon
+from utils.phrase_matcher import PhraseMatcher, compile_phrases
+from utils.text_analysis import analyze
+from utils.validator import AdvancedValidator
+
+
+# Reference implementations: the checks as originally written, before tokenising once,
+# phrase matching and memoised syllables. The rewritten checks must agree with them.
+
+def legacy_check_explanation(reviewer: ReviewerAgent, explanation: str, grade: int, topic: str):
+    """The original ReviewerAgent._check_explanation"""
+    feedback = []
+    
+    if not explanation or len(explanation.strip()) < 50:
+        feedback.append("Explanation is too short - needs more detail")
+        return feedback
+    
+    sentences = re.split(r'[.!?]+', explanation)
+    sentences = [s.strip() for s in sentences if s.strip()]
+    
+    max_words_per_sentence = {
+        1: 8, 2: 10, 3: 12, 4: 15, 5: 18,
+        6: 20, 7: 22, 8: 25, 9: 28, 10: 30
+    }
+    max_words = max_words_per_sentence.get(grade, 20)
+    
+    for i, sentence in enumerate(sentences, 1):
+        word_count = len(sentence.split())
+        if word_count > max_words + 5:
+            feedback.append(
+                f"Sentence {i} is too long ({word_count} words) for Grade {grade} - "
+                f"try breaking it into shorter sentences"
+            )
+    
+    words = explanation.lower().split()
+    max_length = reviewer.max_word_length.get(grade, 12)
+    
+    complex_words_found = []
+    for word in words:
+        clean_word = re.sub(r'[^a-z]', '', word)
+        if len(clean_word) > max_length + 3:
+            complex_words_found.append(clean_word)
+    
+    if complex_words_found and grade <= 5:
+        feedback.append(
+            f"Some words may be too complex for Grade {grade}: {', '.join(set(complex_words_found[:3]))}"
+        )
+    
+    if grade in reviewer.complex_words_by_grade:
+        inappropriate = []
+        for complex_word in reviewer.complex_words_by_grade[grade]:
+            if complex_word in explanation.lower():
+                inappropriate.append(complex_word)
+        
+        if inappropriate:
+            feedback.append(
+                f"These words might be too advanced for Grade {grade}: {', '.join(inappropriate)}"
+            )
+    
+    if topic.lower() not in explanation.lower():
+        feedback.append(f"Explanation should clearly mention the topic '{topic}'")
+    
+    engagement_markers = ['?', 'example', 'like', 'imagine', 'think about', 'we can']
+    has_engagement = any(marker in explanation.lower() for marker in engagement_markers)
+    
+    if not has_engagement and grade <= 5:
+        feedback.append("Consider adding examples or questions to make it more engaging for young students")
+    
+    return feedback
+
+
+def legacy_count_syllables(word: str) -> int:
+    """The original AdvancedValidator._count_syllables"""
+    word = word.lower()
+    vowels = 'aeiouy'
+    syllable_count = 0
+    previous_was_vowel = False
+    
+    for char in word:
+        is_vowel = char in vowels
+        if is_vowel and not previous_was_vowel:
+            syllable_count += 1
+        previous_was_vowel = is_vowel
+    
+    if word.endswith('e'):
+        syllable_count -= 1
+    
+    return max(1, syllable_count)
+
+
+def legacy_reading_level(text: str, grade: int):
+    """The original AdvancedValidator.check_reading_level"""
+    if not text:
+        return False, "Empty text"
+    
+    sentences = len(re.split(r'[.!?]+', text))
+    if sentences == 0:
+        sentences = 1
+    
+    words = len(text.split())
+    if words == 0:
+        return False, "No words in text"
+    
+    syllables = sum(legacy_count_syllables(word) for word in text.split())
+    
+    avg_words_per_sentence = words / sentences
+    avg_syllables_per_word = syllables / words if words > 0 else 0
+    reading_level = (0.39 * avg_words_per_sentence) + (11.8 * avg_syllables_per_word) - 15.59
+    
+    if abs(reading_level - grade) <= 2:
+        return True, f"Reading level appropriate (~Grade {reading_level:.1f})"
+    else:
+        return False, f"Reading level mismatch: text is Grade {reading_level:.1f}, target is Grade {grade}"
+
+
+def legacy_structure(explanation: str, grade: int):
+    """The original AdvancedValidator.check_explanation_structure"""
+    issues = []
+    
+    word_count = len(explanation.split())
+    min_words = 30 + (grade * 5)
+    max_words = 150 + (grade * 10)
+    
+    if word_count < min_words:
+        issues.append(f"Explanation too brief ({word_count} words, need ~{min_words})")
+    elif word_count > max_words:
+        issues.append(f"Explanation too long ({word_count} words, max ~{max_words})")
+    
+    paragraphs = explanation.split('\n\n')
+    if len(paragraphs) < 2 and word_count > 100:
+        issues.append("Long explanation should be split into paragraphs")
+    
+    example_markers = ['example', 'like', 'such as', 'for instance', 'imagine']
+    has_example = any(marker in explanation.lower() for marker in example_markers)
+    
+    if not has_example and grade <= 6:
+        issues.append("Consider adding examples for better understanding")
+    
+    questions = explanation.count('?')
+    if questions == 0 and grade <= 5:
+        issues.append("Could use questions to engage younger students")
+    
+    return len(issues) == 0, issues
+
+
+def legacy_checks(reviewer: ReviewerAgent, text: str, grade: int, topic: str):
+    return (legacy_check_explanation(reviewer, text, grade, topic), legacy_reading_level(text, grade),
+            legacy_structure(text, grade))
+
+
+def current_checks(reviewer: ReviewerAgent, text: str, grade: int, topic: str):
+    return (reviewer._check_explanation(text, grade, topic), AdvancedValidator.check_reading_level(text, grade),
+            AdvancedValidator.check_explanation_structure(text, grade))
+
+
+def corpus():
+    """(label, topic, explanation) at a few lengths, built from the template library"""
+    library = TemplateLibrary.open()
+    texts = [(topic, library.lookup(4, topic)["explanation"]) for topic in library.topics]
+    joined = "\n\n".join(text for _, text in texts)
+    return [
+        ("single lesson", texts[0][0], texts[0][1]),
+        ("10 lessons", texts[1][0], joined),
+    ]
+
+
+def test_text_analysis_matches_original_checks():
+    """Reviewer and validator feedback is unchanged by tokenising once"""
+    doc = analyze("Hi there!! What's a right-angle?\n\nIt's  90 degrees... ")
+    assert doc.segments == ["Hi there", " What's a right-angle", "\n\nIt's  90 degrees", " "]
+    assert doc.sentences == ["Hi there", "What's a right-angle", "It's  90 degrees"]
+    assert doc.words == ["hi", "there", "whats", "a", "rightangle", "its", "degrees"]
+    assert len(doc.paragraphs) == 2 and doc.count("?") == 1
+    assert analyze(doc.text) is doc and not analyze("")
+    
+    # The original checks judged every word by length
+    reviewer = ReviewerAgent()
+    reviewer.lexicon = None
+    texts = [(topic, text) for _, topic, text in corpus()] + [
+        ("Angles", "   "),
+        ("Angles", "An intricate, perpendicular explanation of angles that goes on and on without stopping at all "
+                   "because it never ends and keeps adding extraordinarily complicated words"),
+        ("Angles", "Short!?! Angles..."),
+    ]
+    for topic, text in texts:
+        for grade in (1, 3, 4, 6, 11):
+            assert current_checks(reviewer, text, grade, topic) == legacy_checks(reviewer, text, grade, topic)
+
+
+def test_phrase_matcher_agrees_with_substring_scans():
+    """The automaton finds exactly the phrases `in` would, in list order, including overlaps"""
+    matcher = PhraseMatcher(["he", "she", "his", "hers", "?", "we can", "he"], scan_threshold=0)
+    assert matcher.phrases == ("he", "she", "his", "hers", "?", "we can")
+    assert matcher.find_all("ushers? we ca") == ["he", "she", "hers", "?"]
+    assert matcher.contains_any("this") and not matcher.contains_any("we ca")
+    
+    rnd = random.Random(0)
+    phrases = ["".join(rnd.choice("abc ") for _ in range(rnd.randint(1, 5))) for _ in range(300)]
+    automaton, scanner = PhraseMatcher(phrases, scan_threshold=0), PhraseMatcher(phrases, scan_threshold=10 ** 6)
+    for _ in range(200):
+        text = "".join(rnd.choice("abcd ") for _ in range(rnd.randint(0, 60)))
+        assert automaton.find_all(text) == scanner.find_all(text)
+        assert automaton.contains_any(text) == scanner.contains_any(text)
+    
+    # Compiled once per list, and once per grade by the reviewer
+    assert compile_phrases(["x", "y"]) is compile_phrases(("x", "y"))
+    reviewer = ReviewerAgent()
+    reviewer.lexicon = None
+    reviewer.complex_words_by_grade = {4: ["angle", "vertex"] * 100}
+    feedback = reviewer._check_explanation("An angle is where two lines meet at a vertex, like a book corner.", 4, "angle")
+    assert feedback == ["These words might be too advanced for Grade 4: angle, vertex"]
+    assert reviewer._vocabulary_matcher(4) is reviewer._vocabulary_matcher(4)
+
+
+def test_lexicon_index_merges_sources_and_looks_up_words(tmp_path):
+    """Word lists merge into a hash-table index; every word is found, others miss"""
+    words = tmp_path / "words.csv"
+    words.write_text("word,syllables,frequency_rank\n" + "".join(f"w{i},{i % 5 + 1},{i + 1}\n" for i in range(3000)))
+    aoa = tmp_path / "aoa.csv"
+    aoa.write_text("word,aoa_age\nw0,4.2\nw1,9.6\nVertex,12\n")
+    
+    lexicon = Lexicon(build_lexicon([str(words), str(aoa)], str(tmp_path / "lexicon.idx")))
+    assert len(lexicon) == 3001
+    assert all(lexicon.lookup(f"w{i}").syllables == i % 5 + 1 for i in range(3000))
+    assert "w3000" not in lexicon and lexicon.syllables("vertex") is None
+    assert lexicon.lookup("w1") == (2, 2, 5)
+    # AoA grade when known, else estimated from frequency rank
+    assert [lexicon.grade(word) for word in ("w0", "vertex", "w999", "w2999", "zebra")] == [1, 7, 1, 3, None]
+    lexicon.close()
+    
+    # Rebuilt when a source changes
+    index = str(tmp_path / "open.idx")
+    assert Lexicon.open([str(aoa)], index).grade("w1") == 5
+    aoa.write_text("word,aoa_age\nw1,7\n")
+    assert Lexicon.open([str(aoa)], index).grade("w1") == 2
+
+
+def test_lexicon_grades_vocabulary_and_syllables(tmp_path):
+    """Known words are judged by grade, not length; unknown words fall back to the length heuristic"""
+    source = tmp_path / "seed.csv"
+    source.write_text("word,syllables,aoa_age\nalgae,2,12\nunderstanding,4,7\nangle,2,12\nrecipe,3,8\n")
+    reviewer = ReviewerAgent()
+    reviewer.lexicon = Lexicon.open([str(source)], str(tmp_path / "seed.idx"))
+    
+    text = ("Pond algae and understanding grow together in the angle of the pond. Extraordinarily, angles "
+            "are fun! Can you find an example?")
+    feedback = reviewer._check_explanation(text, 3, "Angles")
+    assert len(feedback) == 1
+    assert feedback[0].startswith("Some words may be too complex for Grade 3: ")
+    assert set(feedback[0].split(": ")[1].split(", ")) == {"algae", "extraordinarily"}
+    
+    # Lexicon syllables replace the vowel-group estimate where known ("recipe" estimates 2)
+    assert AdvancedValidator._count_syllables("recipe") == 2
+    plain = AdvancedValidator.check_reading_level("Recipe recipe.", 8)[1]
+    known = AdvancedValidator.check_reading_level("Recipe recipe.", 8, reviewer.lexicon)[1]
+    assert plain == "Reading level mismatch: text is Grade 14.3, target is Grade 8"
+    assert known == "Reading level mismatch: text is Grade 20.2, target is Grade 8"
+
+
+def test_readability_scores_match_formulas_and_batches():
+    """Memoised syllables equal the original loop; batch scores equal one-by-one scores"""
+    rnd = random.Random(0)
+    for _ in range(2000):
+        word = "".join(rnd.choice("aeiouybcdst'.,E") for _ in range(rnd.randint(1, 10)))
+        assert readability.count_syllables(word) == legacy_count_syllables(word)
+    
+    scores = readability.score("The cat sat on the mat. Elephants are enormous animals!")
+    # 2 sentences, 10 words, 16 syllables, 44 letters, 3 polysyllables
+    assert scores[:5] == (2, 10, 16, 44, 3)
+    # Flesch-Kincaid keeps the original count of 3 segments (the text ends in punctuation)
+    assert round(scores.flesch_kincaid_grade, 2) == round(0.39 * 10 / 3 + 11.8 * 1.6 - 15.59, 2)
+    assert round(scores.flesch_reading_ease, 2) == round(206.835 - 1.015 * 10 / 2 - 84.6 * 1.6, 2)
+    assert round(scores.smog_index, 2) == round(1.043 * (3 * 30 / 2) ** 0.5 + 3.1291, 2)
+    assert round(scores.coleman_liau_index, 2) == round(0.0588 * 440 - 0.296 * 20 - 15.8, 2)
+    
+    # Reference values, worked by hand from the published formulas: 2 sentences, 12 one-syllable
+    # words, 35 letters, no polysyllables
+    scores = readability.score("The cat sat on the mat. The dog ran to the park.")
+    assert scores[:5] == (2, 12, 12, 35, 0)
+    assert scores.as_dict() == {
+        "flesch_kincaid_grade": -2.2,       # 0.39 * 12 / 3 + 11.8 * 1 - 15.59 (3 legacy segments)
+        "flesch_reading_ease": 116.1,       # 206.835 - 1.015 * 6 - 84.6 * 1
+        "smog_index": 3.1,                  # 1.043 * sqrt(0) + 3.1291
+        "coleman_liau_index": -3.6          # 0.0588 * 291.7 - 0.296 * 16.7 - 15.8
+    }
+    # Only Flesch-Kincaid depends on the final full stop
+    unterminated = readability.score("The cat sat on the mat. The dog ran to the park")
+    assert unterminated._replace(flesch_kincaid_grade=0) == scores._replace(flesch_kincaid_grade=0)
+    assert readability.score("   ") is None
+    
+    texts = [text for _, _, text in corpus()] + ["", "Recipe, recipe!"] * 40
+    lexicon = Lexicon.open()
+    assert readability.score_batch(texts) == [readability.score(text) for text in texts]
+    assert readability.score_batch(texts, lexicon) == [readability.score(text, lexicon) for text in texts]
+    
+    result = AdvancedValidator.comprehensive_validation({"explanation": texts[0], "mcqs": []}, 4, "Angles")
+    assert set(result["checks"]["reading_level"]["scores"]) == {
+        "flesch_kincaid_grade", "flesch_reading_ease", "smog_index", "coleman_liau_index"
+    }
+
+
+def test_bulk_validation_matches_serial_checks(tmp_path):
+    """Pooled results come back in input order and equal one-at-a-time checks"""
+    library = TemplateLibrary.open()
+    items = [{"grade": grade, "topic": topic, "content": library.lookup(grade, topic)}
+             for topic in library.topics[:3] for grade in (2, 6, 10)]
+    reviewer = ReviewerAgent()
+    expected = [(reviewer.review_content(item["content"], item["grade"], item["topic"]),
+                 AdvancedValidator.comprehensive_validation(item["content"], item["grade"], item["topic"]))
+                for item in items]
+    
+    path = tmp_path / "library.jsonl"
+    lines = [json.dumps(item) for item in items]
+    lines.insert(4, "{not json")
+    lines.insert(7, json.dumps({"topic": "Angles", "content": {}}))
+    path.write_text("\n".join(lines) + "\n\n")
+    
+    for workers in (1, 2):
+        out = tmp_path / f"results_{workers}.jsonl"
+        summary = BulkValidator(workers=workers, chunksize=2).run(str(path), str(out))
+        records = [json.loads(line) for line in out.read_text().splitlines()]
+        assert summary["completed"] == len(records) == len(items) + 2
+        assert summary["errors"] == 2
+        assert summary["valid"] + summary["invalid"] == len(items)
+        assert records[4] == {"line": 5, "error": records[4]["error"]}
+        assert records[7] == {"line": 8, "error": "ValueError: item needs 'content', 'grade' and 'topic'"}
+        
+        results = [record for record in records if "error" not in record]
+        assert [(r["review"], r["validation"]) for r in results] == expected
+        assert [r["id"] for r in results] == [f"{item['grade']}:{item['topic'].lower()}" for item in items]
+        assert summary["valid"] == sum(r["valid"] for r in results)
+    
+    streamed = list(BulkValidator(workers=2, chunksize=4).validate(items))
+    assert streamed == [validate_item(item, reviewer) for item in items]
+
+
+def test_bulk_validation_records_malformed_items_as_errors(tmp_path, monkeypatch):
+    """Badly shaped stored content becomes an error record instead of stopping the run"""
+    good = TemplateLibrary.open().lookup(4, "Photosynthesis")
+    mcq = good["mcqs"][0]
+    malformed = [
+        {**good, "mcqs": "not a list"},
+        {**good, "explanation": None},
+        {**good, "mcqs": [{**mcq, "question": 7}]},
+        {**good, "mcqs": [{**mcq, "options": [1, 2]}]},
+        {**good, "mcqs": ["not a dict"]},
+    ]
+    items = [{"id": str(i), "grade": 4, "topic": "Photosynthesis", "content": content}
+             for i, content in enumerate([good] + malformed)]
+    
+    path = tmp_path / "library.jsonl"
+    path.write_text("".join(json.dumps(item) + "\n" for item in items) + "[1, 2]\n")
+    for workers in (1, 2):
+        summary = BulkValidator(workers=workers, chunksize=2).run(str(path), str(tmp_path / "out.jsonl"))
+        assert (summary["completed"], summary["errors"]) == (7, 6)
+        records = [json.loads(line) for line in (tmp_path / "out.jsonl").read_text().splitlines()]
+        assert "error" not in records[0]
+        assert all(record["error"].startswith("ValueError: content needs") for record in records[1:6])
+        assert records[6] == {"line": 7, "error": "ValueError: not a JSON object"}
+    
+    streamed = list(BulkValidator(workers=1).validate(items + ["not a dict"]))
+    assert [record.get("error", "").split(":")[0] for record in streamed] == [""] + ["ValueError"] * 6
+    assert [record["id"] for record in streamed] == [str(i) for i in range(6)] + [None]
+    
+    # A check tripping over content that passed the shape check is also contained to its item
+    def broken(content, grade, topic):
+        raise AttributeError("'int' object has no attribute 'lower'")
+    monkeypatch.setattr(AdvancedValidator, "comprehensive_validation", staticmethod(broken))
+    summary = BulkValidator(workers=1).run(str(path), str(tmp_path / "out.jsonl"))
+    assert (summary["completed"], summary["errors"], summary["valid"]) == (7, 7, 0)
+    assert list(BulkValidator(workers=1).validate(items[:1])) == [
+        {"id": "0", "error": "AttributeError: 'int' object has no attribute 'lower'"}
+    ]
@@ -0,0 +1,884 @@
+"""
+Tests for GeneratorAgent infrastructure (caching, transport, retries)
+Run with: python -m pytest test_generator.py
+"""
+
+import ast
+import asyncio
+import json
+import os
+import threading
+import time
+
+from agents.backends import (HF_API_URL, HFInferenceBackend, InferenceBackend, LlamaCppBackend,
+                             OpenAICompatibleBackend, _HTTPBackend, create_backend)
+from agents.batch import BatchGenerator, load_jobs
+from agents.circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker
+from agents.generation_cache import GenerationCache
+from agents.generator_agent import GeneratorAgent
+from agents.http_session import close_async_session, get_shared_session
+from agents.json_extract import extract_content, validate_content
+from agents.prompt_templates import PromptBuilder
+from agents.reviewer_agent import ReviewerAgent
+from agents.retry import ResponseParseError, RetryPolicy, TransientAPIError
+from agents.semantic_cache import SemanticCache, is_typo
+from agents.single_flight import SingleFlight
+from agents.speculative import SpeculativeGenerator
+from agents.streaming import CONTENT, EXPLANATION, MCQ, IncrementalContentParser, TokenStream
+from agents.template_library import DEFAULT_SOURCE, TemplateLibrary, build_library
+from benchmarks import json_corpus
+from benchmarks.stub_server import STUB_CONTENT, StubInferenceServer
+
+SAMPLE_CONTENT = {
+    "explanation": "Angles are everywhere! When two lines meet, they make an angle.",
+    "mcqs": [
+        {
+            "question": "What does a right angle look like?",
+            "options": ["A) A book corner", "B) A circle", "C) A line", "D) A dot"],
+            "answer": "A"
+        }
+    ]
+}
+
+
+def _counting_generator(cache=None):
+    """GeneratorAgent whose API call returns SAMPLE_CONTENT and counts invocations"""
+    # Own breaker: the shared one for the real endpoint may be open when offline
+    generator = GeneratorAgent(cache=cache, breaker=CircuitBreaker())
+    generator.api_calls = 0
+    
+    def fake_call(prompt, *args, **kwargs):
+        generator.api_calls += 1
+        return "Here you go: " + json.dumps(SAMPLE_CONTENT)
+    
+    generator._call_hf_api = fake_call
+    return generator
+
+
+def test_cache_serves_repeat_requests():
+    """Identical (normalised) requests hit the API only once"""
+    cache = GenerationCache()
+    generator = _counting_generator(cache)
+    
+    first = generator.generate_content(4, "Types of angles")
+    second = generator.generate_content(4, "  types of ANGLES? ")
+    assert first == second == SAMPLE_CONTENT
+    assert generator.api_calls == 1
+    
+    generator.generate_content(4, "Types of angles", feedback=["Add more examples"])
+    generator.generate_content(5, "Types of angles")
+    assert generator.api_calls == 3
+    assert cache.stats()["hits"] == 1
+    
+    # Callers can't corrupt the cached copy
+    second["mcqs"].clear()
+    assert generator.generate_content(4, "Types of angles") == SAMPLE_CONTENT
+
+
+def test_cache_ttl_and_lru_eviction():
+    """Entries expire after the TTL and the memory tier stays size-bounded"""
+    cache = GenerationCache(max_entries=2, ttl=0)
+    cache.put("a", SAMPLE_CONTENT)
+    assert cache.get("a") is None
+    assert cache.stats()["expirations"] == 1
+    
+    cache = GenerationCache(max_entries=2)
+    for key in ("a", "b", "c"):
+        cache.put(key, SAMPLE_CONTENT)
+    assert cache.get("a") is None
+    assert cache.get("c") == SAMPLE_CONTENT
+    assert cache.stats()["evictions"] == 1
+
+
+def test_disk_tier_is_shared(tmp_path):
+    """A second cache on the same file sees entries written by the first"""
+    disk_path = str(tmp_path / "cache.db")
+    writer = _counting_generator(GenerationCache(disk_path=disk_path))
+    writer.generate_content(3, "Water cycle")
+    
+    reader_cache = GenerationCache(disk_path=disk_path)
+    reader = _counting_generator(reader_cache)
+    assert reader.generate_content(3, "Water cycle") == SAMPLE_CONTENT
+    assert reader.api_calls == 0
+    assert reader_cache.stats()["disk_hits"] == 1
+
+
+def test_generator_reuses_pooled_connections():
+    """Consecutive API calls share one keep-alive connection from the shared pool"""
+    assert get_shared_session() is get_shared_session()
+    assert get_shared_session(pool_maxsize=2) is not get_shared_session()
+    
+    with StubInferenceServer() as server:
+        generator = GeneratorAgent(session=get_shared_session(pool_maxsize=2))
+        generator.api_url = server.url
+        for _ in range(3):
+            assert generator.generate_content(4, "Types of angles") == STUB_CONTENT
+    
+    assert server.requests == 3
+    assert server.connections == 1
+
+
+def test_async_generations_run_concurrently():
+    """Many agenerate_content calls overlap on one event loop"""
+    async def run_batch(url):
+        generator = GeneratorAgent()
+        generator.api_url = url
+        try:
+            return await asyncio.gather(*(
+                generator.agenerate_content(grade, "Types of angles") for grade in range(1, 11)
+            ))
+        finally:
+            await close_async_session()
+    
+    with StubInferenceServer(latency=0.3) as server:
+        results = asyncio.run(run_batch(server.url))
+    
+    assert results == [STUB_CONTENT] * 10
+    assert server.requests == 10
+    # Sequential calls would never have more than one request open
+    assert server.peak_in_flight > 1
+
+
+def test_batch_streams_results_and_resumes(tmp_path):
+    """Batch runs write one record per job and skip finished jobs when rerun"""
+    jobs_file = tmp_path / "jobs.csv"
+    jobs_file.write_text("grade,topic\n3,Water cycle\n4,Types of angles\nx,Bad row\n5,Solar system\n4,types of angles\n")
+    jobs = load_jobs(str(jobs_file))
+    assert len(jobs) == 4
+    
+    output = str(tmp_path / "results.jsonl")
+    with StubInferenceServer(latency=0.05) as server:
+        generator = GeneratorAgent()
+        generator.api_url = server.url
+        batch = BatchGenerator(generator=generator, concurrency=3)
+        
+        summary = batch.run(jobs, output)
+        assert summary["completed"] == 3
+        assert summary["skipped"] == 1
+        
+        with open(output, 'a') as f:
+            f.write('{"job_id": "6:torn')
+        summary = batch.run(jobs + [(6, "Food chains")], output)
+        assert summary["completed"] == 1
+        assert summary["skipped"] == 4
+    
+    with open(output) as f:
+        records = [json.loads(line) for line in f]
+    assert sorted(r["job_id"] for r in records) == ["3:water cycle", "4:types of angles",
+                                                    "5:solar system", "6:food chains"]
+    assert all(r["content"]["mcqs"] for r in records)
+
+
+def test_batch_does_not_record_fallback_content(tmp_path):
+    """Jobs the API fails on, or the open breaker rejects, are errors and are retried on resume"""
+    jobs = [(3, "Water cycle"), (4, "Types of angles"), (5, "Solar system")]
+    output = str(tmp_path / "results.jsonl")
+    script = [(503, {"error": "Service unavailable"}, {})] * 2
+    
+    with StubInferenceServer(script=script) as server:
+        clock = _FakeClock()
+        breaker = CircuitBreaker(min_calls=2, open_duration=3600, clock=clock)
+        generator = GeneratorAgent(retry_policy=RetryPolicy(max_attempts=1), breaker=breaker)
+        generator.api_url = server.url
+        
+        # Two failures open the breaker; the third job is rejected without a request
+        summary = BatchGenerator(generator=generator, concurrency=1).run(jobs, output)
+        assert (summary["completed"], summary["errors"]) == (0, 3)
+        assert breaker.state == OPEN and server.requests == 2
+        # Interactive callers still get the template fallback
+        assert asyncio.run(generator.agenerate_content(4, "Types of angles")) != STUB_CONTENT
+        
+        clock.now += 3600
+        summary = BatchGenerator(generator=generator, concurrency=1).run(jobs, output)
+        assert (summary["completed"], summary["skipped"], summary["errors"]) == (3, 0, 0)
+    
+    with open(output) as f:
+        records = [json.loads(line) for line in f]
+    assert [r["job_id"] for r in records] == ["3:water cycle", "4:types of angles", "5:solar system"]
+    assert all(r["content"] == STUB_CONTENT for r in records)
+
+
+class _FakeClock:
+    """Clock for RetryPolicy that advances only when the policy sleeps"""
+    
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+    
+    def __call__(self):
+        return self.now
+    
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+    
+    async def async_sleep(self, seconds):
+        self.sleep(seconds)
+
+
+def _stub_generator(url, clock, **policy):
+    generator = GeneratorAgent(retry_policy=RetryPolicy(
+        jitter=False, sleep=clock.sleep, async_sleep=clock.async_sleep, clock=clock, **policy
+    ))
+    generator.api_url = url
+    return generator
+
+
+def test_retry_waits_for_loading_model_and_rate_limits():
+    """503 model-loading and 429 Retry-After responses are retried after the advertised wait"""
+    script = [
+        (503, {"error": "Model is currently loading", "estimated_time": 12.5}, {}),
+        (429, {"error": "Rate limit reached"}, {"Retry-After": "3"}),
+        (502, {"error": "Bad gateway"}, {})
+    ]
+    clock = _FakeClock()
+    with StubInferenceServer(script=script) as server:
+        generator = _stub_generator(server.url, clock)
+        assert generator.generate_content(4, "Types of angles") == STUB_CONTENT
+    
+    assert server.requests == 4
+    # estimated_time, Retry-After, then plain exponential backoff (1 * 2^2)
+    assert clock.sleeps == [12.5, 3.0, 4.0]
+    
+    async def generate_async(generator):
+        try:
+            return await generator.agenerate_content(4, "Types of angles")
+        finally:
+            await close_async_session()
+    
+    clock = _FakeClock()
+    with StubInferenceServer(script=script[:2]) as server:
+        result = asyncio.run(generate_async(_stub_generator(server.url, clock)))
+    assert result == STUB_CONTENT
+    assert clock.sleeps == [12.5, 3.0]
+
+
+def test_retry_fails_fast_on_permanent_errors():
+    """Client errors go straight to the fallback without retrying"""
+    for status in (400, 401, 404):
+        clock = _FakeClock()
+        with StubInferenceServer(script=[(status, {"error": "nope"}, {})]) as server:
+            generator = _stub_generator(server.url, clock)
+            result = generator.generate_content(4, "Types of angles")
+        assert result != STUB_CONTENT
+        assert result["mcqs"]
+        assert server.requests == 1
+        assert clock.sleeps == []
+
+
+def test_retry_respects_deadline_and_attempt_limit():
+    """Waits that would overrun the deadline, or too many attempts, end in the fallback"""
+    clock = _FakeClock()
+    script = [(503, {"error": "Model is currently loading", "estimated_time": 120}, {})]
+    with StubInferenceServer(script=script) as server:
+        generator = _stub_generator(server.url, clock, deadline=60)
+        result = generator.generate_content(4, "Types of angles")
+    assert result != STUB_CONTENT
+    assert server.requests == 1
+    assert clock.sleeps == []
+    
+    clock = _FakeClock()
+    script = [(500, {"error": "boom"}, {})] * 5
+    with StubInferenceServer(script=script) as server:
+        generator = _stub_generator(server.url, clock, max_attempts=3)
+        result = generator.generate_content(4, "Types of angles")
+    assert result != STUB_CONTENT
+    assert server.requests == 3
+    assert clock.sleeps == [1.0, 2.0]
+
+
+def test_circuit_breaker_short_circuits_to_fallback():
+    """Once the endpoint keeps failing, requests skip the API until a probe succeeds"""
+    clock = _FakeClock()
+    breaker = CircuitBreaker(min_calls=4, open_duration=30, clock=clock)
+    script = [(503, {"error": "Service unavailable"}, {})] * 4
+    
+    with StubInferenceServer(script=script) as server:
+        generator = GeneratorAgent(
+            retry_policy=RetryPolicy(max_attempts=2, jitter=False, sleep=clock.sleep, clock=clock),
+            breaker=breaker
+        )
+        generator.api_url = server.url
+        
+        # Two requests x two attempts trip the breaker
+        for _ in range(2):
+            assert generator.generate_content(4, "Types of angles") != STUB_CONTENT
+        assert breaker.state == OPEN
+        assert server.requests == 4
+        
+        # Open: straight to the fallback, no network and no backoff
+        sleeps = len(clock.sleeps)
+        assert generator.generate_content(4, "Types of angles") != STUB_CONTENT
+        assert server.requests == 4
+        assert len(clock.sleeps) == sleeps
+        assert breaker.stats()["rejected"] == 1
+        
+        # After open_duration a single probe goes out and closes the circuit
+        clock.now += 30
+        assert breaker.state == HALF_OPEN
+        assert generator.generate_content(4, "Types of angles") == STUB_CONTENT
+        assert server.requests == 5
+        assert breaker.state == CLOSED
+
+
+def test_circuit_breaker_half_open_probe_limits():
+    """Half-open admits limited probes; a failed probe reopens the circuit"""
+    clock = _FakeClock()
+    breaker = CircuitBreaker(min_calls=2, failure_rate_threshold=0.5, open_duration=10, clock=clock)
+    breaker.record_success()
+    breaker.record_failure()
+    assert breaker.state == OPEN
+    
+    clock.now += 10
+    assert breaker.allow_request()
+    assert not breaker.allow_request()
+    breaker.record_failure()
+    assert breaker.state == OPEN
+    assert breaker.stats()["times_opened"] == 2
+    
+    # Client errors don't count against the endpoint
+    clock.now += 10
+    closed = CircuitBreaker(min_calls=1, clock=clock)
+    
+    def bad_request():
+        raise ValueError("not an upstream failure")
+    
+    try:
+        closed.call(bad_request)
+    except ValueError:
+        pass
+    assert closed.state == CLOSED
+
+
+def test_incremental_parser_emits_pieces_as_they_complete():
+    """Explanation and each MCQ are emitted exactly once, however the text is split"""
+    tricky = {
+        "explanation": 'Angles {like "corners"} and [brackets] are fine \\ here.',
+        "mcqs": SAMPLE_CONTENT["mcqs"] * 3
+    }
+    text = 'Sure! Here is the JSON:\n' + json.dumps(tricky, indent=2) + '\nHope this helps {'
+    
+    for size in (1, 3, 7, len(text)):
+        parser = IncrementalContentParser()
+        events = []
+        for i in range(0, len(text), size):
+            events.extend(parser.feed(text[i:i + size]))
+        assert events == [(EXPLANATION, tricky["explanation"])] + [(MCQ, m) for m in tricky["mcqs"]]
+        assert parser.done
+    
+    # The explanation is available before the questions have arrived
+    parser = IncrementalContentParser()
+    cut = text.index('"mcqs"')
+    assert parser.feed(text[:cut]) == [(EXPLANATION, tricky["explanation"])]
+
+
+def test_stream_content_yields_pieces_before_completion():
+    """Streaming from an SSE endpoint yields the explanation well before the full response"""
+    with StubInferenceServer(token_size=4, token_delay=0.01) as server:
+        generator = GeneratorAgent(cache=GenerationCache(), breaker=CircuitBreaker())
+        generator.api_url = server.url
+        
+        start = time.perf_counter()
+        arrivals = []
+        for kind, value in generator.stream_content(4, "Types of angles"):
+            arrivals.append((kind, time.perf_counter() - start, value))
+        assert server.last_payload["stream"] is True
+        
+        kinds = [kind for kind, _, _ in arrivals]
+        assert kinds == [EXPLANATION, MCQ, CONTENT]
+        assert arrivals[-1][2] == STUB_CONTENT
+        assert arrivals[0][1] < arrivals[-1][1] / 2
+        
+        # Served from the cache the second time, without another request
+        assert [kind for kind, _ in generator.stream_content(4, "Types of angles")] == kinds
+        assert server.requests == 1
+    
+    with StubInferenceServer(script=[(404, {"error": "Model not found"}, {})]) as server:
+        generator = GeneratorAgent(breaker=CircuitBreaker())
+        generator.api_url = server.url
+        events = list(generator.stream_content(4, "Types of angles"))
+        assert [kind for kind, _ in events] == [CONTENT]
+        assert events[0][1]["mcqs"]
+
+
+def test_malformed_stream_is_resampled_before_falling_back():
+    """A stream whose text can't be parsed is retried; pieces already shown aren't repeated"""
+    generator = GeneratorAgent(breaker=CircuitBreaker())
+    texts = ['{"explanation": "A first try.", "mcqs": [{"question": "Which', json.dumps(SAMPLE_CONTENT)]
+    opened = []
+    
+    def open_stream(prompt, timeout=30, parameters=None):
+        text = texts[len(opened)]
+        opened.append(text)
+        return TokenStream([text[i:i + 5] for i in range(0, len(text), 5)])
+    
+    generator._open_hf_stream = open_stream
+    events = list(generator.stream_content(4, "Types of angles"))
+    
+    assert len(opened) == 2
+    assert events == [(EXPLANATION, "A first try."), (MCQ, SAMPLE_CONTENT["mcqs"][0]), (CONTENT, SAMPLE_CONTENT)]
+
+
+def test_extractor_handles_corpus_samples():
+    """Every parseable sample yields valid content; the rest raise ResponseParseError"""
+    for name, text, parseable in json_corpus.SAMPLES:
+        if parseable:
+            content = extract_content(text)
+            assert validate_content(content), name
+        else:
+            try:
+                extract_content(text)
+            except ResponseParseError:
+                continue
+            raise AssertionError(f"{name} should not parse")
+    
+    # The first complete object wins and truncated output keeps only whole MCQs
+    samples = {name: text for name, text, _ in json_corpus.SAMPLES}
+    assert extract_content(samples["second_object"]) == json_corpus.CONTENT
+    assert extract_content(samples["truncated_in_last_mcq"])["mcqs"] == json_corpus.CONTENT["mcqs"][:2]
+
+
+def test_extractor_recovers_fuzzed_outputs():
+    """Seeded faulty outputs all recover to a prefix of the original content"""
+    expected = json_corpus.CONTENT
+    for mutation, text in json_corpus.fuzz_corpus(500, seed=1):
+        content = extract_content(text)
+        assert content["explanation"] == expected["explanation"], mutation
+        assert content["mcqs"] and content["mcqs"] == expected["mcqs"][:len(content["mcqs"])], mutation
+
+
+def test_targeted_refinement_rewrites_only_flagged_parts():
+    """One flagged MCQ is regenerated alone, merged back and re-reviewed alone"""
+    reviewer = ReviewerAgent()
+    generator = GeneratorAgent(breaker=CircuitBreaker())
+    content = generator._fallback_generation(4, "Types of angles")
+    content["mcqs"][0]["question"] = "Which of these looks like a right angle?"
+    content["mcqs"][1]["question"] = "Define an angle"
+    content["mcqs"][2]["question"] = "Is an obtuse angle bigger than a right angle?"
+    
+    parts = reviewer.review_parts(content, 4, "Types of angles")
+    assert reviewer.summarize(parts) == reviewer.review_content(content, 4, "Types of angles")
+    assert parts["explanation"] == [] and parts["mcqs"][1] and not parts["mcqs"][2]
+    
+    replacement = {
+        "question": "Which angle is bigger than a right angle?",
+        "options": ["A) Acute", "B) Obtuse", "C) Right", "D) Zero"],
+        "answer": "B"
+    }
+    calls = []
+    
+    def fake_call(prompt, *args, parameters=None, **kwargs):
+        calls.append((prompt, parameters))
+        return json.dumps({"mcqs": [replacement]})
+    
+    generator._call_hf_api = fake_call
+    refined = generator.refine_content(4, "Types of angles", content, parts)
+    
+    assert len(calls) == 1
+    prompt, parameters = calls[0]
+    assert "QUESTION 2 TO REWRITE" in prompt and "QUESTION 1 TO REWRITE" not in prompt
+    assert parameters["max_new_tokens"] < generator.generation_params["max_new_tokens"]
+    assert refined["explanation"] == content["explanation"]
+    assert refined["mcqs"] == [content["mcqs"][0], replacement, content["mcqs"][2]]
+    assert content["mcqs"][1]["question"] == "Define an angle"
+    
+    # Only the replaced question is checked again
+    checked = []
+    original_check = reviewer._check_mcq
+    reviewer._check_explanation = lambda *args: checked.append("explanation") or []
+    reviewer._check_mcq = lambda mcq, i, *args: checked.append(i) or original_check(mcq, i, *args)
+    refined_parts = reviewer.review_parts(refined, 4, "Types of angles", previous=(content, parts))
+    assert checked == [2]
+    assert refined_parts["mcqs"][1] == []
+    assert refined_parts["mcqs"][0] == parts["mcqs"][0]
+
+
+def test_targeted_refinement_fills_missing_and_falls_back():
+    """Missing MCQs are added; broken structure means a full regeneration"""
+    reviewer = ReviewerAgent()
+    generator = _counting_generator()
+    content = {"explanation": SAMPLE_CONTENT["explanation"], "mcqs": []}
+    parts = reviewer.review_parts(content, 4, "Types of angles")
+    
+    # SAMPLE_CONTENT has one MCQ but three are needed - the revision is rejected
+    refined = generator.refine_content(4, "Types of angles", content, parts)
+    assert refined != content and refined["mcqs"]
+    
+    broken = {"mcqs": "not a list"}
+    generator.api_calls = 0
+    refined = generator.refine_content(4, "Types of angles", broken, reviewer.review_parts(broken, 4, "Types of angles"))
+    assert refined == SAMPLE_CONTENT
+    assert generator.api_calls == 1
+
+
+def test_prompt_builder_budgets_and_templates():
+    """Templates are compiled once per grade and output caps follow the requested content"""
+    builder = PromptBuilder(max_new_tokens=800)
+    prompt, budget = builder.build(4, "Water cycle")
+    assert 'Grade 4 students about "Water cycle"' in prompt
+    assert "IMPORTANT" not in prompt
+    assert builder._template(4, 3) is builder._template(4, 3)
+    
+    assert builder.output_budget(1) < builder.output_budget(10) <= 800
+    assert builder.output_budget(4, mcq_count=1, explanation=False) < budget / 3
+    assert PromptBuilder(max_new_tokens=200).output_budget(10) == 200
+    
+    with StubInferenceServer() as server:
+        generator = GeneratorAgent(breaker=CircuitBreaker())
+        generator.api_url = server.url
+        generator.generate_content(2, "Water cycle")
+        assert server.last_payload["parameters"]["max_new_tokens"] == builder.output_budget(2)
+        
+        generator.generation_params["max_new_tokens"] = 100
+        generator.generate_content(9, "Water cycle")
+        assert server.last_payload["parameters"]["max_new_tokens"] == 100
+
+
+def test_feedback_is_deduplicated_and_budgeted():
+    """Near-duplicate feedback merges; low-priority items are dropped to fit the budget"""
+    builder = PromptBuilder()
+    feedback = [
+        "Sentence 2 is too long (24 words) for Grade 3 - try breaking it into shorter sentences",
+        "Sentence 5 is too long (31 words) for Grade 3 - try breaking it into shorter sentences",
+        "Explanation should clearly mention the topic 'Water cycle'",
+        "Question 2 must have exactly 4 options (A, B, C, D)",
+        "Content looks good!"
+    ]
+    assert builder.compact_feedback(feedback) == [
+        "Sentence 2 is too long (24 words) for Grade 3 - try breaking it into shorter sentences (and 1 similar)",
+        "Explanation should clearly mention the topic 'Water cycle'",
+        "Question 2 must have exactly 4 options (A, B, C, D)"
+    ]
+    
+    # A tight budget keeps the critical item first
+    assert builder.compact_feedback(feedback, budget=20) == ["Question 2 must have exactly 4 options (A, B, C, D)"]
+    
+    prompt, _ = builder.build(3, "Water cycle", feedback * 20)
+    assert prompt.count("- Sentence") == 1
+
+
+def test_identical_concurrent_requests_share_one_upstream_call():
+    """30 sessions asking for the same content at once cause a single API call"""
+    flight = SingleFlight()
+    barrier = threading.Barrier(30)
+    results = [None] * 30
+    
+    def session(i, url, topic):
+        # A fresh agent per thread, like one per Streamlit session
+        generator = GeneratorAgent(single_flight=flight, breaker=CircuitBreaker())
+        generator.api_url = url
+        barrier.wait()
+        results[i] = generator.generate_content(4, topic)
+    
+    with StubInferenceServer(latency=0.5) as server:
+        topics = ["Photosynthesis", " photosynthesis? "] * 14 + ["Water cycle", "Water cycle"]
+        threads = [threading.Thread(target=session, args=(i, server.url, topic)) for i, topic in enumerate(topics)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    
+    # One call for the normalised photosynthesis topic, one for the water cycle
+    assert server.requests == 2
+    assert flight.stats() == {"leaders": 2, "shared": 28}
+    assert all(result == STUB_CONTENT for result in results)
+    assert len({id(result) for result in results}) == 30
+
+
+def test_identical_streams_and_async_requests_are_coalesced():
+    """Streaming sessions replay one upstream stream; async callers share one call"""
+    flight = SingleFlight()
+    
+    with StubInferenceServer(token_delay=0.01) as server:
+        def stream_session(out):
+            generator = GeneratorAgent(single_flight=flight, breaker=CircuitBreaker())
+            generator.api_url = server.url
+            out.extend(generator.stream_content(4, "Photosynthesis"))
+        
+        outputs = [[] for _ in range(5)]
+        threads = [threading.Thread(target=stream_session, args=(out,)) for out in outputs]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        
+        assert server.requests == 1
+        assert all([kind for kind, _ in out] == [EXPLANATION, MCQ, CONTENT] for out in outputs)
+        assert all(out[-1][1] == STUB_CONTENT for out in outputs)
+        
+        async def run_batch():
+            generator = GeneratorAgent(single_flight=flight, breaker=CircuitBreaker())
+            generator.api_url = server.url
+            try:
+                return await asyncio.gather(*(generator.agenerate_content(5, "Food chains") for _ in range(10)))
+            finally:
+                await close_async_session()
+        
+        assert asyncio.run(run_batch()) == [STUB_CONTENT] * 10
+        assert server.requests == 2
+
+
+def test_openai_compatible_backend():
+    """A local OpenAI-style server serves blocking, streamed and async generation"""
+    with StubInferenceServer() as server:
+        backend = OpenAICompatibleBackend(server.openai_url, model="tiny")
+        generator = GeneratorAgent(backend=backend, breaker=CircuitBreaker())
+        
+        assert generator.generate_content(4, "Photosynthesis") == STUB_CONTENT
+        payload = server.last_payload
+        assert payload["model"] == "tiny" and payload["max_tokens"] <= 800
+        assert "inputs" not in payload and "return_full_text" not in payload
+        
+        events = list(generator.stream_content(4, "Food chains"))
+        assert [kind for kind, _ in events] == [EXPLANATION, MCQ, CONTENT]
+        assert events[-1][1] == STUB_CONTENT
+        
+        async def run():
+            try:
+                return await generator.agenerate_content(5, "Magnets")
+            finally:
+                await close_async_session()
+        
+        assert asyncio.run(run()) == STUB_CONTENT
+        assert server.requests == 3
+
+
+def test_backend_selected_by_config():
+    """INFERENCE_BACKEND picks the backend; each model gets its own cache keys"""
+    assert isinstance(create_backend(environ={}), HFInferenceBackend)
+    assert create_backend(environ={}).endpoint == HF_API_URL
+    
+    backend = create_backend(environ={"INFERENCE_BACKEND": "openai", "INFERENCE_URL": "http://localhost:11434/v1/",
+                                      "INFERENCE_MODEL": "mistral"})
+    assert isinstance(backend, OpenAICompatibleBackend)
+    assert backend.request_url == "http://localhost:11434/v1/completions"
+    
+    for env in ({"INFERENCE_BACKEND": "tpu"}, {"INFERENCE_BACKEND": "llamacpp"}):
+        try:
+            create_backend(environ=env)
+            assert False, "expected a configuration error"
+        except ValueError:
+            pass
+    
+    hf = GeneratorAgent(backend="hf")
+    local = GeneratorAgent(backend=backend)
+    assert hf.api_url == HF_API_URL
+    assert hf._request_key(4, "Magnets") != local._request_key(4, "Magnets")
+
+
+def test_backends_are_abstract_and_llamacpp_honours_timeout():
+    """Incomplete backends can't be created; a busy in-process model fails within the timeout"""
+    for backend in (InferenceBackend, _HTTPBackend):
+        try:
+            backend("http://localhost")
+            assert False, "expected an abstract class error"
+        except TypeError:
+            pass
+    
+    # Built without __init__: llama-cpp-python isn't needed to check the locking
+    backend = LlamaCppBackend.__new__(LlamaCppBackend)
+    backend._lock = threading.Lock()
+    backend._model = lambda prompt, stream=False, **params: (
+        iter([{"choices": [{"text": "a"}]}, {"choices": [{"text": "b"}]}]) if stream else {"choices": [{"text": "ab"}]}
+    )
+    
+    with backend._lock:
+        for call in (backend.generate, backend.open_stream):
+            try:
+                call("prompt", {}, timeout=0.05)
+                assert False, "expected the busy model to time out"
+            except TransientAPIError:
+                pass
+    
+    assert backend.generate("prompt", {}) == "ab"
+    with backend.open_stream("prompt", {}) as stream:
+        assert list(stream) == ["a", "b"]
+    backend.open_stream("prompt", {}).close()
+    assert not backend._lock.locked()
+
+
+def test_template_library_fallback_passes_review(tmp_path):
+    """Every library entry passes review across its grade band, and fuzzy topics find it"""
+    library = TemplateLibrary(build_library(DEFAULT_SOURCE, str(tmp_path / "library.idx")))
+    reviewer = ReviewerAgent()
+    with open(DEFAULT_SOURCE, encoding='utf-8') as f:
+        source = json.load(f)
+    
+    for item in source["topics"]:
+        for level in item["levels"]:
+            low, high = level["grades"]
+            for grade in range(low, high + 1):
+                content = library.lookup(grade, item["topic"])
+                assert content == level["content"]
+                assert reviewer.review_content(content, grade, item["topic"])["status"] == "pass"
+    
+    assert library.resolve("Kinds of Angles?") == "types of angles"
+    assert library.resolve("photosynthesys") == "photosynthesis"
+    assert library.resolve("Planets of the solar system") == "solar system"
+    assert library.resolve("Photosynthesis in plants") == "photosynthesis"
+    assert library.resolve("The water cycle") == "water cycle"
+    for topic in ["Volcanoes", "heart attack", "angles of triangles", "fractions of a second", "solar power"]:
+        assert library.resolve(topic) is None, topic
+    
+    # Lookups hand out independent copies
+    library.lookup(4, "fractions")["mcqs"].clear()
+    assert len(library.lookup(4, "fractions")["mcqs"]) == 3
+    
+    generator = GeneratorAgent(template_library=library)
+    assert generator._fallback_generation(3, "The water cycle") == library.lookup(3, "water cycle")
+    assert "Volcanoes" in generator._fallback_generation(3, "Volcanoes")["explanation"]
+    library.close()
+
+
+def test_template_library_covers_the_app_topic_presets(tmp_path):
+    """Every topic preset offered in the UI resolves to library content at every grade"""
+    # app.py needs streamlit at import time, so read the presets from its source
+    with open(os.path.join(os.path.dirname(os.path.abspath(__file__)), "app.py"), encoding='utf-8') as f:
+        tree = ast.parse(f.read())
+    presets = next(ast.literal_eval(node.value) for node in ast.walk(tree)
+                   if isinstance(node, ast.Assign) and getattr(node.targets[0], "id", None) == "common_topics")
+    
+    library = TemplateLibrary(build_library(DEFAULT_SOURCE, str(tmp_path / "library.idx")))
+    for topic in presets:
+        if topic.startswith("Custom"):
+            continue
+        for grade in range(1, 13):
+            assert library.lookup(grade, topic) is not None, (topic, grade)
+    library.close()
+
+
+def test_template_library_rebuilds_stale_index(tmp_path):
+    """Editing the source invalidates a previously built index"""
+    with open(DEFAULT_SOURCE, encoding='utf-8') as f:
+        source = json.load(f)
+    source_path = tmp_path / "library.json"
+    index_path = str(tmp_path / "library.idx")
+    source_path.write_text(json.dumps(source))
+    TemplateLibrary.open(str(source_path), index_path).close()
+    
+    source["topics"][0]["aliases"].append("corners")
+    source_path.write_text(json.dumps(source))
+    library = TemplateLibrary.open(str(source_path), index_path)
+    assert library.resolve("corners") == "types of angles"
+    library.close()
+
+
+def test_semantic_cache_matches_near_identical_topics():
+    """Rewordings and typos hit within a grade; different topics don't"""
+    cache = SemanticCache()
+    for topic in ["photosynthesis", "water cycle", "types of angles", "fractions", "solar system", "multiplication",
+                  "digestive system", "life cycle of a butterfly", "respiration", "decimals"]:
+        cache.add(4, topic, {"explanation": topic, "mcqs": []})
+    
+    assert cache.search(4, "The Water Cycle!")[0] == "water cycle"
+    assert cache.search(4, "angle types") == ("types of angles", 1.0)
+    assert cache.search(4, "Fraction")[0] == "fractions"
+    # Typos of cached words: a swapped pair, or one wrong or missing letter in a long word
+    assert cache.search(4, "photosynthesys")[0] == "photosynthesis"
+    assert cache.search(4, "fracions")[0] == "fractions"
+    assert cache.search(4, "water cylce")[0] == "water cycle"
+    assert not is_typo("plant", "planet") and not is_typo("frog", "fog")
+    for topic in ["types of triangles", "life cycle of a frog", "multiplication of fractions", "circulatory system"]:
+        assert cache.search(4, topic) is None, topic
+    # One more content word is a different topic, whatever its weight
+    for topic in ["adding fractions", "subtracting fractions", "multiplying fractions", "photosynthesis in animals",
+                  "photosynthesis in plants", "water cycle diagram"]:
+        assert cache.search(4, topic) is None, topic
+    assert cache.search(5, "photosynthesis") is None
+    assert cache.search(4, "photosynthesis", namespace="other-model") is None
+    
+    # Scores don't depend on how many unrelated topics are cached
+    single = SemanticCache()
+    single.add(4, "photosynthesis", {"explanation": "photosynthesis", "mcqs": []})
+    for topic in ("Photosynthesis!", "photosynthesys"):
+        assert round(single.search(4, topic)[1], 6) == round(cache.search(4, topic)[1], 6), topic
+    assert single.search(4, "respiration") is None
+    
+    # Per-grade LRU bound and TTL
+    now = [0.0]
+    cache = SemanticCache(max_entries=2, ttl=10, clock=lambda: now[0])
+    for topic in ("magnets", "volcanoes", "earthquakes"):
+        cache.add(3, topic, {"explanation": topic, "mcqs": []})
+    assert cache.search(3, "magnets") is None and cache.stats()["entries"] == 2
+    now[0] = 11
+    assert cache.lookup(3, "volcanoes") is None
+
+
+def test_generator_serves_reviewed_content_for_similar_topics():
+    """Only reviewed, model-generated content is reused, and only for first generations"""
+    generator = _counting_generator()
+    generator.semantic_cache = SemanticCache()
+    reviewer = ReviewerAgent()
+    
+    content = generator.generate_content(4, "Types of angles")
+    assert not generator.remember_reviewed(4, "Types of angles", content, {"status": "fail"})
+    assert generator.remember_reviewed(4, "Types of angles", content, {"status": "pass"})
+    
+    assert generator.generate_content(4, "types of angles!") == SAMPLE_CONTENT
+    assert generator.generate_content(4, "Angle types") == SAMPLE_CONTENT
+    assert generator.api_calls == 1
+    generator.generate_content(4, "Angle types", feedback=["Add more examples"])
+    assert generator.api_calls == 2
+    
+    # Template fallback content is never shared between topics
+    fallback = generator._fallback_generation(4, "Volcanoes")
+    assert not generator.remember_reviewed(4, "Volcanoes", fallback, reviewer.review_content(fallback, 4, "Volcanoes"))
+
+
+def _racing_generator(delays, passing):
+    """Generator whose candidate at each temperature answers after a delay; passing ones get reviewed content"""
+    generator = GeneratorAgent(cache=GenerationCache(), breaker=CircuitBreaker())
+    good = TemplateLibrary.open().lookup(4, "Photosynthesis")
+    generator.sent = []
+    generator.answered = []
+    
+    async def fake_sample(grade, topic, temperature=None, session=None):
+        generator.sent.append(temperature)
+        await asyncio.sleep(delays[temperature])
+        generator.answered.append(temperature)
+        return good if temperature in passing else SAMPLE_CONTENT
+    
+    generator.agenerate_sample = fake_sample
+    return generator
+
+
+def test_speculative_generation_keeps_first_passing_candidate():
+    """The first candidate to pass wins, the slower ones are cancelled, and the result is cached"""
+    generator = _racing_generator({0.7: 5.0, 0.9: 0.05, 0.5: 0.01}, passing={0.7, 0.9})
+    speculative = SpeculativeGenerator(generator, ReviewerAgent())
+    
+    result = speculative.generate(4, "Photosynthesis")
+    assert result["source"] == "candidate" and result["winner"] == 1
+    assert result["review"]["status"] == "pass"
+    # The failing fast candidate and the winner answered; the slow one was cancelled unanswered
+    assert result["sent"] == 3 and result["cancelled"] == 1
+    assert generator.sent == [0.7, 0.9, 0.5] and generator.answered == [0.5, 0.9]
+    assert result["review_time"] > 0 and result["generation_time"] > 0
+    assert result["generation_time"] + result["review_time"] <= result["elapsed"]
+    
+    # A repeat request is served from the cache without racing again
+    again = speculative.generate(4, "Photosynthesis")
+    assert again["source"] == "cache" and again["sent"] == 0
+    assert len(generator.sent) == 3
+
+
+def test_speculative_generation_hedges_and_refines():
+    """With a stagger, later candidates are only sent if no earlier one passed; if none pass, the best is refined"""
+    generator = _racing_generator({0.7: 0.01, 0.9: 0.01, 0.5: 0.01}, passing={0.7})
+    result = SpeculativeGenerator(generator, ReviewerAgent(), stagger=0.2).generate(4, "Photosynthesis")
+    assert result["winner"] == 0 and result["sent"] == 1
+    assert generator.sent == [0.7]
+    
+    generator = _racing_generator({0.7: 0.01, 0.9: 0.01, 0.5: 0.01}, passing=set())
+    refined = TemplateLibrary.open().lookup(4, "Photosynthesis")
+    
+    async def fake_refine(grade, topic, content, parts, session=None):
+        return refined
+    
+    generator.arefine_content = fake_refine
+    result = SpeculativeGenerator(generator, ReviewerAgent()).generate(4, "Photosynthesis")
+    assert result["source"] == "refined" and result["refined"]
+    assert result["initial_content"] == SAMPLE_CONTENT and result["initial_review"]["status"] == "fail"
+    assert result["content"] == refined and result["review"]["status"] == "pass"
+    # Refinement is neither generation nor review time, as in the serial flow
+    assert result["generation_time"] + result["review_time"] <= result["elapsed"]
@@ -4,56 +4,411 @@ Shows metrics like generation time, review pass rate, refinement frequency
 """
 
 import json
+import re
 import time
-from datetime import datetime
-from typing import Dict, List
+from array import array
+from collections import Counter
+from collections.abc import Sequence
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Union
 import os
 
-class AnalyticsTracker:
+from .analytics_store import BACKENDS, STORE_ERRORS, AnalyticsStore, session_matches
+
+class SessionStats:
+    """
+    Running aggregates over logged sessions
+    Updated once per session so statistics never need a rescan of the history
+    """
+    
     def __init__(self):
-        self.sessions = []
+        self.total = 0
+        self.passed = 0
+        self.refined = 0
+        self.generation_time_sum = 0.0
+        self.feedback_count_sum = 0
+        self.grade_counts = Counter()
+        self.topics = set()
+    
+    def add(self, session: Dict):
+        """Fold one session into the aggregates"""
+        self.total += 1
+        if session.get('review_status') == 'pass':
+            self.passed += 1
+        if session.get('refinement_needed'):
+            self.refined += 1
+        self.generation_time_sum += session.get('generation_time') or 0
+        self.feedback_count_sum += session.get('feedback_count') or 0
+        
+        grade = session.get('grade')
+        if grade:
+            self.grade_counts[grade] += 1
+        
+        topic = session.get('topic')
+        if topic:
+            self.topics.add(topic)
+    
+    @classmethod
+    def from_sessions(cls, sessions: List[Dict]) -> 'SessionStats':
+        """Build aggregates from an existing history in a single pass"""
+        stats = cls()
+        for session in sessions:
+            stats.add(session)
+        return stats
+    
+    def to_dict(self) -> Dict:
+        """Serialisable snapshot of the aggregates"""
+        return {
+            "total": self.total,
+            "passed": self.passed,
+            "refined": self.refined,
+            "generation_time_sum": self.generation_time_sum,
+            "feedback_count_sum": self.feedback_count_sum,
+            "grade_counts": [[grade, count] for grade, count in self.grade_counts.items()],
+            "topics": sorted(self.topics)
+        }
+    
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'SessionStats':
+        """Restore aggregates saved with to_dict"""
+        stats = cls()
+        stats.total = data["total"]
+        stats.passed = data["passed"]
+        stats.refined = data["refined"]
+        stats.generation_time_sum = data["generation_time_sum"]
+        stats.feedback_count_sum = data["feedback_count_sum"]
+        stats.grade_counts = Counter({grade: count for grade, count in data["grade_counts"]})
+        stats.topics = set(data["topics"])
+        return stats
+    
+    def most_common_grade(self):
+        """Grade with the most sessions (histogram has at most 12 entries)"""
+        if not self.grade_counts:
+            return None
+        return self.grade_counts.most_common(1)[0][0]
+
+
+class SessionColumns(Sequence):
+    """
+    Compact columnar store of sessions backed by typed arrays
+    Topics and statuses are interned to small ints and timestamps kept as epoch
+    microseconds, so a session costs tens of bytes instead of a 12-key dict.
+    Indexing returns the session as a regular dict.
+    
+    Values a column can't hold exactly (a float or string in an integer field,
+    a timestamp with a UTC offset) and keys outside the standard session keep
+    their original value in a per-row overflow dict, so every row reads back
+    equal to the dict that was appended.
+    """
+    
+    EPOCH = datetime(1970, 1, 1)
+    STATUSES = ['unknown', 'pass', 'fail']
+    # Sentinels for missing values in integer columns
+    NO_TIMESTAMP = -(2 ** 63)
+    NO_VALUE = -1
+    KEYS = frozenset(['timestamp', 'grade', 'topic', 'generation_time', 'review_time', 'total_time',
+                      'review_status', 'feedback_count', 'refinement_needed', 'refinement_improved',
+                      'mcq_count', 'explanation_length'])
+    NUMERIC_KEYS = ('grade', 'generation_time', 'review_time', 'total_time', 'feedback_count', 'mcq_count',
+                    'explanation_length')
+    # Statuses past this many distinct ones are kept in the row's overflow
+    MAX_STATUSES = 2 ** 15
+    # What datetime.isoformat() writes for a naive timestamp, which decodes back unchanged
+    CANONICAL_TIMESTAMP = re.compile(r"\d{4}-\d\d-\d\dT\d\d:\d\d:\d\d(?:\.(?!000000)\d{6})?")
+    
+    def __init__(self):
+        self.timestamp = array('q')
+        self.grade = array('h')
+        self.topic = array('i')
+        self.generation_time = array('d')
+        self.review_time = array('d')
+        self.total_time = array('d')
+        self.status = array('h')
+        self.feedback_count = array('i')
+        self.refinement_needed = array('b')
+        self.refinement_improved = array('b')
+        self.mcq_count = array('i')
+        self.explanation_length = array('i')
+        
+        self._topics = []
+        self._topic_ids = {}
+        self._statuses = list(self.STATUSES)
+        self._status_ids = {status: i for i, status in enumerate(self.STATUSES)}
+        # Row index -> values kept verbatim (see the class docstring)
+        self._overflow = {}
+    
+    def append(self, session: Dict):
+        """Add one session dict as a new row"""
+        if self.KEYS.issuperset(session):
+            overflow = {}
+        else:
+            overflow = {key: value for key, value in session.items() if key not in self.KEYS}
+        
+        original = session.get('timestamp')
+        timestamp = self._encode_timestamp(original)
+        self.timestamp.append(timestamp)
+        # Only a non-canonical string can decode to something else
+        if (original.__class__ is not str or not self.CANONICAL_TIMESTAMP.fullmatch(original)) \
+                and 'timestamp' in session and self._decode_timestamp(timestamp) != original:
+            overflow['timestamp'] = original
+        
+        self.topic.append(self._put_interned(self._topics, self._topic_ids, session.get('topic'), 'topic',
+                                             None, overflow))
+        self.status.append(self._put_interned(self._statuses, self._status_ids,
+                                              session.get('review_status', 'unknown'), 'review_status',
+                                              'unknown', overflow, self.MAX_STATUSES))
+        
+        row = len(self.grade)
+        grade = session.get('grade')
+        try:
+            self.grade.append(0 if grade is None else grade)
+            self.generation_time.append(session.get('generation_time', 0))
+            self.review_time.append(session.get('review_time', 0))
+            self.total_time.append(session.get('total_time', 0))
+            self.feedback_count.append(session.get('feedback_count', 0))
+            self.mcq_count.append(session.get('mcq_count', 0))
+            self.explanation_length.append(session.get('explanation_length', 0))
+        except (TypeError, OverflowError):
+            # Rare: undo this row's numbers and redo them one by one
+            for key in self.NUMERIC_KEYS:
+                column = getattr(self, key)
+                del column[row:]
+                value = session.get(key, 0)
+                self._put(column, key, 0 if key == 'grade' and value is None else value, overflow)
+        
+        needed = session.get('refinement_needed', False)
+        self.refinement_needed.append(1 if needed else 0)
+        if needed.__class__ is not bool:
+            overflow['refinement_needed'] = needed
+        improved = session.get('refinement_improved')
+        self.refinement_improved.append(self.NO_VALUE if improved is None else int(bool(improved)))
+        if improved is not None and improved.__class__ is not bool:
+            overflow['refinement_improved'] = improved
+        
+        if overflow:
+            self._overflow[row] = overflow
+    
+    def __len__(self) -> int:
+        return len(self.status)
+    
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self._row(i) for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("session index out of range")
+        return self._row(index)
+    
+    def status_count(self, status: str, start: int = 0, stop: Optional[int] = None) -> int:
+        """Count rows in [start, stop) with the given review status"""
+        code = self._status_ids.get(status)
+        if code is None:
+            return 0
+        return self.status[start:stop].count(code)
+    
+    def _row(self, i: int) -> Dict:
+        improved = self.refinement_improved[i]
+        return {
+            "timestamp": self._decode_timestamp(self.timestamp[i]),
+            "grade": self.grade[i] or None,
+            "topic": self._topics[self.topic[i]],
+            "generation_time": self.generation_time[i],
+            "review_time": self.review_time[i],
+            "total_time": self.total_time[i],
+            "review_status": self._statuses[self.status[i]],
+            "feedback_count": self.feedback_count[i],
+            "refinement_needed": bool(self.refinement_needed[i]),
+            "refinement_improved": None if improved == self.NO_VALUE else bool(improved),
+            "mcq_count": self.mcq_count[i],
+            "explanation_length": self.explanation_length[i],
+            **self._overflow.get(i, {})
+        }
+    
+    @staticmethod
+    def _put(column: array, key: str, value, overflow: Dict):
+        """Append value to column, or the zero placeholder if the column can't hold it exactly"""
+        try:
+            column.append(value)
+        except (TypeError, OverflowError):
+            column.append(0)
+            overflow[key] = value
+    
+    @classmethod
+    def _put_interned(cls, values: List, ids: Dict, value, key: str, default, overflow: Dict,
+                      limit: Optional[int] = None) -> int:
+        """
+        Interned id of value; anything but a string (or the default), or a new
+        value past `limit` distinct ones, is kept in overflow as the default
+        """
+        code = ids.get(value) if value.__class__ is str else None
+        if code is not None:
+            return code
+        if value is not default and (not isinstance(value, str) or (limit and len(values) >= limit)):
+            overflow[key] = value
+            value = default
+        return cls._intern(values, ids, value)
+    
+    @staticmethod
+    def _intern(values: List, ids: Dict, value) -> int:
+        if value not in ids:
+            ids[value] = len(values)
+            values.append(value)
+        return ids[value]
+    
+    @classmethod
+    def _encode_timestamp(cls, timestamp: Optional[str]) -> int:
+        try:
+            moment = datetime.fromisoformat(timestamp)
+        except (TypeError, ValueError):
+            return cls.NO_TIMESTAMP
+        if moment.tzinfo is not None:
+            # Stored as the UTC instant; the original string is kept in the row's overflow
+            moment = moment.astimezone(timezone.utc).replace(tzinfo=None)
+        return (moment - cls.EPOCH) // timedelta(microseconds=1)
+    
+    @classmethod
+    def _decode_timestamp(cls, value: int) -> str:
+        if value == cls.NO_TIMESTAMP:
+            return ""
+        return (cls.EPOCH + timedelta(microseconds=value)).isoformat()
+
+
+class AnalyticsTracker:
+    # Persist the aggregate snapshot after this many newly read sessions
+    SNAPSHOT_EVERY = 100
+    
+    def __init__(self, analytics_file: Optional[str] = None, fsync_policy: str = "interval",
+                 max_sessions: Optional[int] = None, lazy: bool = False, backend="jsonl",
+                 compact_every: int = 1000):
+        """
+        Args:
+            analytics_file: Path of the session log (defaults to the temp directory)
+            fsync_policy: "always", "interval" or "never" - see JSONLinesStore
+            max_sessions: Optional retention limit, applied every compact_every
+                logged sessions and during compaction
+            lazy: Don't load the history into memory; start from the saved
+                aggregate snapshot and read sessions from the log on demand
+            backend: Storage backend name ("jsonl" or "sqlite") or an
+                AnalyticsStore subclass
+            compact_every: Logged sessions between the store's retention checks
+        """
+        if isinstance(backend, str):
+            if backend not in BACKENDS:
+                raise ValueError(f"Unknown analytics backend '{backend}' - choose from {', '.join(BACKENDS)}")
+            store_class = BACKENDS[backend]
+        elif isinstance(backend, type) and issubclass(backend, AnalyticsStore):
+            store_class = backend
+        else:
+            raise ValueError("backend must be a backend name or an AnalyticsStore subclass")
+        
+        self.lazy = lazy
+        self.stats = SessionStats()
+        self.store = None
+        self._sessions = SessionColumns()
+        # Position (and log identity) in the store covered by stats/sessions
+        self._offset = 0
+        self._log_id = None
+        self._unsnapshotted = 0
         # Use temp directory for cloud deployment safety
         import tempfile
-        import os
         
         # Try to use a writable directory
         try:
             # For cloud deployments, use temp directory
-            temp_dir = tempfile.gettempdir()
-            self.analytics_file = os.path.join(temp_dir, "analytics_log.json")
+            if analytics_file is None:
+                analytics_file = os.path.join(tempfile.gettempdir(), store_class.DEFAULT_FILENAME)
+            self.analytics_file = analytics_file
         except:
             # Fallback: just keep in memory (won't persist)
             self.analytics_file = None
         
+        if self.analytics_file:
+            try:
+                self.store = store_class(
+                    self.analytics_file,
+                    fsync_policy=fsync_policy,
+                    max_records=max_sessions,
+                    compact_every=compact_every
+                )
+                self.snapshot_file = self.analytics_file + ".stats.json"
+            except STORE_ERRORS:
+                # Can't open the store - keep in memory only
+                self.store = None
+        
         self.load_history()
     
+    @property
+    def sessions(self) -> SessionColumns:
+        """All logged sessions (materialised from the log on first use in lazy mode)"""
+        if self._sessions is None:
+            self._refresh()
+            sessions = SessionColumns()
+            for record, end_offset in self.store.scan():
+                if end_offset > self._offset:
+                    break
+                sessions.append(record)
+            self._sessions = sessions
+        return self._sessions
+    
     def load_history(self):
         """Load previous analytics if available"""
-        if not self.analytics_file:
+        if not self.store:
             return
-            
-        if os.path.exists(self.analytics_file):
-            try:
-                with open(self.analytics_file, 'r') as f:
-                    self.sessions = json.load(f)
-            except:
-                self.sessions = []
+        
+        try:
+            self._migrate_legacy_log()
+            self.store.recover()
+        except STORE_ERRORS:
+            pass
+        
+        self.stats = SessionStats()
+        self._offset = 0
+        self._log_id = None
+        
+        if self.lazy:
+            self._sessions = None
+            self._load_snapshot()
+        else:
+            self._sessions = SessionColumns()
+        
+        self._refresh()
     
     def save_history(self):
-        """Save analytics to file"""
-        if not self.analytics_file:
+        """Compact the analytics log (appends are persisted as they happen)"""
+        if not self.store:
             return  # Skip if no file path available
-            
+        
         try:
-            with open(self.analytics_file, 'w') as f:
-                json.dump(self.sessions, f, indent=2)
-        except:
+            self.store.compact()
+        except STORE_ERRORS:
             # Silently fail if can't write (read-only filesystem)
             pass
     
     def log_session(self, session_data: Dict):
         """Log a complete generation session"""
-        session = {
+        self.log_sessions([session_data])
+    
+    def log_sessions(self, sessions_data: List[Dict]):
+        """Log several sessions with one batched write"""
+        sessions = [self._build_session(data) for data in sessions_data]
+        
+        if self.store:
+            try:
+                self.store.append_many(sessions)
+                # Picks up these sessions plus any logged by other trackers
+                self._refresh()
+                return
+            except STORE_ERRORS:
+                # Can't write (read-only filesystem) - keep them in memory only
+                pass
+        
+        for session in sessions:
+            self._add(session)
+    
+    @staticmethod
+    def _build_session(session_data: Dict) -> Dict:
+        return {
             "timestamp": datetime.now().isoformat(),
             "grade": session_data.get("grade"),
             "topic": session_data.get("topic"),
@@ -67,13 +422,98 @@ class AnalyticsTracker:
             "mcq_count": session_data.get("mcq_count", 0),
             "explanation_length": session_data.get("explanation_length", 0)
         }
+    
+    def _add(self, session: Dict):
+        self.stats.add(session)
+        if self._sessions is not None:
+            self._sessions.append(session)
+    
+    def _refresh(self):
+        """Fold sessions appended to the log since the last read into stats"""
+        if not self.store:
+            return
+        
+        log_id, size = self.store.identity()
+        if log_id != self._log_id or size < self._offset:
+            # The log was compacted or replaced - start over from its beginning
+            self.stats = SessionStats()
+            if self._sessions is not None:
+                self._sessions = SessionColumns()
+            self._log_id = log_id
+            self._offset = 0
+        
+        if size == self._offset:
+            return
+        
+        for record, end_offset in self.store.scan(self._offset):
+            self._add(record)
+            self._offset = end_offset
+            self._unsnapshotted += 1
+        
+        if self._unsnapshotted >= self.SNAPSHOT_EVERY:
+            self._save_snapshot()
+    
+    def _load_snapshot(self):
+        """Restore aggregates covering a prefix of the log, if still valid"""
+        try:
+            with open(self.snapshot_file, 'r') as f:
+                snapshot = json.load(f)
+            log_id, size = self.store.identity()
+            if snapshot["log_id"] != log_id or snapshot["offset"] > size:
+                return
+            self.stats = SessionStats.from_dict(snapshot["stats"])
+        except STORE_ERRORS + (ValueError, KeyError, TypeError):
+            return
+        
+        self._log_id = log_id
+        self._offset = snapshot["offset"]
+    
+    def _save_snapshot(self):
+        """Persist aggregates so lazy trackers start without a full scan"""
+        snapshot = {
+            "log_id": self._log_id,
+            "offset": self._offset,
+            "stats": self.stats.to_dict()
+        }
+        try:
+            # Per process, so trackers in other workers don't write the same temp file
+            tmp_file = f"{self.snapshot_file}.{os.getpid()}.tmp"
+            with open(tmp_file, 'w') as f:
+                json.dump(snapshot, f)
+            os.replace(tmp_file, self.snapshot_file)
+            self._unsnapshotted = 0
+        except OSError:
+            pass
+    
+    def _recent(self, limit: int) -> List[Dict]:
+        """Last `limit` sessions in log order, without materialising the history"""
+        if limit <= 0:
+            return []
+        if self._sessions is not None:
+            return self._sessions[-limit:]
+        return self.store.tail(limit)
+    
+    def _migrate_legacy_log(self):
+        """Import the old single-document analytics_log.json into an empty store once"""
+        legacy_file = os.path.splitext(self.analytics_file)[0] + ".json"
+        if legacy_file == self.analytics_file or not os.path.exists(legacy_file):
+            return
+        if self.store.identity()[1] > 0:
+            return
         
-        self.sessions.append(session)
-        self.save_history()
+        try:
+            with open(legacy_file, 'r') as f:
+                legacy_sessions = json.load(f)
+        except ValueError:
+            return
+        
+        self.store.append_many(session for session in legacy_sessions if isinstance(session, dict))
     
     def get_statistics(self) -> Dict:
-        """Calculate aggregate statistics"""
-        if not self.sessions:
+        """Return aggregate statistics from the running counters"""
+        self._refresh()
+        stats = self.stats
+        if not stats.total:
             return {
                 "total_generations": 0,
                 "pass_rate": 0,
@@ -83,53 +523,123 @@ class AnalyticsTracker:
                 "total_topics": 0
             }
         
-        total = len(self.sessions)
-        passed = sum(1 for s in self.sessions if s['review_status'] == 'pass')
-        refined = sum(1 for s in self.sessions if s['refinement_needed'])
-        
-        avg_gen_time = sum(s['generation_time'] for s in self.sessions) / total
-        
-        # Most common grade
-        grades = [s['grade'] for s in self.sessions if s['grade']]
-        most_common_grade = max(set(grades), key=grades.count) if grades else None
-        
-        # Unique topics
-        topics = set(s['topic'] for s in self.sessions if s['topic'])
+        total = stats.total
         
         return {
             "total_generations": total,
-            "pass_rate": (passed / total * 100) if total > 0 else 0,
-            "avg_generation_time": avg_gen_time,
-            "refinement_rate": (refined / total * 100) if total > 0 else 0,
-            "most_common_grade": most_common_grade,
-            "total_topics": len(topics),
-            "avg_feedback_count": sum(s['feedback_count'] for s in self.sessions) / total if total > 0 else 0
+            "pass_rate": stats.passed / total * 100,
+            "avg_generation_time": stats.generation_time_sum / total,
+            "refinement_rate": stats.refined / total * 100,
+            "most_common_grade": stats.most_common_grade(),
+            "total_topics": len(stats.topics),
+            "avg_feedback_count": stats.feedback_count_sum / total
         }
     
     def get_grade_distribution(self) -> Dict[int, int]:
         """Get distribution of content by grade"""
-        distribution = {}
-        for session in self.sessions:
-            grade = session.get('grade')
-            if grade:
-                distribution[grade] = distribution.get(grade, 0) + 1
-        return distribution
-    
-    def get_recent_sessions(self, limit: int = 10) -> List[Dict]:
-        """Get most recent sessions"""
-        return sorted(self.sessions, key=lambda x: x['timestamp'], reverse=True)[:limit]
-    
-    def get_performance_trends(self) -> Dict:
-        """Get performance trends over time"""
-        if len(self.sessions) < 5:
+        self._refresh()
+        return dict(self.stats.grade_counts)
+    
+    def get_recent_sessions(self, limit: int = 10, grade: Optional[int] = None,
+                            topic: Optional[str] = None) -> List[Dict]:
+        """Get most recent sessions, optionally only for one grade or topic"""
+        if grade is not None or topic is not None:
+            return self._query(grade=grade, topic=topic, limit=limit)
+        self._refresh()
+        return sorted(self._recent(limit), key=lambda x: x['timestamp'], reverse=True)
+    
+    def get_window_statistics(self, start: Union[datetime, str, None] = None,
+                              end: Union[datetime, str, None] = None,
+                              grade: Optional[int] = None, topic: Optional[str] = None) -> Dict:
+        """
+        Statistics for sessions logged in [start, end)
+        
+        Args:
+            start: Inclusive start of the window (None = from the beginning)
+            end: Exclusive end of the window (None = up to now)
+            grade: Only count sessions for this grade
+            topic: Only count sessions for this topic
+            
+        Returns:
+            Dictionary with counts, pass/refinement rates and average generation time
+        """
+        start, end = self._iso(start), self._iso(end)
+        if self.store:
+            totals = self.store.window_stats(start, end, grade, topic)
+        else:
+            window = SessionStats.from_sessions(
+                [s for s in self.sessions if session_matches(s, start, end, grade, topic)]
+            )
+            totals = {
+                "total": window.total,
+                "passed": window.passed,
+                "refined": window.refined,
+                "generation_time_sum": window.generation_time_sum
+            }
+        
+        total = totals["total"]
+        return {
+            "total_generations": total,
+            "pass_rate": totals["passed"] / total * 100 if total else 0,
+            "refinement_rate": totals["refined"] / total * 100 if total else 0,
+            "avg_generation_time": totals["generation_time_sum"] / total if total else 0
+        }
+    
+    def _query(self, **filters) -> List[Dict]:
+        if self.store:
+            return self.store.query(**filters)
+        limit = filters.pop("limit", None)
+        matches = [s for s in self.sessions if session_matches(s, **filters)]
+        matches.sort(key=lambda x: x['timestamp'], reverse=True)
+        return matches[:limit] if limit is not None else matches
+    
+    @staticmethod
+    def _iso(moment: Union[datetime, str, None]) -> Optional[str]:
+        return moment.isoformat() if isinstance(moment, datetime) else moment
+    
+    def get_performance_trends(self, window: Optional[timedelta] = None) -> Dict:
+        """
+        Get performance trends over time
+        
+        Compares the last 10 sessions with the 10 before them, or - if a window
+        is given - the last `window` of time with the `window` before it.
+        """
+        if window is not None:
+            now = datetime.now()
+            recent = self.get_window_statistics(now - window, now)
+            older = self.get_window_statistics(now - 2 * window, now - window)
+            if recent["total_generations"] == 0:
+                return {"insufficient_data": True}
+            recent_pass_rate = recent["pass_rate"]
+            older_pass_rate = older["pass_rate"] if older["total_generations"] else recent_pass_rate
+            return self._trend(recent_pass_rate, older_pass_rate)
+        
+        self._refresh()
+        total = self.stats.total
+        if total < 5:
             return {"insufficient_data": True}
         
-        recent = self.sessions[-10:]
-        older = self.sessions[-20:-10] if len(self.sessions) >= 20 else []
+        if self._sessions is not None:
+            total = len(self._sessions)
+            recent_count = min(total, 10)
+            older_count = 10 if total >= 20 else 0
+            recent_passed = self._sessions.status_count('pass', total - recent_count)
+            older_passed = self._sessions.status_count('pass', total - 20, total - 10) if older_count else 0
+        else:
+            last_twenty = self._recent(20)
+            recent = last_twenty[-10:]
+            older = last_twenty[-20:-10] if len(last_twenty) >= 20 else []
+            recent_count, older_count = len(recent), len(older)
+            recent_passed = sum(1 for s in recent if s['review_status'] == 'pass')
+            older_passed = sum(1 for s in older if s['review_status'] == 'pass')
         
-        recent_pass_rate = sum(1 for s in recent if s['review_status'] == 'pass') / len(recent) * 100
-        older_pass_rate = sum(1 for s in older if s['review_status'] == 'pass') / len(older) * 100 if older else recent_pass_rate
+        recent_pass_rate = recent_passed / recent_count * 100
+        older_pass_rate = older_passed / older_count * 100 if older_count else recent_pass_rate
         
+        return self._trend(recent_pass_rate, older_pass_rate)
+    
+    @staticmethod
+    def _trend(recent_pass_rate: float, older_pass_rate: float) -> Dict:
         return {
             "improving": recent_pass_rate > older_pass_rate,
             "recent_pass_rate": recent_pass_rate,
@@ -0,0 +1,651 @@
+"""
+Analytics Storage - Pluggable session storage backends for AnalyticsTracker
+Append-only JSON Lines log and an indexed SQLite database
+"""
+
+import json
+import mmap
+import os
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import deque
+from contextlib import contextmanager
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows: no cross-process locking, so torn tails are skipped rather than truncated
+    fcntl = None
+
+# Errors a backend may raise when its file can't be read or written
+STORE_ERRORS = (OSError, sqlite3.Error)
+
+# One lock per log path so trackers in the same process don't interleave a compaction
+_path_locks = {}
+_path_locks_guard = threading.Lock()
+
+
+def _lock_for(path: str) -> threading.Lock:
+    with _path_locks_guard:
+        return _path_locks.setdefault(os.path.abspath(path), threading.Lock())
+
+
+class AnalyticsStore(ABC):
+    """
+    Base class for analytics storage backends
+    
+    Records are addressed by a monotonically increasing position: scan(start)
+    yields (record, position) pairs for records after `start`, and identity()
+    returns (log_id, end_position). log_id changes whenever existing records
+    are rewritten (e.g. by compaction), telling readers to start over.
+    
+    Backends implement append, scan and identity. The query helpers below
+    scan the whole store; indexed backends override them.
+    """
+    
+    DEFAULT_FILENAME = "analytics_log"
+    
+    @abstractmethod
+    def append(self, record: Dict):
+        """Append a single record"""
+    
+    def append_many(self, records: Iterable[Dict]):
+        """Append several records"""
+        for record in records:
+            self.append(record)
+    
+    def load(self) -> List[Dict]:
+        """Read every stored record"""
+        self.recover()
+        return [record for record, _ in self.scan()]
+    
+    def recover(self):
+        """Repair damage left by a crash, if the backend can have any"""
+    
+    @abstractmethod
+    def scan(self, start: int = 0) -> Iterator[Tuple[Dict, int]]:
+        """Stream (record, position) pairs after a position"""
+    
+    def tail(self, limit: int) -> List[Dict]:
+        """Last `limit` records in insertion order"""
+        if limit <= 0:
+            return []
+        return list(deque((record for record, _ in self.scan()), maxlen=limit))
+    
+    @abstractmethod
+    def identity(self) -> Tuple[Optional[int], int]:
+        """Return (log_id, end_position)"""
+    
+    def compact(self):
+        """Reclaim space and apply retention"""
+    
+    def close(self):
+        """Release any open resources"""
+    
+    def query(self, start: Optional[str] = None, end: Optional[str] = None,
+              grade: Optional[int] = None, topic: Optional[str] = None,
+              limit: Optional[int] = None) -> List[Dict]:
+        """
+        Sessions matching the filters, newest first
+        
+        Args:
+            start: Inclusive lower bound on the ISO timestamp
+            end: Exclusive upper bound on the ISO timestamp
+            grade: Only sessions for this grade
+            topic: Only sessions for this exact topic
+            limit: Maximum number of sessions to return
+        """
+        matches = [record for record, _ in self.scan() if session_matches(record, start, end, grade, topic)]
+        matches.sort(key=lambda x: x.get('timestamp') or '', reverse=True)
+        return matches[:limit] if limit is not None else matches
+    
+    def window_stats(self, start: Optional[str] = None, end: Optional[str] = None,
+                     grade: Optional[int] = None, topic: Optional[str] = None) -> Dict:
+        """Counts and sums over the sessions matching the filters"""
+        totals = {"total": 0, "passed": 0, "refined": 0, "generation_time_sum": 0.0}
+        for record, _ in self.scan():
+            if session_matches(record, start, end, grade, topic):
+                _accumulate(totals, record)
+        return totals
+
+
+def session_matches(record: Dict, start: Optional[str] = None, end: Optional[str] = None,
+                    grade: Optional[int] = None, topic: Optional[str] = None) -> bool:
+    """Check a session against the query filters used by AnalyticsStore.query"""
+    timestamp = record.get('timestamp') or ''
+    if start is not None and timestamp < start:
+        return False
+    if end is not None and timestamp >= end:
+        return False
+    if grade is not None and record.get('grade') != grade:
+        return False
+    if topic is not None and record.get('topic') != topic:
+        return False
+    return True
+
+
+def _accumulate(totals: Dict, record: Dict):
+    totals["total"] += 1
+    if record.get('review_status') == 'pass':
+        totals["passed"] += 1
+    if record.get('refinement_needed'):
+        totals["refined"] += 1
+    totals["generation_time_sum"] += record.get('generation_time') or 0
+
+
+class JSONLinesStore(AnalyticsStore):
+    """
+    Append-only JSON Lines log with crash recovery and periodic compaction
+    
+    Each record is written with a single O_APPEND write, so appends are O(1)
+    and several trackers can share one file. Writers hold a shared lock on
+    `<path>.lock` while appending; repairing a torn final record (left by a
+    crash mid-write) and compaction take it exclusively, so neither can cut
+    off or drop another process's append.
+    """
+    
+    FSYNC_POLICIES = ("always", "interval", "never")
+    DEFAULT_FILENAME = "analytics_log.jsonl"
+    
+    def __init__(self, path: str, fsync_policy: str = "interval", fsync_interval: float = 1.0,
+                 compact_every: int = 1000, max_records: Optional[int] = None):
+        """
+        Args:
+            path: Location of the .jsonl log file
+            fsync_policy: "always" (fsync every record), "interval" (at most
+                once per fsync_interval seconds) or "never" (leave it to the OS)
+            fsync_interval: Seconds between fsyncs for the "interval" policy
+            compact_every: Appends between compaction checks
+            max_records: Optional retention limit applied when compacting
+        """
+        if fsync_policy not in self.FSYNC_POLICIES:
+            raise ValueError(f"fsync_policy must be one of {', '.join(self.FSYNC_POLICIES)}")
+        
+        self.path = path
+        self.fsync_policy = fsync_policy
+        self.fsync_interval = fsync_interval
+        self.compact_every = compact_every
+        self.max_records = max_records
+        
+        self.record_count = 0
+        self._corrupt_records = 0
+        self._appends_since_compaction = 0
+        self._last_fsync = 0.0
+        self._fd = None
+        self._inode = None
+        self._lock = _lock_for(path)
+        self._lock_fd = None
+    
+    def load(self) -> List[Dict]:
+        """Read every valid record, truncating a torn final record if present"""
+        self.recover()
+        records = [record for record, _ in self.scan()]
+        self.record_count = len(records)
+        return records
+    
+    def recover(self):
+        """
+        Truncate a torn (newline-less) final record left by a crash
+        
+        A newline-less tail may also be another writer's append in progress,
+        so the file is only repaired while no writer holds the lock; otherwise
+        it is left alone (scan skips partial lines anyway). Either way
+        record_count is reset to the number of records in the log.
+        """
+        with self._lock:
+            with self._file_lock(exclusive=True, wait=False) as locked:
+                if locked:
+                    self._truncate_torn_tail()
+            self.record_count = self._count_records()
+    
+    def scan(self, start: int = 0) -> Iterator[Tuple[Dict, int]]:
+        """
+        Stream (record, end_offset) pairs from a byte offset onwards
+        
+        Only complete lines are returned; a trailing partial line is left for
+        a later scan since another writer may still be appending it.
+        """
+        if start == 0:
+            self._corrupt_records = 0
+        
+        try:
+            f = open(self.path, 'rb')
+        except FileNotFoundError:
+            return
+        
+        with f:
+            f.seek(start)
+            offset = start
+            for line in f:
+                if not line.endswith(b'\n'):
+                    break
+                offset += len(line)
+                record = self._decode(line)
+                if record is None:
+                    self._corrupt_records += 1
+                    continue
+                yield record, offset
+    
+    def tail(self, limit: int) -> List[Dict]:
+        """Read the last `limit` records by scanning backwards from the end of the file"""
+        records = []
+        if limit <= 0:
+            return records
+        
+        try:
+            f = open(self.path, 'rb')
+        except FileNotFoundError:
+            return records
+        
+        with f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return records
+            
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                end = mm.rfind(b'\n') + 1
+                while end > 0 and len(records) < limit:
+                    start = mm.rfind(b'\n', 0, end - 1) + 1
+                    record = self._decode(mm[start:end])
+                    if record is not None:
+                        records.append(record)
+                    end = start
+        
+        records.reverse()
+        return records
+    
+    def identity(self) -> Tuple[Optional[int], int]:
+        """Return (inode, size) of the log; the inode changes when it is compacted"""
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return None, 0
+        return st.st_ino, st.st_size
+    
+    def append(self, record: Dict):
+        """Append a single record to the log"""
+        self.append_many([record])
+    
+    def append_many(self, records: Iterable[Dict]):
+        """Append several records with a single write"""
+        lines = [json.dumps(record, separators=(',', ':')) + "\n" for record in records]
+        if not lines:
+            return
+        data = "".join(lines).encode('utf-8')
+        
+        with self._lock, self._file_lock(exclusive=False):
+            fd = self._open()
+            written = os.write(fd, data)
+            while written < len(data):
+                written += os.write(fd, data[written:])
+            self._maybe_fsync(fd)
+        
+        self.record_count += len(lines)
+        self._appends_since_compaction += len(lines)
+        
+        if self.compact_every and self._appends_since_compaction >= self.compact_every:
+            self._appends_since_compaction = 0
+            if self._needs_compaction():
+                self.compact()
+    
+    def compact(self):
+        """Rewrite the log without corrupt records, keeping at most max_records"""
+        if not os.path.exists(self.path):
+            return
+        
+        # Exclusive until the rename, so no process appends to the file being replaced
+        with self._lock, self._file_lock(exclusive=True):
+            kept = deque(maxlen=self.max_records)
+            with open(self.path, 'rb') as f:
+                for line in f:
+                    if self._decode(line) is not None:
+                        kept.append(line if line.endswith(b'\n') else line + b'\n')
+            
+            tmp_path = self.path + ".compact"
+            with open(tmp_path, 'wb') as f:
+                f.writelines(kept)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.path)
+            self._fsync_dir()
+            self._close()
+            
+            self.record_count = len(kept)
+            self._corrupt_records = 0
+    
+    def close(self):
+        """Flush and close the underlying file"""
+        with self._lock:
+            if self._fd is not None and self.fsync_policy != "never":
+                os.fsync(self._fd)
+            self._close()
+            if self._lock_fd is not None:
+                os.close(self._lock_fd)
+                self._lock_fd = None
+    
+    @contextmanager
+    def _file_lock(self, exclusive: bool, wait: bool = True):
+        """
+        Cross-process lock on the log (a sidecar file, since compaction replaces the log)
+        
+        Yields whether the lock is held: False if it is busy and wait is False,
+        or if file locks aren't available.
+        """
+        if fcntl is None:
+            yield False
+            return
+        if self._lock_fd is None:
+            self._lock_fd = os.open(self.path + ".lock", os.O_RDWR | os.O_CREAT, 0o644)
+        
+        operation = fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH
+        try:
+            fcntl.flock(self._lock_fd, operation if wait else operation | fcntl.LOCK_NB)
+        except BlockingIOError:
+            yield False
+            return
+        try:
+            yield True
+        finally:
+            fcntl.flock(self._lock_fd, fcntl.LOCK_UN)
+    
+    def _truncate_torn_tail(self):
+        try:
+            size = os.path.getsize(self.path)
+        except FileNotFoundError:
+            return
+        if size == 0:
+            return
+        
+        with open(self.path, 'r+b') as f:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                good_offset = mm.rfind(b'\n') + 1
+            if good_offset < size:
+                f.truncate(good_offset)
+    
+    def _count_records(self) -> int:
+        """Complete lines in the log (corrupt ones included; compaction drops those)"""
+        try:
+            f = open(self.path, 'rb')
+        except FileNotFoundError:
+            return 0
+        with f:
+            return sum(chunk.count(b'\n') for chunk in iter(lambda: f.read(1 << 20), b''))
+    
+    def _needs_compaction(self) -> bool:
+        if self._corrupt_records:
+            return True
+        if not self.max_records:
+            return False
+        # Other processes append to the same log, so count its lines rather than our appends
+        self.record_count = self._count_records()
+        return self.record_count > self.max_records
+    
+    def _open(self) -> int:
+        # Another tracker may have compacted (replaced) the file under us
+        if self._fd is not None:
+            try:
+                if os.stat(self.path).st_ino != self._inode:
+                    self._close()
+            except FileNotFoundError:
+                self._close()
+        
+        if self._fd is None:
+            self._fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+            self._inode = os.fstat(self._fd).st_ino
+        return self._fd
+    
+    def _close(self):
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+            self._inode = None
+    
+    def _maybe_fsync(self, fd: int):
+        if self.fsync_policy == "always":
+            os.fsync(fd)
+        elif self.fsync_policy == "interval":
+            now = time.monotonic()
+            if now - self._last_fsync >= self.fsync_interval:
+                os.fsync(fd)
+                self._last_fsync = now
+    
+    def _fsync_dir(self):
+        try:
+            dir_fd = os.open(os.path.dirname(os.path.abspath(self.path)), os.O_RDONLY)
+        except OSError:
+            return
+        try:
+            os.fsync(dir_fd)
+        except OSError:
+            pass
+        finally:
+            os.close(dir_fd)
+    
+    @staticmethod
+    def _decode(line: bytes) -> Optional[Dict]:
+        if not line.endswith(b'\n'):
+            return None
+        try:
+            record = json.loads(line)
+        except ValueError:
+            return None
+        return record if isinstance(record, dict) else None
+
+
+class SQLiteStore(AnalyticsStore):
+    """
+    SQLite session store with indexed time-window, grade and topic queries
+    
+    Runs in WAL mode with a busy timeout so several Streamlit worker processes
+    can log to and read from the same database file.
+    """
+    
+    DEFAULT_FILENAME = "analytics_log.db"
+    # fsync policy -> PRAGMA synchronous level
+    SYNCHRONOUS = {"always": "FULL", "interval": "NORMAL", "never": "OFF"}
+    SCAN_BATCH = 1000
+    
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS sessions (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            timestamp TEXT NOT NULL,
+            grade INTEGER,
+            topic TEXT,
+            review_status TEXT,
+            refinement_needed INTEGER NOT NULL DEFAULT 0,
+            generation_time REAL NOT NULL DEFAULT 0,
+            data TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_sessions_timestamp ON sessions (timestamp);
+        CREATE INDEX IF NOT EXISTS idx_sessions_grade ON sessions (grade, timestamp);
+        CREATE INDEX IF NOT EXISTS idx_sessions_topic ON sessions (topic, timestamp);
+        CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value INTEGER NOT NULL);
+        INSERT OR IGNORE INTO meta (key, value) VALUES ('generation', 0);
+    """
+    
+    def __init__(self, path: str, fsync_policy: str = "interval", max_records: Optional[int] = None,
+                 timeout: float = 5.0, compact_every: int = 1000):
+        """
+        Args:
+            path: Location of the SQLite database file
+            fsync_policy: "always", "interval" or "never", mapped to PRAGMA synchronous
+            max_records: Optional retention limit, applied every compact_every
+                inserts and when compacting
+            timeout: Seconds to wait for another process's write lock
+            compact_every: Inserts between retention checks
+        """
+        if fsync_policy not in self.SYNCHRONOUS:
+            raise ValueError(f"fsync_policy must be one of {', '.join(self.SYNCHRONOUS)}")
+        
+        self.path = path
+        self.max_records = max_records
+        self.compact_every = compact_every
+        self._inserts_since_retention = 0
+        self._lock = threading.Lock()
+        
+        self._conn = sqlite3.connect(path, timeout=timeout, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(f"PRAGMA synchronous={self.SYNCHRONOUS[fsync_policy]}")
+        self._conn.executescript(self.SCHEMA)
+    
+    @property
+    def record_count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
+    
+    def append(self, record: Dict):
+        """Insert a single record"""
+        self.append_many([record])
+    
+    def append_many(self, records: Iterable[Dict]):
+        """Insert records in a single transaction"""
+        rows = [self._to_row(record) for record in records]
+        if not rows:
+            return
+        
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.executemany(
+                    "INSERT INTO sessions (timestamp, grade, topic, review_status, refinement_needed, "
+                    "generation_time, data) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    rows
+                )
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+            
+            self._inserts_since_retention += len(rows)
+            if self.compact_every and self._inserts_since_retention >= self.compact_every:
+                self._inserts_since_retention = 0
+                self._apply_retention()
+    
+    def scan(self, start: int = 0) -> Iterator[Tuple[Dict, int]]:
+        """Stream (record, row id) pairs after a row id, in batches"""
+        position = start
+        while True:
+            with self._lock:
+                rows = self._conn.execute(
+                    "SELECT id, data FROM sessions WHERE id > ? ORDER BY id LIMIT ?",
+                    (position, self.SCAN_BATCH)
+                ).fetchall()
+            for row_id, data in rows:
+                position = row_id
+                yield json.loads(data), row_id
+            if len(rows) < self.SCAN_BATCH:
+                return
+    
+    def tail(self, limit: int) -> List[Dict]:
+        """Last `limit` records in insertion order"""
+        if limit <= 0:
+            return []
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT data FROM sessions ORDER BY id DESC LIMIT ?", (limit,)
+            ).fetchall()
+        return [json.loads(data) for data, in reversed(rows)]
+    
+    def identity(self) -> Tuple[Optional[int], int]:
+        """Return (compaction generation, highest row id)"""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT (SELECT value FROM meta WHERE key = 'generation'), "
+                "(SELECT COALESCE(MAX(id), 0) FROM sessions)"
+            ).fetchone()
+    
+    def compact(self):
+        """Drop records beyond max_records and checkpoint the WAL"""
+        with self._lock:
+            self._apply_retention()
+            self._conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    
+    def close(self):
+        """Close the database connection"""
+        with self._lock:
+            self._conn.close()
+    
+    def query(self, start: Optional[str] = None, end: Optional[str] = None,
+              grade: Optional[int] = None, topic: Optional[str] = None,
+              limit: Optional[int] = None) -> List[Dict]:
+        """Sessions matching the filters, newest first (index range scan)"""
+        where, params = self._where(start, end, grade, topic)
+        sql = f"SELECT data FROM sessions{where} ORDER BY timestamp DESC"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        return [json.loads(data) for data, in rows]
+    
+    def window_stats(self, start: Optional[str] = None, end: Optional[str] = None,
+                     grade: Optional[int] = None, topic: Optional[str] = None) -> Dict:
+        """Counts and sums over the sessions matching the filters"""
+        where, params = self._where(start, end, grade, topic)
+        with self._lock:
+            total, passed, refined, generation_time_sum = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(review_status = 'pass'), 0), "
+                f"COALESCE(SUM(refinement_needed), 0), COALESCE(SUM(generation_time), 0) FROM sessions{where}",
+                params
+            ).fetchone()
+        return {
+            "total": total,
+            "passed": passed,
+            "refined": refined,
+            "generation_time_sum": generation_time_sum
+        }
+    
+    def _apply_retention(self):
+        """Delete all but the newest max_records rows (caller holds self._lock)"""
+        if self.max_records is None:
+            return
+        self._conn.execute("BEGIN IMMEDIATE")
+        try:
+            deleted = self._conn.execute(
+                "DELETE FROM sessions WHERE id <= "
+                "(SELECT id FROM sessions ORDER BY id DESC LIMIT 1 OFFSET ?)",
+                (self.max_records,)
+            ).rowcount
+            if deleted:
+                self._conn.execute("UPDATE meta SET value = value + 1 WHERE key = 'generation'")
+        except BaseException:
+            self._conn.execute("ROLLBACK")
+            raise
+        self._conn.execute("COMMIT")
+    
+    @staticmethod
+    def _where(start, end, grade, topic) -> Tuple[str, List]:
+        clauses, params = [], []
+        if start is not None:
+            clauses.append("timestamp >= ?")
+            params.append(start)
+        if end is not None:
+            clauses.append("timestamp < ?")
+            params.append(end)
+        if grade is not None:
+            clauses.append("grade = ?")
+            params.append(grade)
+        if topic is not None:
+            clauses.append("topic = ?")
+            params.append(topic)
+        return (" WHERE " + " AND ".join(clauses) if clauses else ""), params
+    
+    @staticmethod
+    def _to_row(record: Dict) -> Tuple:
+        return (
+            record.get('timestamp') or '',
+            record.get('grade'),
+            record.get('topic'),
+            record.get('review_status'),
+            1 if record.get('refinement_needed') else 0,
+            record.get('generation_time') or 0,
+            json.dumps(record, separators=(',', ':'))
+        )
+
+
+# Backends selectable by name in AnalyticsTracker(backend=...)
+BACKENDS = {
+    "jsonl": JSONLinesStore,
+    "sqlite": SQLiteStore
+}
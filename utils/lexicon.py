@@ -0,0 +1,302 @@
+"""
+Lexicon - Word difficulty data (syllables, frequency rank, age of acquisition) for the content checks
+Word lists compiled into a memory-mapped hash table, so a lookup is O(1) without loading the lexicon
+
+Usage: python -m utils.lexicon build [--source words.csv ...] [--output lexicon.idx]
+       python -m utils.lexicon lookup photosynthesis vertex dog
+"""
+
+import argparse
+import csv
+import hashlib
+import mmap
+import os
+import struct
+import tempfile
+import threading
+import zlib
+from typing import Dict, List, NamedTuple, Optional, Sequence
+
+DEFAULT_SOURCE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "lexicon_seed.csv")
+
+# Magic, source digest, slot count, word count
+_HEADER = struct.Struct("<8s32sII")
+_MAGIC = b"EDLEX01\n"
+# Word offset in the string pool, frequency rank, word length, syllables, AoA grade
+_SLOT = struct.Struct("<IIBBBx")
+
+# Frequency rank bands used to estimate a grade for words without AoA data
+_RANK_GRADES = ((1000, 1), (3000, 3), (10000, 5), (25000, 8), (50000, 10))
+
+
+class WordInfo(NamedTuple):
+    syllables: int        # 0 if unknown
+    frequency_rank: int   # 1 = most frequent, 0 if unknown
+    aoa_grade: int        # School grade the word is typically learned by (1-12), 0 if unknown
+
+
+def aoa_grade(age: float) -> int:
+    """School grade for an age of acquisition in years (6 -> Grade 1)"""
+    return max(1, min(12, int(age + 0.5) - 5))
+
+
+def read_sources(sources: Sequence[str]) -> Dict[str, WordInfo]:
+    """
+    Merge word lists, later sources filling in or overriding fields
+    
+    Each source is a CSV file with a `word` column and any of `syllables`,
+    `frequency_rank`, `aoa_grade` or `aoa_age` (years, as in the Kuperman
+    norms), so frequency lists, pronouncing dictionaries and AoA norms can be
+    kept in separate files.
+    """
+    words: Dict[str, WordInfo] = {}
+    for source in sources:
+        with open(source, newline='', encoding='utf-8') as f:
+            for row in csv.DictReader(f):
+                word = (row.get("word") or "").strip().lower()
+                if not word or len(word.encode('utf-8')) > 255:
+                    continue
+                info = words.get(word, WordInfo(0, 0, 0))
+                if row.get("syllables"):
+                    info = info._replace(syllables=min(255, int(row["syllables"])))
+                if row.get("frequency_rank"):
+                    info = info._replace(frequency_rank=int(row["frequency_rank"]))
+                if row.get("aoa_grade"):
+                    info = info._replace(aoa_grade=max(1, min(12, int(row["aoa_grade"]))))
+                elif row.get("aoa_age"):
+                    info = info._replace(aoa_grade=aoa_grade(float(row["aoa_age"])))
+                words[word] = info
+    return words
+
+
+def sources_digest(sources: Sequence[str]) -> bytes:
+    digest = hashlib.sha256()
+    for source in sources:
+        with open(source, 'rb') as f:
+            digest.update(hashlib.sha256(f.read()).digest())
+    return digest.digest()
+
+
+def build_lexicon(sources: Sequence[str] = (DEFAULT_SOURCE,), output: Optional[str] = None) -> str:
+    """
+    Compile word lists into a lexicon index
+    
+    The index is an open-addressing hash table of fixed-size slots (at most
+    half full, keyed by CRC-32 of the word) followed by the words themselves.
+    
+    Returns:
+        Path of the written index
+    """
+    digest = sources_digest(sources)
+    if output is None:
+        output = default_index_path(digest)
+    words = read_sources(sources)
+    
+    slot_count = 1
+    while slot_count < 2 * max(1, len(words)):
+        slot_count *= 2
+    mask = slot_count - 1
+    
+    slots = bytearray(_SLOT.size * slot_count)
+    pool = bytearray()
+    for word, info in words.items():
+        key = word.encode('utf-8')
+        slot = zlib.crc32(key) & mask
+        while slots[slot * _SLOT.size + 8]:
+            slot = (slot + 1) & mask
+        _SLOT.pack_into(slots, slot * _SLOT.size, len(pool), info.frequency_rank, len(key),
+                        info.syllables, info.aoa_grade)
+        pool += key
+    
+    # Write then rename, so concurrent readers never see a partial file
+    tmp_path = f"{output}.{os.getpid()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(_HEADER.pack(_MAGIC, digest, slot_count, len(words)))
+        f.write(slots)
+        f.write(pool)
+    os.replace(tmp_path, output)
+    return output
+
+
+def default_index_path(digest: bytes) -> str:
+    """Index location for a set of sources (the temp directory is writable on cloud hosts)"""
+    return os.path.join(tempfile.gettempdir(), f"edu_lexicon_{digest.hex()[:16]}.idx")
+
+
+class Lexicon:
+    """
+    Read-only view of a compiled lexicon
+    
+    The index is memory-mapped, so opening a 100k-word lexicon costs the same
+    as opening the seed list and pages are only read as words are looked up.
+    Lookups are memoised, since explanations reuse the same words.
+    """
+    
+    MAX_MEMO = 65536
+    
+    def __init__(self, index_path: str):
+        """
+        Args:
+            index_path: File written by build_lexicon
+        """
+        self.path = index_path
+        self._file = open(index_path, 'rb')
+        try:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            magic, digest, slot_count, word_count = _HEADER.unpack_from(self._map, 0)
+            if magic != _MAGIC:
+                raise ValueError(f"{index_path} is not a lexicon index")
+        except Exception:
+            self.close()
+            raise
+        
+        self.digest = digest
+        self._mask = slot_count - 1
+        self._word_count = word_count
+        self._pool_start = _HEADER.size + _SLOT.size * slot_count
+        self._memo: Dict[str, Optional[WordInfo]] = {}
+        self._grades: Dict[str, Optional[int]] = {}
+    
+    @classmethod
+    def open(cls, sources: Sequence[str] = (DEFAULT_SOURCE,), index_path: Optional[str] = None) -> "Lexicon":
+        """Open the index for sources, (re)building it if it is missing or stale"""
+        digest = sources_digest(sources)
+        index_path = index_path or default_index_path(digest)
+        
+        if os.path.exists(index_path):
+            try:
+                lexicon = cls(index_path)
+            except (OSError, ValueError, struct.error):
+                lexicon = None
+            if lexicon is not None and lexicon.digest == digest:
+                return lexicon
+            if lexicon is not None:
+                lexicon.close()
+        
+        return cls(build_lexicon(sources, index_path))
+    
+    def __len__(self) -> int:
+        return self._word_count
+    
+    def __contains__(self, word: str) -> bool:
+        return self.lookup(word) is not None
+    
+    def lookup(self, word: str) -> Optional[WordInfo]:
+        """Data for a lowercase word, or None if the lexicon doesn't have it"""
+        try:
+            return self._memo[word]
+        except KeyError:
+            pass
+        
+        key = word.encode('utf-8')
+        found = None
+        slot = zlib.crc32(key) & self._mask
+        while True:
+            offset, rank, length, syllables, grade = _SLOT.unpack_from(self._map, _HEADER.size + slot * _SLOT.size)
+            if not length:
+                break
+            start = self._pool_start + offset
+            if length == len(key) and self._map[start:start + length] == key:
+                found = WordInfo(syllables, rank, grade)
+                break
+            slot = (slot + 1) & self._mask
+        
+        if len(self._memo) >= self.MAX_MEMO:
+            self._memo.clear()
+        self._memo[word] = found
+        return found
+    
+    def syllables(self, word: str) -> Optional[int]:
+        info = self.lookup(word)
+        return info.syllables if info is not None and info.syllables else None
+    
+    def grade(self, word: str) -> Optional[int]:
+        """
+        Grade a word is suitable from: its AoA grade, else estimated from its
+        frequency rank, else None (unknown word)
+        """
+        try:
+            return self._grades[word]
+        except KeyError:
+            pass
+        
+        info = self.lookup(word)
+        grade = None
+        if info is not None and info.aoa_grade:
+            grade = info.aoa_grade
+        elif info is not None and info.frequency_rank:
+            grade = next((grade for rank, grade in _RANK_GRADES if info.frequency_rank <= rank), 12)
+        
+        if len(self._grades) >= self.MAX_MEMO:
+            self._grades.clear()
+        self._grades[word] = grade
+        return grade
+    
+    def close(self):
+        if getattr(self, '_map', None) is not None:
+            self._map.close()
+            self._map = None
+        self._file.close()
+
+
+_lexicon: Optional[Lexicon] = None
+_lexicon_failed = False
+_lexicon_lock = threading.Lock()
+
+
+def get_lexicon() -> Optional[Lexicon]:
+    """
+    Return the process-wide lexicon, opened on first use
+    
+    Opens the index named by LEXICON_INDEX (e.g. one built from full word
+    lists with the CLI), else builds one from the bundled seed list. Returns
+    None if neither can be opened; the checks then judge words by length.
+    """
+    global _lexicon, _lexicon_failed
+    if _lexicon is None and not _lexicon_failed:
+        with _lexicon_lock:
+            if _lexicon is None and not _lexicon_failed:
+                try:
+                    index_path = os.environ.get("LEXICON_INDEX")
+                    _lexicon = Lexicon(index_path) if index_path else Lexicon.open()
+                except (OSError, ValueError, KeyError, struct.error):
+                    _lexicon_failed = True
+    return _lexicon
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Build or query the word difficulty lexicon")
+    commands = parser.add_subparsers(dest="command", required=True)
+    
+    build = commands.add_parser("build", help="Compile CSV word lists into an index file")
+    build.add_argument("--source", action="append", help="Word list CSV; repeat to merge several "
+                                                         "(default: the bundled seed list)")
+    build.add_argument("--output", help="Index path (defaults to the temp directory)")
+    
+    lookup = commands.add_parser("lookup", help="Show what the lexicon knows about words")
+    lookup.add_argument("words", nargs="+")
+    lookup.add_argument("--index", help="Index path (defaults to LEXICON_INDEX, then the seed list)")
+    args = parser.parse_args(argv)
+    
+    if args.command == "build":
+        path = build_lexicon(args.source or [DEFAULT_SOURCE], args.output)
+        lexicon = Lexicon(path)
+        print(f"Wrote {len(lexicon)} words to {path}")
+        print(f"Use it with: LEXICON_INDEX={path}")
+        lexicon.close()
+        return
+    
+    lexicon = Lexicon(args.index) if args.index else get_lexicon()
+    if lexicon is None:
+        parser.error("no lexicon available")
+    for word in args.words:
+        info = lexicon.lookup(word.lower())
+        if info is None:
+            print(f"{word}: not in lexicon")
+        else:
+            print(f"{word}: {info.syllables or '?'} syllables, frequency rank {info.frequency_rank or '?'}, "
+                  f"AoA grade {info.aoa_grade or '?'} (suitable from Grade {lexicon.grade(word.lower()) or '?'})")
+
+
+if __name__ == "__main__":
+    main()
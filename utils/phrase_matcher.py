@@ -0,0 +1,124 @@
+"""
+Phrase Matcher - Find every occurrence of many phrases in one pass over a text
+Aho-Corasick automaton for the vocabulary, engagement and pattern lists used by the content checks
+"""
+
+from collections import deque
+from functools import lru_cache
+from typing import Iterable, List, Optional, Tuple
+
+
+class PhraseMatcher:
+    """
+    Substring matcher for a fixed set of phrases
+    
+    Answers the same questions as `[p for p in phrases if p in text]` and
+    `any(p in text for p in phrases)`, but the automaton reads the text once
+    whatever the number of phrases, so checks stay cheap as word lists grow
+    to thousands of entries. Matching is case-sensitive: give lowercase
+    phrases and lowercased text.
+    
+    Below SCAN_THRESHOLD phrases, per-phrase `in` tests (run in C) beat a
+    Python-level walk over the text, so small lists are scanned directly.
+    """
+    
+    SCAN_THRESHOLD = 100
+    
+    def __init__(self, phrases: Iterable[str], scan_threshold: Optional[int] = None):
+        """
+        Args:
+            phrases: Phrases to look for; duplicates and empty strings are ignored
+            scan_threshold: Override SCAN_THRESHOLD (0 always builds the automaton)
+        """
+        self.phrases: Tuple[str, ...] = tuple(dict.fromkeys(p for p in phrases if p))
+        threshold = self.SCAN_THRESHOLD if scan_threshold is None else scan_threshold
+        self._automaton = len(self.phrases) >= threshold
+        if self._automaton:
+            self._build()
+    
+    def __len__(self) -> int:
+        return len(self.phrases)
+    
+    def _build(self):
+        # Trie: per-state transitions, and the phrases (by index) ending there
+        goto = [{}]
+        output: List[Tuple[int, ...]] = [()]
+        for index, phrase in enumerate(self.phrases):
+            state = 0
+            for char in phrase:
+                next_state = goto[state].get(char)
+                if next_state is None:
+                    next_state = len(goto)
+                    goto[state][char] = next_state
+                    goto.append({})
+                    output.append(())
+                state = next_state
+            output[state] += (index,)
+        
+        # Failure links, breadth first; each state also reports its suffixes' phrases
+        fail = [0] * len(goto)
+        queue = deque(goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in goto[state].items():
+                queue.append(next_state)
+                suffix = fail[state]
+                while suffix and char not in goto[suffix]:
+                    suffix = fail[suffix]
+                target = goto[suffix].get(char, 0)
+                fail[next_state] = target if target != next_state else 0
+                output[next_state] += output[fail[next_state]]
+        
+        self._goto = goto
+        self._fail = fail
+        self._output = output
+        # Transitions with failure links already followed, filled in as texts are scanned
+        self._delta = [dict(transitions) for transitions in goto]
+    
+    def _transition(self, state: int, char: str) -> int:
+        goto, fail = self._goto, self._fail
+        current = state
+        next_state = goto[current].get(char)
+        while next_state is None and current:
+            current = fail[current]
+            next_state = goto[current].get(char)
+        next_state = next_state or 0
+        self._delta[state][char] = next_state
+        return next_state
+    
+    def _scan(self, text: str, first_only: bool) -> List[int]:
+        delta, output = self._delta, self._output
+        found = set()
+        state = 0
+        for char in text:
+            next_state = delta[state].get(char)
+            state = self._transition(state, char) if next_state is None else next_state
+            if output[state]:
+                if first_only:
+                    return list(output[state][:1])
+                found.update(output[state])
+                # Every phrase seen: nothing more to learn from the rest of the text
+                if len(found) == len(self.phrases):
+                    break
+        return sorted(found)
+    
+    def find_all(self, text: str) -> List[str]:
+        """The phrases occurring in text, in the order they were given"""
+        if not self._automaton:
+            return [phrase for phrase in self.phrases if phrase in text]
+        return [self.phrases[index] for index in self._scan(text, first_only=False)]
+    
+    def contains_any(self, text: str) -> bool:
+        if not self._automaton:
+            return any(phrase in text for phrase in self.phrases)
+        return bool(self._scan(text, first_only=True))
+
+
+@lru_cache(maxsize=64)
+def _compile(phrases: Tuple[str, ...]) -> PhraseMatcher:
+    return PhraseMatcher(phrases)
+
+
+def compile_phrases(phrases: Iterable[str]) -> PhraseMatcher:
+    """Matcher for phrases, shared by every caller passing the same list"""
+    return _compile(tuple(phrases))
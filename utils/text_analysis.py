@@ -0,0 +1,83 @@
+"""
+Text Analysis - Tokenise an explanation once for every check that reads it
+Shared by ReviewerAgent and AdvancedValidator so the same text isn't split, lowercased and scanned repeatedly
+"""
+
+import re
+from functools import lru_cache
+from typing import List, Union
+
+# Sentence boundaries, as the reviewer and validator have always split them
+_SENTENCE_SPLIT = re.compile(r'[.!?]+')
+# Everything that isn't a lowercase letter or whitespace (stripped from words)
+_NON_LETTER = re.compile(r'[^a-z\s]+')
+# The same for ASCII text, as a (much faster) translation table
+_ASCII_NON_LETTER = str.maketrans('', '', ''.join(
+    chr(c) for c in range(128) if not (chr(c).islower() or chr(c).isspace())
+))
+
+
+class Document:
+    """
+    A text split into the views the content checks need
+    
+    Everything is computed once on construction:
+        lower          the lowercased text, for phrase lookups
+        segments       pieces from splitting on [.!?]+, including empty ones
+        sentences      stripped, non-empty segments
+        tokens         whitespace-separated tokens
+        lower_tokens   tokens, lowercased
+        words          lower_tokens stripped to a-z, empty ones dropped
+        paragraphs     pieces between blank lines
+    
+    Use analyze() rather than the constructor to share one Document between
+    checks of the same text.
+    """
+    
+    __slots__ = ("text", "lower", "segments", "sentences", "tokens", "lower_tokens", "words", "paragraphs")
+    
+    def __init__(self, text: str):
+        self.text = text
+        self.lower = text.lower()
+        self.segments: List[str] = _SENTENCE_SPLIT.split(text)
+        self.sentences: List[str] = [s for s in (segment.strip() for segment in self.segments) if s]
+        self.tokens: List[str] = text.split()
+        self.lower_tokens: List[str] = self.lower.split()
+        # Removing non-letters keeps the whitespace, so each word comes from exactly one token
+        if self.lower.isascii():
+            self.words: List[str] = self.lower.translate(_ASCII_NON_LETTER).split()
+        else:
+            self.words = _NON_LETTER.sub('', self.lower).split()
+        self.paragraphs: List[str] = text.split('\n\n')
+    
+    def __bool__(self) -> bool:
+        # False for an empty text, like the string itself
+        return bool(self.text)
+    
+    def sentence_word_counts(self) -> List[int]:
+        return [len(sentence.split()) for sentence in self.sentences]
+    
+    def contains(self, phrase: str) -> bool:
+        """Case-insensitive substring test (phrase must already be lowercase)"""
+        return phrase in self.lower
+    
+    def count(self, substring: str) -> int:
+        """Occurrences of substring in the original text"""
+        return self.text.count(substring)
+
+
+@lru_cache(maxsize=256)
+def _analyze(text: str) -> Document:
+    return Document(text)
+
+
+def analyze(text: Union[str, Document]) -> Document:
+    """
+    Document for text, reusing a recent analysis of the same string
+    
+    The reviewer and validator both check each explanation, so the second
+    check finds the first one's Document. Documents must not be modified.
+    """
+    if isinstance(text, Document):
+        return text
+    return _analyze(text)
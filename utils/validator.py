@@ -3,8 +3,16 @@ Advanced Content Validator
 Additional validation checks beyond basic reviewer
 """
 
-import re
-from typing import Dict, List, Tuple
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple, Union
+
+from . import readability
+from .phrase_matcher import compile_phrases
+from .text_analysis import Document, analyze
+
+if TYPE_CHECKING:
+    # Imported lazily: utils/__init__ loads this module, and `python -m utils.lexicon` must run first
+    from .lexicon import Lexicon
+
 
 class AdvancedValidator:
     """Advanced validation for educational content"""
@@ -18,60 +26,49 @@ class AdvancedValidator:
         5: ['percentages', 'volume', 'coordinates', 'equations'],
     }
     
+    # Phrases that introduce an example
+    EXAMPLE_MARKERS = ('example', 'like', 'such as', 'for instance', 'imagine')
+    
+    # Topics too advanced before Grade 9, and too basic after Grade 8
+    ADVANCED_TOPICS = (
+        'calculus', 'derivatives', 'integrals', 'quantum', 'molecular',
+        'biochemistry', 'thermodynamics', 'electromagnetism'
+    )
+    BASIC_TOPICS = ('counting', 'colors', 'shapes')
+    
     @staticmethod
-    def check_reading_level(text: str, grade: int) -> Tuple[bool, str]:
+    def check_reading_level(text: Union[str, Document], grade: int,
+                            lexicon: Optional["Lexicon"] = None) -> Tuple[bool, str]:
         """
         Check if text reading level matches grade
-        Uses simplified Flesch-Kincaid approximation
+        Uses simplified Flesch-Kincaid approximation, with syllable counts from
+        the lexicon where it has them
         """
+        reading_ok, reading_msg, _ = AdvancedValidator._reading_level(text, grade, lexicon)
+        return reading_ok, reading_msg
+    
+    @staticmethod
+    def _reading_level(text: Union[str, Document], grade: int,
+                       lexicon: Optional["Lexicon"]) -> Tuple[bool, str, Optional[readability.ReadabilityScores]]:
+        """check_reading_level, also returning all the readability scores"""
         if not text:
-            return False, "Empty text"
-        
-        # Count sentences
-        sentences = len(re.split(r'[.!?]+', text))
-        if sentences == 0:
-            sentences = 1
+            return False, "Empty text", None
         
-        # Count words
-        words = len(text.split())
-        if words == 0:
-            return False, "No words in text"
-        
-        # Count syllables (simplified)
-        syllables = sum(AdvancedValidator._count_syllables(word) for word in text.split())
-        
-        # Flesch-Kincaid Grade Level formula (simplified)
-        avg_words_per_sentence = words / sentences
-        avg_syllables_per_word = syllables / words if words > 0 else 0
-        
-        reading_level = (0.39 * avg_words_per_sentence) + (11.8 * avg_syllables_per_word) - 15.59
+        scores = readability.score(text, lexicon)
+        if scores is None:
+            return False, "No words in text", None
+        reading_level = scores.flesch_kincaid_grade
         
         # Allow ±2 grade levels
         if abs(reading_level - grade) <= 2:
-            return True, f"Reading level appropriate (~Grade {reading_level:.1f})"
+            return True, f"Reading level appropriate (~Grade {reading_level:.1f})", scores
         else:
-            return False, f"Reading level mismatch: text is Grade {reading_level:.1f}, target is Grade {grade}"
+            return False, f"Reading level mismatch: text is Grade {reading_level:.1f}, target is Grade {grade}", scores
     
     @staticmethod
     def _count_syllables(word: str) -> int:
         """Count syllables in a word (simplified)"""
-        word = word.lower()
-        vowels = 'aeiouy'
-        syllable_count = 0
-        previous_was_vowel = False
-        
-        for char in word:
-            is_vowel = char in vowels
-            if is_vowel and not previous_was_vowel:
-                syllable_count += 1
-            previous_was_vowel = is_vowel
-        
-        # Adjust for silent 'e'
-        if word.endswith('e'):
-            syllable_count -= 1
-        
-        # At least one syllable
-        return max(1, syllable_count)
+        return readability.count_syllables(word)
     
     @staticmethod
     def check_mcq_quality(mcqs: List[Dict]) -> Tuple[bool, List[str]]:
@@ -129,12 +126,13 @@ class AdvancedValidator:
         return similarity >= threshold
     
     @staticmethod
-    def check_explanation_structure(explanation: str, grade: int) -> Tuple[bool, List[str]]:
+    def check_explanation_structure(explanation: Union[str, Document], grade: int) -> Tuple[bool, List[str]]:
         """Check if explanation has good structure"""
         issues = []
+        doc = analyze(explanation)
         
         # Check length
-        word_count = len(explanation.split())
+        word_count = len(doc.tokens)
         min_words = 30 + (grade * 5)  # Higher grades need more detail
         max_words = 150 + (grade * 10)
         
@@ -144,19 +142,17 @@ class AdvancedValidator:
             issues.append(f"Explanation too long ({word_count} words, max ~{max_words})")
         
         # Check for paragraphs
-        paragraphs = explanation.split('\n\n')
-        if len(paragraphs) < 2 and word_count > 100:
+        if len(doc.paragraphs) < 2 and word_count > 100:
             issues.append("Long explanation should be split into paragraphs")
         
         # Check for examples (good for learning)
-        example_markers = ['example', 'like', 'such as', 'for instance', 'imagine']
-        has_example = any(marker in explanation.lower() for marker in example_markers)
+        has_example = compile_phrases(AdvancedValidator.EXAMPLE_MARKERS).contains_any(doc.lower)
         
         if not has_example and grade <= 6:
             issues.append("Consider adding examples for better understanding")
         
         # Check for engagement
-        questions = explanation.count('?')
+        questions = doc.count('?')
         if questions == 0 and grade <= 5:
             issues.append("Could use questions to engage younger students")
         
@@ -168,16 +164,11 @@ class AdvancedValidator:
         topic_lower = topic.lower()
         
         # Check if it's too advanced
-        advanced_topics = {
-            'calculus', 'derivatives', 'integrals', 'quantum', 'molecular',
-            'biochemistry', 'thermodynamics', 'electromagnetism'
-        }
-        
-        if grade < 9 and any(adv in topic_lower for adv in advanced_topics):
+        if grade < 9 and compile_phrases(AdvancedValidator.ADVANCED_TOPICS).contains_any(topic_lower):
             return False, f"Topic '{topic}' may be too advanced for Grade {grade}"
         
         # Check if it's too basic
-        if grade > 8 and any(basic in topic_lower for basic in ['counting', 'colors', 'shapes']):
+        if grade > 8 and compile_phrases(AdvancedValidator.BASIC_TOPICS).contains_any(topic_lower):
             return False, f"Topic '{topic}' may be too basic for Grade {grade}"
         
         return True, "Topic appropriateness OK"
@@ -185,20 +176,28 @@ class AdvancedValidator:
     @staticmethod
     def comprehensive_validation(content: Dict, grade: int, topic: str) -> Dict:
         """Run all validation checks"""
+        # Not at module level: utils/__init__ imports this module, so `python -m utils.lexicon` would load it twice
+        from .lexicon import get_lexicon
+        
         results = {
             "valid": True,
             "checks": {}
         }
         
         explanation = content.get('explanation', '')
+        
+        # Tokenised once for the reading level and structure checks
+        doc = analyze(explanation)
         mcqs = content.get('mcqs', [])
         
         # Reading level check
-        reading_ok, reading_msg = AdvancedValidator.check_reading_level(explanation, grade)
+        reading_ok, reading_msg, scores = AdvancedValidator._reading_level(doc, grade, get_lexicon())
         results["checks"]["reading_level"] = {
             "passed": reading_ok,
             "message": reading_msg
         }
+        if scores is not None:
+            results["checks"]["reading_level"]["scores"] = scores.as_dict()
         
         # Topic appropriateness
         topic_ok, topic_msg = AdvancedValidator.validate_topic_appropriateness(topic, grade)
@@ -215,7 +214,7 @@ class AdvancedValidator:
         }
         
         # Explanation structure
-        struct_ok, struct_issues = AdvancedValidator.check_explanation_structure(explanation, grade)
+        struct_ok, struct_issues = AdvancedValidator.check_explanation_structure(doc, grade)
         results["checks"]["explanation_structure"] = {
             "passed": struct_ok,
             "issues": struct_issues